@@ -0,0 +1,52 @@
+"""
+import time of polymage
+
+Measures, in fresh interpreters, the time of `import polymage` and of the first model lookup,
+with a cold registry snapshot (the YAML files are parsed) and with a warm one.
+
+    python benchmarks/import_time.py --runs 10
+"""
+import os
+import sys
+import json
+import argparse
+import tempfile
+import statistics
+import subprocess
+
+SCRIPT = """
+import json, time
+start = time.perf_counter()
+import polymage
+imported = time.perf_counter()
+polymage.ModelRegistry.getModelByName("flux-1-schnell", "drawthings")
+looked_up = time.perf_counter()
+print(json.dumps({"import": imported - start, "lookup": looked_up - imported}))
+"""
+
+
+def run(cache_dir: str) -> dict:
+    env = dict(os.environ, POLYMAGE_CACHE_DIR=cache_dir)
+    output = subprocess.run([sys.executable, "-c", SCRIPT], env=env, capture_output=True, text=True, check=True).stdout
+    return json.loads(output)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=10, help="number of interpreters started per scenario")
+    args = parser.parse_args()
+
+    results = {"cold snapshot": [], "warm snapshot": []}
+    for _ in range(args.runs):
+        with tempfile.TemporaryDirectory() as cache_dir:
+            results["cold snapshot"].append(run(cache_dir))
+            results["warm snapshot"].append(run(cache_dir))
+
+    for scenario, timings in results.items():
+        imported = statistics.median(timing["import"] for timing in timings) * 1000
+        looked_up = statistics.median(timing["lookup"] for timing in timings) * 1000
+        print(f"{scenario:>14}: import {imported:7.1f} ms, first lookup {looked_up:7.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,4 @@
-from importlib import resources
 from .registry import ModelRegistry
 #
-# load all pre-defined models in the ModelRegistry
+# the pre-defined models are loaded in the ModelRegistry on the first lookup
 #
-ModelRegistry.load_all_models()
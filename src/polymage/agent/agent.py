@@ -1,7 +1,9 @@
+import asyncio
 from abc import ABC, abstractmethod
-from typing import Any, Optional, List
+from typing import Any, Dict, Optional, List, Iterable
 from pydantic import BaseModel
 
+from .batch import BatchRun, call_with_item
 from ..media.media import Media
 from ..platform.platform import Platform
 
@@ -20,6 +22,8 @@ class Agent(ABC):
 		response_model (Optional[BaseModel]): Pydantic model defining the structure of expected responses,
 			or None if free-form text responses are acceptable
 		system_prompt (Optional[str]): System-level instructions that define the agent's behavior and role
+		default_params (Dict[str, Any]): Parameters passed to every platform call of the agent, overriding
+			the defaults of the model and of the platform. The kwargs of run() override them in turn.
 
 	Example:
 		class ChatAgent(Agent):
@@ -34,11 +38,17 @@ class Agent(ABC):
 			model: str,
 			response_model: Optional[BaseModel] = None,
 			system_prompt: Optional[str] = None,
+			default_params: Optional[Dict[str, Any]] = None,
 	):
 		self.platform = platform
 		self.model = model
 		self.response_model = response_model
 		self.system_prompt = system_prompt
+		self.default_params = dict(default_params or {})
+
+	def _call_params(self, kwargs: Dict[str, Any]) -> Dict[str, Any]:
+		"""The parameters of a platform call : the agent defaults, overridden by the run() kwargs"""
+		return {**self.default_params, **kwargs} if self.default_params else kwargs
 
 
 	@abstractmethod
@@ -62,3 +72,48 @@ class Agent(ABC):
 			NotImplementedError: If subclass doesn't implement this method
 		"""
 		pass
+
+
+	async def arun(self, prompt: str, media: Optional[List[Media]] = None, **kwargs: Any) -> Any:
+		"""
+		Async version of run.
+
+		The default implementation runs the blocking run() method in a worker thread,
+		subclasses override it to call the async methods of the platform.
+
+		Args:
+			prompt (str): The user's input or instruction for the agent
+			media (Optional[List[Media]]): List of media objects (images, files) to process,
+				or None if no media is provided
+			**kwargs: Additional keyword arguments for flexible input handling
+
+		Returns:
+			Any: The result of the agent's processing, typically a response or generated content
+		"""
+		return await asyncio.to_thread(self.run, prompt, media, **kwargs)
+
+
+	def run_many(self, items: Iterable[Any], max_concurrency: int = 4, ordered: bool = False, **kwargs: Any) -> BatchRun:
+		"""
+		Run the agent on many items, with at most max_concurrency calls in flight.
+
+		Args:
+			items (Iterable[Any]): The items to process, each one is a prompt string,
+				a (prompt, media) tuple, or a dict of run() arguments. The iterable is
+				consumed lazily, as workers become free.
+			max_concurrency (int): Maximum number of concurrent run() calls
+			ordered (bool): Yield the results in input order instead of completion order
+			**kwargs: Additional keyword arguments passed to every run() call
+
+		Returns:
+			BatchRun: An iterator of BatchResult, a failed item carries its exception instead
+				of stopping the batch. Its summary (throughput, latencies) is set once exhausted.
+
+		Example:
+			batch = agent.run_many(prompts, max_concurrency=8)
+			for result in batch:
+				if result.ok:
+					print(result.value)
+			print(batch.summary)
+		"""
+		return BatchRun(lambda item: call_with_item(self.run, item, **kwargs), items, max_concurrency=max_concurrency, ordered=ordered)
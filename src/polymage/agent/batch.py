@@ -0,0 +1,219 @@
+import time
+import random
+import logging
+from dataclasses import dataclass, field
+from concurrent.futures import ThreadPoolExecutor, Future, wait, FIRST_COMPLETED
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Mapping, Optional, Set
+
+logger = logging.getLogger(__name__)
+logger.addHandler(logging.NullHandler())
+
+"""
+bounded-concurrency batch execution, used by Agent.run_many
+"""
+
+# number of latencies kept to compute the percentiles of a batch
+LATENCY_SAMPLE_SIZE = 10000
+
+
+@dataclass
+class BatchResult:
+	"""
+	Outcome of one item of a batch.
+
+	Attributes:
+		index (int): Position of the item in the input iterable
+		item (Any): The input item
+		value (Any): The value returned by the agent, None if the call failed
+		error (Optional[BaseException]): The exception raised by the agent, None on success
+		latency (float): Duration of the call, in seconds
+	"""
+	index: int
+	item: Any
+	value: Any = None
+	error: Optional[BaseException] = None
+	latency: float = 0.0
+
+	@property
+	def ok(self) -> bool:
+		return self.error is None
+
+
+@dataclass
+class BatchSummary:
+	"""
+	Throughput and latency statistics of a batch.
+
+	Attributes:
+		total (int): Number of items processed
+		succeeded (int): Number of successful items
+		failed (int): Number of failed items
+		elapsed (float): Wall time of the batch, in seconds
+		throughput (float): Items processed per second
+		latency_mean (float): Mean latency of a call, in seconds
+		latency_p50 (float): Median latency, in seconds
+		latency_p95 (float): 95th percentile latency, in seconds
+		latency_max (float): Slowest call, in seconds
+	"""
+	total: int = 0
+	succeeded: int = 0
+	failed: int = 0
+	elapsed: float = 0.0
+	throughput: float = 0.0
+	latency_mean: float = 0.0
+	latency_p50: float = 0.0
+	latency_p95: float = 0.0
+	latency_max: float = 0.0
+
+	def __str__(self) -> str:
+		return (f"{self.total} items ({self.succeeded} ok, {self.failed} failed) in {self.elapsed:.2f}s, "
+				f"{self.throughput:.2f} items/s, latency mean={self.latency_mean:.3f}s "
+				f"p50={self.latency_p50:.3f}s p95={self.latency_p95:.3f}s max={self.latency_max:.3f}s")
+
+
+@dataclass
+class _LatencyStats:
+	"""Running latency statistics, with a bounded reservoir sample for the percentiles"""
+	count: int = 0
+	total: float = 0.0
+	maximum: float = 0.0
+	sample: List[float] = field(default_factory=list)
+
+	def add(self, latency: float) -> None:
+		self.count += 1
+		self.total += latency
+		self.maximum = max(self.maximum, latency)
+		if len(self.sample) < LATENCY_SAMPLE_SIZE:
+			self.sample.append(latency)
+		else:
+			slot = random.randrange(self.count)
+			if slot < LATENCY_SAMPLE_SIZE:
+				self.sample[slot] = latency
+
+	def percentile(self, q: float) -> float:
+		if not self.sample:
+			return 0.0
+		ordered = sorted(self.sample)
+		return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+class BatchRun(Iterator[BatchResult]):
+	"""
+	Streaming iterator over the results of a batch.
+
+	At most max_concurrency calls run at the same time, and the input iterable is only
+	consumed when a worker is free, so a very large (or lazy) input keeps a flat memory
+	footprint. A failing item doesn't stop the batch : its exception is returned in the
+	BatchResult. The summary is available once the iterator is exhausted.
+
+	Args:
+		func (Callable[[Any], Any]): Called once per item
+		items (Iterable[Any]): The input items
+		max_concurrency (int): Maximum number of calls in flight
+		ordered (bool): Yield the results in input order instead of completion order
+
+	Example:
+		batch = BatchRun(agent.run, prompts, max_concurrency=8)
+		for result in batch:
+			print(result.index, result.value if result.ok else result.error)
+		print(batch.summary)
+	"""
+
+	def __init__(self, func: Callable[[Any], Any], items: Iterable[Any], max_concurrency: int = 4, ordered: bool = False) -> None:
+		if max_concurrency < 1:
+			raise ValueError("max_concurrency must be at least 1")
+		self._func = func
+		self._items = items
+		self._max_concurrency = max_concurrency
+		self._ordered = ordered
+		self.summary: Optional[BatchSummary] = None
+		self._results = self._run()
+
+	def __iter__(self) -> "BatchRun":
+		return self
+
+	def __next__(self) -> BatchResult:
+		return next(self._results)
+
+	def close(self) -> None:
+		"""Stop the batch, pending items are cancelled"""
+		self._results.close()
+
+	def _call(self, index: int, item: Any) -> BatchResult:
+		start = time.perf_counter()
+		try:
+			value = self._func(item)
+			return BatchResult(index=index, item=item, value=value, latency=time.perf_counter() - start)
+		except Exception as e:
+			logger.debug("Batch item %d failed", index, exc_info=True)
+			return BatchResult(index=index, item=item, error=e, latency=time.perf_counter() - start)
+
+	def _run(self) -> Iterator[BatchResult]:
+		start = time.perf_counter()
+		stats = _LatencyStats()
+		succeeded = 0
+		items = enumerate(self._items)
+		exhausted = False
+		pending: Set[Future] = set()
+		# out of order results, waiting for their turn when ordered=True
+		buffered: Dict[int, BatchResult] = {}
+		next_index = 0
+
+		executor = ThreadPoolExecutor(max_workers=self._max_concurrency, thread_name_prefix="polymage-batch")
+		try:
+			while True:
+				# backpressure : only pull new items when a slot is free
+				while not exhausted and len(pending) + len(buffered) < self._max_concurrency:
+					try:
+						index, item = next(items)
+					except StopIteration:
+						exhausted = True
+						break
+					pending.add(executor.submit(self._call, index, item))
+				if not pending:
+					break
+
+				done, pending = wait(pending, return_when=FIRST_COMPLETED)
+				for future in done:
+					result = future.result()
+					stats.add(result.latency)
+					succeeded += result.ok
+					if self._ordered:
+						buffered[result.index] = result
+					else:
+						yield result
+				while next_index in buffered:
+					yield buffered.pop(next_index)
+					next_index += 1
+		finally:
+			executor.shutdown(wait=True, cancel_futures=True)
+			elapsed = time.perf_counter() - start
+			self.summary = BatchSummary(
+				total=stats.count,
+				succeeded=succeeded,
+				failed=stats.count - succeeded,
+				elapsed=elapsed,
+				throughput=stats.count / elapsed if elapsed > 0 else 0.0,
+				latency_mean=stats.total / stats.count if stats.count else 0.0,
+				latency_p50=stats.percentile(0.50),
+				latency_p95=stats.percentile(0.95),
+				latency_max=stats.maximum,
+			)
+			logger.info("Batch done: %s", self.summary)
+
+
+def call_with_item(run: Callable[..., Any], item: Any, **kwargs: Any) -> Any:
+	"""
+	Call an agent run method with a batch item.
+
+	An item can be a prompt string, a (prompt, media) tuple, or a mapping of run() arguments.
+	The kwargs are shared by all the items, the item values take precedence.
+	"""
+	if isinstance(item, str):
+		return run(prompt=item, **kwargs)
+	if isinstance(item, tuple):
+		prompt, media = item
+		return run(prompt=prompt, media=media, **kwargs)
+	if isinstance(item, Mapping):
+		return run(**{**kwargs, **item})
+	raise TypeError("batch items must be a prompt string, a (prompt, media) tuple or a mapping of run() arguments.")
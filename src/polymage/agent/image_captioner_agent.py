@@ -37,4 +37,20 @@ class ImageCaptionerAgent(Agent):
 		model=self.model
 		system_prompt=self.system_prompt
 
-		return platform.image2text(model=model, prompt=prompt, media=media, **kwargs)
+		return platform.image2text(model=model, prompt=prompt, media=media, **self._call_params(kwargs))
+
+	async def arun(self, prompt: str, media: Optional[List[Media]] = None, **kwargs: Any) -> Any:
+		"""
+		Async version of run, using the platform's aimage2text method.
+
+		Args:
+			prompt (str): The prompt or instruction for image description generation.
+			media (Optional[List[Media]]): List of media objects to process.
+										  Defaults to None.
+			**kwargs: Additional keyword arguments passed to the platform's
+					 aimage2text method.
+
+		Returns:
+			Any: The generated caption or description.
+		"""
+		return await self.platform.aimage2text(model=self.model, prompt=prompt, media=media, **self._call_params(kwargs))
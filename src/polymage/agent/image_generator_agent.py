@@ -22,7 +22,7 @@ class ImageGeneratorAgent(Agent):
 		super().__init__(**kwargs)
 
 
-	def run(self, prompt: str, media: Optional[List[Media]] = None, response_model: Optional[BaseModel] = None, **kwargs: Any) -> Any:
+	def run(self, prompt: str, media: Optional[List[Media]] = None, response_model: Optional[BaseModel] = None, count: Optional[int] = None, **kwargs: Any) -> Any:
 		"""
 		Execute the image captioning process.
 
@@ -30,6 +30,8 @@ class ImageGeneratorAgent(Agent):
 			prompt (str): The prompt or instruction for image description generation.
 			media (Optional[List[Media]]): List of media objects to process.
 										  Defaults to None.
+			count (Optional[int]): Number of images to generate from the prompt, in as few
+								   platform calls as possible. A list of images is then returned.
 			**kwargs: Additional keyword arguments passed to the platform's
 					 image2text method.
 
@@ -41,8 +43,34 @@ class ImageGeneratorAgent(Agent):
 		platform=self.platform
 		model=self.model
 		system_prompt=self.system_prompt
+		kwargs = self._call_params(kwargs)
 
+		if media is None and count is not None:
+			return platform.text2images(model=model, prompt=prompt, count=count, **kwargs)
 		if media is None:
 			return platform.text2image(model=model, prompt=prompt, **kwargs)
 		else:
 			return platform.image2image(model=model, prompt=prompt, media=media, **kwargs)
+
+
+	async def arun(self, prompt: str, media: Optional[List[Media]] = None, response_model: Optional[BaseModel] = None, count: Optional[int] = None, **kwargs: Any) -> Any:
+		"""
+		Async version of run, using the platform's atext2image / aimage2image methods.
+
+		Args:
+			prompt (str): The prompt describing the image to generate.
+			media (Optional[List[Media]]): Source images for image-to-image generation.
+										  Defaults to None.
+			count (Optional[int]): Number of images to generate, a list is then returned.
+			**kwargs: Additional keyword arguments passed to the platform.
+
+		Returns:
+			Any: The generated ImageMedia.
+		"""
+		kwargs = self._call_params(kwargs)
+		if media is None and count is not None:
+			return await self.platform.atext2images(model=self.model, prompt=prompt, count=count, **kwargs)
+		if media is None:
+			return await self.platform.atext2image(model=self.model, prompt=prompt, **kwargs)
+		else:
+			return await self.platform.aimage2image(model=self.model, prompt=prompt, media=media, **kwargs)
@@ -15,7 +15,7 @@ class InstructAgent(Agent):
 	def __init__(self, **kwargs: Any) -> None:
 		super().__init__(**kwargs)
 
-	def run(self, prompt: str, media: Optional[List[Media]] = None, **kwargs: Any) -> Any:
+	def run(self, prompt: str, media: Optional[List[Media]] = None, stream: bool = False, **kwargs: Any) -> Any:
 		"""
 		Execute a text-to-text transformation using the configured platform.
 
@@ -26,11 +26,14 @@ class InstructAgent(Agent):
 			prompt (str): The input text prompt to process
 			media (Optional[List[Media]]): Optional list of media objects to include
 										  in the processing (e.g., images, files)
+			stream (bool): Return a TextStream yielding the text deltas as they are
+						   generated, with its time to first token and tokens/sec stats
 			**kwargs: Additional keyword arguments to pass to the platform's text2text method
 
 		Returns:
 			Any: The result from the platform's text2text processing, typically
-				 a string or structured data based on response_model parameter
+				 a string or structured data based on response_model parameter,
+				 or a TextStream when stream is True
 
 		Note:
 			If system_prompt was provided during initialization, it will be merged
@@ -38,8 +41,11 @@ class InstructAgent(Agent):
 			in case of key conflicts.
 		"""
 
+		kwargs = self._call_params(kwargs)
 		if self.system_prompt is not None:
 			kwargs['system_prompt'] = self.system_prompt
+		if stream:
+			kwargs['stream'] = True
 
 		return self.platform.text2text(
 			model=self.model,
@@ -48,3 +54,32 @@ class InstructAgent(Agent):
 			response_model=self.response_model,
 			**kwargs
 		)
+
+	async def arun(self, prompt: str, media: Optional[List[Media]] = None, stream: bool = False, **kwargs: Any) -> Any:
+		"""
+		Async version of run, using the platform's atext2text method.
+
+		Args:
+			prompt (str): The input text prompt to process
+			media (Optional[List[Media]]): Optional list of media objects to include
+										  in the processing (e.g., images, files)
+			stream (bool): Return an AsyncTextStream yielding the text deltas as they are generated
+			**kwargs: Additional keyword arguments to pass to the platform's atext2text method
+
+		Returns:
+			Any: The result from the platform's atext2text processing
+		"""
+
+		kwargs = self._call_params(kwargs)
+		if self.system_prompt is not None:
+			kwargs['system_prompt'] = self.system_prompt
+		if stream:
+			kwargs['stream'] = True
+
+		return await self.platform.atext2text(
+			model=self.model,
+			prompt=prompt,
+			media=media,
+			response_model=self.response_model,
+			**kwargs
+		)
@@ -0,0 +1,356 @@
+import os
+import json
+import time
+import copy
+import sqlite3
+import hashlib
+import logging
+import tempfile
+import threading
+from pathlib import Path
+from collections import OrderedDict
+from dataclasses import dataclass, replace
+from typing import Any, Dict, Optional, Tuple, Union
+
+from ..media.image_media import ImageMedia
+
+logger = logging.getLogger(__name__)
+logger.addHandler(logging.NullHandler())
+
+"""
+content-addressed cache for the Platform calls
+
+The cache has an in-memory LRU tier, and an optional on-disk tier that can be shared
+by several processes : a SQLite index (in WAL mode) and one blob file per image.
+"""
+
+DEFAULT_MAX_ENTRIES = 1024
+DEFAULT_MAX_MEMORY_BYTES = 256 * 1024 * 1024
+
+
+@dataclass
+class CacheStats:
+	"""
+	Hit/miss statistics of a ResponseCache.
+
+	Attributes:
+		hits (int): Lookups answered by the cache (memory or disk)
+		misses (int): Lookups not found in the cache
+		memory_hits (int): Hits answered by the in-memory tier
+		disk_hits (int): Hits answered by the on-disk tier
+		bypassed (int): Calls that skipped the cache (random seed, streaming)
+		evictions (int): Entries evicted by size or TTL
+	"""
+	hits: int = 0
+	misses: int = 0
+	memory_hits: int = 0
+	disk_hits: int = 0
+	bypassed: int = 0
+	evictions: int = 0
+
+	@property
+	def hit_rate(self) -> float:
+		lookups = self.hits + self.misses
+		return self.hits / lookups if lookups else 0.0
+
+
+def make_cache_key(**parts: Any) -> str:
+	"""
+	Build a content-addressed key from the parts of a call.
+
+	The parts are serialized as canonical JSON (sorted keys), so the same call
+	always gets the same key, whatever the order of its parameters.
+	"""
+	canonical = json.dumps(parts, sort_keys=True, separators=(",", ":"), default=str)
+	return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def media_digest(media: Any) -> str:
+	"""Content hash of a media, used in the cache keys"""
+	if isinstance(media, ImageMedia):
+		return media.content_hash()
+	return hashlib.blake2b(repr(media).encode("utf-8"), digest_size=16).hexdigest()
+
+
+#
+# serialization of the cached values
+#
+def _encode(value: Any) -> Optional[Tuple[str, bytes, Optional[str]]]:
+	"""Returns (kind, payload, metadata) for a cacheable value, None otherwise"""
+	if isinstance(value, str):
+		return "text", value.encode("utf-8"), None
+	if isinstance(value, ImageMedia):
+		# the original encoding is kept, no need to re-encode the pixels
+		return "image", value.to_bytes(format=None), json.dumps(value._metadata)
+	if isinstance(value, (dict, list)):
+		try:
+			return "json", json.dumps(value).encode("utf-8"), None
+		except (TypeError, ValueError):
+			return None
+	return None
+
+
+def _decode(kind: str, payload: bytes, metadata: Optional[str]) -> Any:
+	if kind == "text":
+		return payload.decode("utf-8")
+	if kind == "json":
+		return json.loads(payload)
+	if kind == "image":
+		return ImageMedia(payload, json.loads(metadata) if metadata else None)
+	raise ValueError(f"Unknown cache entry kind '{kind}'.")
+
+
+def copy_response(value: Any) -> Any:
+	"""Cached values are shared : give the caller its own copy of the mutable ones"""
+	if isinstance(value, ImageMedia):
+		return value.copy()
+	if isinstance(value, (dict, list)):
+		return copy.deepcopy(value)
+	return value
+
+
+def _memory_size(value: Any) -> int:
+	if isinstance(value, ImageMedia):
+		if not value.is_decoded():
+			return len(value.to_buffer(format=None))
+		pixels = value._decoded()
+		return pixels.width * pixels.height * len(pixels.getbands())
+	if isinstance(value, str):
+		return len(value)
+	return len(repr(value))
+
+
+class _DiskTier:
+	"""SQLite index (WAL mode) plus blob files, safe to share between processes"""
+
+	# payloads bigger than this are stored in a blob file instead of the index
+	INLINE_MAX_BYTES = 64 * 1024
+
+	def __init__(self, directory: Union[str, Path], max_bytes: Optional[int]) -> None:
+		self._directory = Path(directory)
+		self._blobs = self._directory / "blobs"
+		self._blobs.mkdir(parents=True, exist_ok=True)
+		self._max_bytes = max_bytes
+		self._local = threading.local()
+		with self._connection() as db:
+			db.execute("""
+				CREATE TABLE IF NOT EXISTS entries (
+					key TEXT PRIMARY KEY,
+					kind TEXT NOT NULL,
+					metadata TEXT,
+					payload BLOB,
+					size INTEGER NOT NULL,
+					created REAL NOT NULL,
+					accessed REAL NOT NULL,
+					expires REAL
+				)""")
+			db.execute("CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed)")
+
+	def _connection(self) -> sqlite3.Connection:
+		# sqlite connections can't be shared between threads, open one per thread
+		db = getattr(self._local, "db", None)
+		if db is None:
+			db = sqlite3.connect(self._directory / "index.sqlite", timeout=30.0, isolation_level=None)
+			db.execute("PRAGMA journal_mode=WAL")
+			db.execute("PRAGMA synchronous=NORMAL")
+			self._local.db = db
+		return db
+
+	def _blob_path(self, key: str) -> Path:
+		return self._blobs / key[:2] / key
+
+	def get(self, key: str) -> Optional[Tuple[str, bytes, Optional[str]]]:
+		db = self._connection()
+		row = db.execute("SELECT kind, metadata, payload, expires FROM entries WHERE key = ?", (key,)).fetchone()
+		if row is None:
+			return None
+		kind, metadata, payload, expires = row
+		now = time.time()
+		if expires is not None and expires < now:
+			self.delete(key)
+			return None
+		if payload is None:
+			try:
+				payload = self._blob_path(key).read_bytes()
+			except FileNotFoundError:
+				# evicted by another process in the meantime
+				self.delete(key)
+				return None
+		db.execute("UPDATE entries SET accessed = ? WHERE key = ?", (now, key))
+		return kind, payload, metadata
+
+	def set(self, key: str, kind: str, payload: bytes, metadata: Optional[str], ttl: Optional[float]) -> int:
+		now = time.time()
+		inline = payload if len(payload) <= self.INLINE_MAX_BYTES else None
+		if inline is None:
+			# write the blob first, atomically, the index row makes it visible
+			path = self._blob_path(key)
+			path.parent.mkdir(exist_ok=True)
+			fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=".tmp-")
+			with os.fdopen(fd, "wb") as f:
+				f.write(payload)
+			os.replace(tmp_path, path)
+		self._connection().execute(
+			"INSERT OR REPLACE INTO entries (key, kind, metadata, payload, size, created, accessed, expires) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+			(key, kind, metadata, inline, len(payload), now, now, now + ttl if ttl is not None else None),
+		)
+		return self._evict()
+
+	def delete(self, key: str) -> None:
+		self._connection().execute("DELETE FROM entries WHERE key = ?", (key,))
+		self._blob_path(key).unlink(missing_ok=True)
+
+	def _evict(self) -> int:
+		"""Remove the expired entries, then the least recently used ones above max_bytes"""
+		db = self._connection()
+		evicted = 0
+		for (key,) in db.execute("SELECT key FROM entries WHERE expires IS NOT NULL AND expires < ?", (time.time(),)).fetchall():
+			self.delete(key)
+			evicted += 1
+		if self._max_bytes is None:
+			return evicted
+		(total,) = db.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()
+		if total <= self._max_bytes:
+			return evicted
+		for key, size in db.execute("SELECT key, size FROM entries ORDER BY accessed").fetchall():
+			if total <= self._max_bytes:
+				break
+			self.delete(key)
+			total -= size
+			evicted += 1
+		return evicted
+
+	def clear(self) -> None:
+		for (key,) in self._connection().execute("SELECT key FROM entries").fetchall():
+			self.delete(key)
+
+	def close(self) -> None:
+		db = getattr(self._local, "db", None)
+		if db is not None:
+			db.close()
+			self._local.db = None
+
+
+class ResponseCache:
+	"""
+	Content-addressed cache for Platform calls.
+
+	Args:
+		max_entries (int): Maximum number of entries in the memory tier
+		max_memory_bytes (int): Approximate memory budget of the memory tier
+		ttl (Optional[float]): Time to live of an entry in seconds, None to keep entries until evicted
+		directory (Optional[Union[str, Path]]): Directory of the on-disk tier, None for a memory only cache
+		max_disk_bytes (Optional[int]): Size budget of the on-disk tier, None for unbounded
+
+	Example:
+		cache = ResponseCache(directory="~/.cache/polymage", max_disk_bytes=2 * 1024**3)
+		platform = LMStudioPlatform(cache=cache)
+		platform.text2text(model="gemma-3-12b", prompt="Hello")   # miss, calls LM Studio
+		platform.text2text(model="gemma-3-12b", prompt="Hello")   # hit
+		print(cache.stats())
+	"""
+
+	def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES, max_memory_bytes: int = DEFAULT_MAX_MEMORY_BYTES,
+				 ttl: Optional[float] = None, directory: Optional[Union[str, Path]] = None,
+				 max_disk_bytes: Optional[int] = None) -> None:
+		self._max_entries = max_entries
+		self._max_memory_bytes = max_memory_bytes
+		self._ttl = ttl
+		# key -> (value, size, expires)
+		self._memory: "OrderedDict[str, Tuple[Any, int, Optional[float]]]" = OrderedDict()
+		self._memory_bytes = 0
+		self._lock = threading.Lock()
+		self._stats = CacheStats()
+		self._disk = _DiskTier(Path(directory).expanduser(), max_disk_bytes) if directory is not None else None
+
+	@property
+	def persistent(self) -> bool:
+		"""True when the cache has an on-disk tier"""
+		return self._disk is not None
+
+	def stats(self) -> CacheStats:
+		"""A snapshot of the hit/miss statistics"""
+		with self._lock:
+			return replace(self._stats)
+
+	def record_bypass(self) -> None:
+		with self._lock:
+			self._stats.bypassed += 1
+
+	def get(self, key: str) -> Tuple[bool, Any]:
+		"""
+		Look up a key.
+
+		Returns:
+			Tuple[bool, Any]: (True, value) on a hit, (False, None) on a miss
+		"""
+		now = time.time()
+		with self._lock:
+			entry = self._memory.get(key)
+			if entry is not None:
+				value, size, expires = entry
+				if expires is None or expires >= now:
+					self._memory.move_to_end(key)
+					self._stats.hits += 1
+					self._stats.memory_hits += 1
+					return True, copy_response(value)
+				self._remove(key)
+				self._stats.evictions += 1
+
+		if self._disk is not None:
+			stored = self._disk.get(key)
+			if stored is not None:
+				value = _decode(*stored)
+				self._store_in_memory(key, value, now + self._ttl if self._ttl is not None else None)
+				with self._lock:
+					self._stats.hits += 1
+					self._stats.disk_hits += 1
+				return True, copy_response(value)
+
+		with self._lock:
+			self._stats.misses += 1
+		return False, None
+
+	def set(self, key: str, value: Any) -> None:
+		"""Store a value, values that can't be cached (None, unknown types) are silently ignored"""
+		if not isinstance(value, (str, dict, list, ImageMedia)):
+			return
+		expires = time.time() + self._ttl if self._ttl is not None else None
+		self._store_in_memory(key, copy_response(value), expires)
+		if self._disk is not None:
+			encoded = _encode(value)
+			if encoded is None:
+				return
+			kind, payload, metadata = encoded
+			evicted = self._disk.set(key, kind, payload, metadata, self._ttl)
+			if evicted:
+				with self._lock:
+					self._stats.evictions += evicted
+
+	def clear(self) -> None:
+		"""Remove all the entries, from both tiers"""
+		with self._lock:
+			self._memory.clear()
+			self._memory_bytes = 0
+		if self._disk is not None:
+			self._disk.clear()
+
+	def close(self) -> None:
+		if self._disk is not None:
+			self._disk.close()
+
+	def _store_in_memory(self, key: str, value: Any, expires: Optional[float]) -> None:
+		size = _memory_size(value)
+		with self._lock:
+			if key in self._memory:
+				self._remove(key)
+			self._memory[key] = (value, size, expires)
+			self._memory_bytes += size
+			while self._memory and (len(self._memory) > self._max_entries or self._memory_bytes > self._max_memory_bytes):
+				oldest = next(iter(self._memory))
+				self._remove(oldest)
+				self._stats.evictions += 1
+
+	def _remove(self, key: str) -> None:
+		value, size, expires = self._memory.pop(key)
+		self._memory_bytes -= size
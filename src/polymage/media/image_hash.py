@@ -0,0 +1,140 @@
+import os
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Sequence
+
+from .image_media import ImageMedia
+from ..utils.image_utils import hamming_distance
+
+logger = logging.getLogger(__name__)
+logger.addHandler(logging.NullHandler())
+
+"""
+batch hashing and deduplication of the images
+
+The hashes are computed in a thread pool : hashlib and the Pillow decoders release the GIL,
+so the work is spread across the cores without copying the images to other processes.
+"""
+
+
+def content_hashes(images: Sequence[ImageMedia], max_workers: Optional[int] = None) -> List[str]:
+    """
+    Content hashes of images, computed concurrently.
+
+    Args:
+        images (Sequence[ImageMedia]): The images
+        max_workers (Optional[int]): Number of threads, defaults to the number of cores
+
+    Returns:
+        List[str]: The hashes, in the order of the images
+    """
+    return _map(ImageMedia.content_hash, images, max_workers)
+
+
+def perceptual_hashes(images: Sequence[ImageMedia], method: str = "dhash", hash_size: int = 8,
+                      max_workers: Optional[int] = None) -> List[int]:
+    """
+    Perceptual hashes of images, computed concurrently.
+
+    Args:
+        images (Sequence[ImageMedia]): The images
+        method (str): 'dhash' (difference hash) or 'ahash' (average hash)
+        hash_size (int): The hashes have hash_size * hash_size bits
+        max_workers (Optional[int]): Number of threads, defaults to the number of cores
+
+    Returns:
+        List[int]: The hashes, in the order of the images
+    """
+    return _map(lambda image: image.perceptual_hash(method, hash_size), images, max_workers)
+
+
+class PerceptualIndex:
+    """
+    Index of perceptual hashes, to find the near duplicates without comparing all the pairs.
+
+    The hashes are split in max_distance + 1 bands : two hashes within max_distance bits
+    have at least one identical band (pigeonhole principle), so only the hashes sharing
+    a band are compared.
+
+    Args:
+        max_distance (int): Maximum hamming distance of two near duplicates
+        bits (int): Number of bits of the hashes (hash_size * hash_size)
+    """
+
+    def __init__(self, max_distance: int = 4, bits: int = 64) -> None:
+        if not 0 <= max_distance < bits:
+            raise ValueError("max_distance must be between 0 and the number of bits")
+        self.max_distance = max_distance
+        bands = max_distance + 1
+        width = bits // bands
+        # (shift, mask) of each band, the last one takes the remaining bits
+        self._bands = [(index * width, (1 << (width if index < bands - 1 else bits - index * width)) - 1)
+                       for index in range(bands)]
+        self._buckets: List[Dict[int, List[int]]] = [{} for _ in self._bands]
+
+    def find(self, perceptual_hash: int) -> Optional[int]:
+        """A near duplicate of perceptual_hash already in the index, None if there is none"""
+        for (shift, mask), bucket in zip(self._bands, self._buckets):
+            for candidate in bucket.get((perceptual_hash >> shift) & mask, ()):
+                if hamming_distance(candidate, perceptual_hash) <= self.max_distance:
+                    return candidate
+        return None
+
+    def add(self, perceptual_hash: int) -> bool:
+        """
+        Add a hash to the index, unless a near duplicate is already there.
+
+        Returns:
+            bool: True if the hash was added, False for a near duplicate
+        """
+        if self.find(perceptual_hash) is not None:
+            return False
+        for (shift, mask), bucket in zip(self._bands, self._buckets):
+            bucket.setdefault((perceptual_hash >> shift) & mask, []).append(perceptual_hash)
+        return True
+
+
+def deduplicate_images(images: Sequence[ImageMedia], max_distance: int = 4, method: str = "dhash",
+                       hash_size: int = 8, max_workers: Optional[int] = None) -> List[ImageMedia]:
+    """
+    Drop the duplicates and near duplicates of a list of images, for example before
+    captioning them with image2text. The first image of each group of duplicates is kept.
+
+    The exact duplicates are found with the content hashes (no decoding), then the near
+    duplicates with the perceptual hashes of the remaining images.
+
+    Args:
+        images (Sequence[ImageMedia]): The images
+        max_distance (int): Maximum hamming distance of the perceptual hashes of two near duplicates,
+            0 to only drop the identical pictures
+        method (str): Perceptual hash, 'dhash' or 'ahash'
+        hash_size (int): Size of the perceptual hashes
+        max_workers (Optional[int]): Number of threads, defaults to the number of cores
+
+    Returns:
+        List[ImageMedia]: The unique images, in their original order
+
+    Example:
+        images = deduplicate_images([ImageMedia.from_path(path) for path in paths])
+        captions = agent.run_many([("Describe this image", [image]) for image in images])
+    """
+    seen = set()
+    unique = []
+    for image, content_hash in zip(images, content_hashes(images, max_workers)):
+        if content_hash not in seen:
+            seen.add(content_hash)
+            unique.append(image)
+
+    index = PerceptualIndex(max_distance, hash_size * hash_size)
+    result = [image for image, perceptual_hash in zip(unique, perceptual_hashes(unique, method, hash_size, max_workers))
+              if index.add(perceptual_hash)]
+    if len(result) < len(images):
+        logger.debug("dropped %d duplicates out of %d images", len(images) - len(result), len(images))
+    return result
+
+
+def _map(function, images: Sequence[ImageMedia], max_workers: Optional[int]) -> list:
+    if len(images) <= 1:
+        return [function(image) for image in images]
+    with ThreadPoolExecutor(max_workers=max_workers or os.cpu_count(), thread_name_prefix="polymage-hash") as executor:
+        return list(executor.map(function, images))
@@ -1,16 +1,53 @@
 # image_media.py
+import mmap
 import base64
+import hashlib
 import logging
+import threading
+import weakref
+from collections import OrderedDict
 from io import BytesIO
+from pathlib import Path
 from PIL import Image
 from PIL.PngImagePlugin import PngInfo
-from typing import Optional, Dict, Any, Union
+from typing import Optional, Dict, Any, Iterator, List, Sequence, Tuple, Union, TYPE_CHECKING
 from .media import Media
-from ..utils.image_utils import base64_to_image, bytes_to_image
+from ..utils.image_utils import bytes_to_image, sniff_mime_type, png_add_text, image_nbytes, average_hash, difference_hash
+
+if TYPE_CHECKING:
+    import numpy as np
 
 logger = logging.getLogger(__name__)
 logger.addHandler(logging.NullHandler())
 
+#
+# NumPy interop, numpy is an optional dependency (pip install polymage[numpy])
+#
+# numpy (dtype, channels) of the Pillow modes
+_NUMPY_MODES = {
+    "L": ("uint8", 1),
+    "RGB": ("uint8", 3),
+    "RGBA": ("uint8", 4),
+    "I;16": ("uint16", 1),
+    "I": ("int32", 1),
+    "F": ("float32", 1),
+}
+# modes whose pixels Pillow can store in the memory of a numpy array
+_SHARED_MODES = ("L", "RGBA", "I;16")
+
+PERCEPTUAL_HASHES = {
+    "ahash": average_hash,
+    "dhash": difference_hash,
+}
+
+
+def _numpy():
+    try:
+        import numpy
+    except ImportError as e:
+        raise ImportError("numpy is required for the NumPy interop, install it with 'pip install polymage[numpy]'") from e
+    return numpy
+
 
 class ImageMedia(Media):
     """
@@ -19,8 +56,15 @@ class ImageMedia(Media):
     This class provides a wrapper around PIL (Pillow) Image objects to handle image media
     with additional functionality for base64 encoding and metadata management.
 
+    An image created from base64, bytes or a file keeps its original encoding : the pixels are only
+    decoded when they are accessed, and to_base64() / save_to_file() return the original bytes
+    when the requested format matches. The encodings are reused as long as the caller can't edit
+    the pixels : once image() has handed them out, the image is encoded again from its pixels, so the
+    edits made in place are never lost. An image created from pixels is encoded on every call.
+    The decoded pixels of these images are subject to the pixel memory budget (see set_pixel_budget).
+
     Attributes:
-        _image (PIL.Image.Image): Internal PIL Image object
+        _image (PIL.Image.Image): Internal PIL Image object, decoded on first access (same as image())
         _metadata (Optional[dict]): Metadata associated with the image
 
     Example:
@@ -35,25 +79,393 @@ class ImageMedia(Media):
         image_media.save_to_file('output.png')
     """
 
-    def __init__(self, image_data: Union[str, bytes, Image.Image], metadata: Optional[Dict[str, Any]] = None, **kwargs: Any) -> None:
+    def __init__(self, image_data: Union[str, bytes, Path, Image.Image], metadata: Optional[Dict[str, Any]] = None,
+                 mime_type: Optional[str] = None, **kwargs: Any) -> None:
         self._metadata = metadata
+        self._pixels: Optional[Image.Image] = None
+        # encoded versions of the image, by format (the original one, and the ones already computed),
+        # the original encoding of a file is a read-only memory map
+        self._encodings: Dict[str, Union[bytes, mmap.mmap]] = {}
+        self._base64: Dict[str, str] = {}
+        self._format: Optional[str] = None
+        self._path: Optional[Path] = None
+        # numpy array sharing its memory with the pixels (see from_numpy)
+        self._array: Optional["np.ndarray"] = None
+        # the decoded pixels have been handed out by image(), they can be edited in place
+        self._pixels_exposed = False
+        # memoized hashes, reset when the pixels are replaced
+        self._content_hash: Optional[str] = None
+        self._perceptual_hashes: Dict[Tuple[str, int], int] = {}
         # Auto-detect based on type
         if isinstance(image_data, str):
-            self._image = base64_to_image(image_data)
+            self._set_encoded(base64.b64decode(image_data), mime_type)
+            if self._format is not None:
+                self._base64[self._format] = image_data
         elif isinstance(image_data, bytes):
-            self._image = bytes_to_image(image_data)
+            self._set_encoded(image_data, mime_type)
+        elif isinstance(image_data, Path):
+            self._set_file(image_data, mime_type)
         elif isinstance(image_data, Image.Image):
-            self._image = image_data
+            self._pixels = image_data
         else:
-            raise TypeError("image_data must be either a Pillow Image or base64-encoded string or raw bytes.")
+            raise TypeError("image_data must be either a Pillow Image or base64-encoded string or raw bytes or a Path.")
+
+    @classmethod
+    def from_path(cls, path: Union[str, Path], metadata: Optional[Dict[str, Any]] = None,
+                  mime_type: Optional[str] = None) -> "ImageMedia":
+        """
+        Open an image file lazily.
+
+        The file is memory-mapped and never copied as a whole : to_base64(), iter_bytes() and
+        save_to_file() read the original bytes from the mapping, and the pixels are decoded
+        from the file on first access only.
+
+        Args:
+            path (Union[str, Path]): Path of the image file
+            metadata (Optional[Dict[str, Any]]): Metadata associated with the image
+            mime_type (Optional[str]): MIME type of the file, detected from its content by default
+
+        Returns:
+            ImageMedia: The file-backed image
+
+        Example:
+            image_media = ImageMedia.from_path('scan.tif')
+            platform.image2text(model="qwen3-vl-8b", prompt="Describe", media=[image_media])
+        """
+        return cls(Path(path), metadata, mime_type=mime_type)
+
+    @classmethod
+    def from_numpy(cls, array: "np.ndarray", metadata: Optional[Dict[str, Any]] = None) -> "ImageMedia":
+        """
+        Create an image from a (H, W) or (H, W, C) numpy array.
+
+        For the L (uint8, 1 channel), RGBA (uint8, 4 channels) and I;16 (uint16, 1 channel) modes,
+        the pixels share the memory of the array : no copy is made, and the changes made
+        to the array are seen by the image. The other modes (RGB, I, F) are copied.
+
+        Args:
+            array (np.ndarray): The pixels, uint8, uint16, int32 or float32
+            metadata (Optional[Dict[str, Any]]): Metadata associated with the image
+
+        Returns:
+            ImageMedia: The image
+
+        Example:
+            image_media = ImageMedia.from_numpy(np.zeros((512, 512, 4), dtype=np.uint8))
+        """
+        np = _numpy()
+        array = np.asarray(array)
+        if array.ndim == 2:
+            array = array[:, :, np.newaxis]
+        if array.ndim != 3:
+            raise ValueError(f"Expecting a (H, W) or (H, W, C) array, not {array.shape}")
+        mode = _mode_of(array.dtype.name, array.shape[2])
+        height, width = array.shape[:2]
+        # a C-contiguous array can be shared, the others are copied once
+        array = np.ascontiguousarray(array)
+        if mode in _SHARED_MODES:
+            media = cls(Image.frombuffer(mode, (width, height), array, "raw", mode, 0, 1), metadata)
+            media._array = array if array.shape[2] > 1 else array[:, :, 0]
+            return media
+        return cls(Image.fromarray(array if array.shape[2] > 1 else array[:, :, 0], mode=mode), metadata)
+
+    def to_numpy(self) -> "np.ndarray":
+        """
+        The pixels as a (H, W) or (H, W, C) numpy array.
+
+        The array given to from_numpy is returned as long as it shares its memory with the pixels
+        (no copy). Otherwise the pixels are copied once into a read-only array, use .copy() to modify it.
+        The 1 and P modes are converted to L and RGB (or RGBA).
+
+        Returns:
+            np.ndarray: The pixels
+        """
+        np = _numpy()
+        pixels = self._decoded()
+        # Pillow copies the pixels when the image is modified
+        if self._array is not None and pixels.readonly:
+            return self._array
+        if pixels.mode not in _NUMPY_MODES:
+            pixels = pixels.convert(_numpy_mode(pixels))
+        return np.asarray(pixels)
+
+    #
+    # hashes, to use the images as cache keys and find the duplicates
+    #
+    def content_hash(self) -> str:
+        """
+        Hash of the content of the image (128 bits blake2b, as hex), memoized.
+
+        It is computed over the original encoding when there is one (and image() has not handed out
+        the pixels), without decoding the pixels, and over the raw pixels otherwise : the same picture encoded differently gets different hashes,
+        use perceptual_hash() to compare pictures.
+
+        Returns:
+            str: The hex digest
+        """
+        if self._content_hash is not None:
+            return self._content_hash
+        digest = hashlib.blake2b(digest_size=16)
+        if not self._pixels_may_change():
+            digest.update(f"{self._format}:".encode("utf-8"))
+            digest.update(self.to_buffer(format=None))
+        else:
+            pixels = self._decoded()
+            digest.update(f"{pixels.mode}:{pixels.size}:".encode("utf-8"))
+            digest.update(pixels.tobytes())
+        content_hash = digest.hexdigest()
+        # the hash of the original encoding can't change, the pixels can be edited behind our back
+        if not self._pixels_may_change():
+            self._content_hash = content_hash
+        return content_hash
+
+    def perceptual_hash(self, method: str = "dhash", hash_size: int = 8) -> int:
+        """
+        Perceptual hash of the image, memoized : similar pictures (resized, re-encoded, slightly edited)
+        get hashes at a small hamming distance (see hamming_distance in image_utils).
+
+        The hash is computed on a small thumbnail : a JPEG original is decoded at a reduced scale,
+        and the pixels decoded for the hash are not kept.
+
+        Args:
+            method (str): 'dhash' (difference hash) or 'ahash' (average hash)
+            hash_size (int): The hash has hash_size * hash_size bits
+
+        Returns:
+            int: The hash
+        """
+        key = (method, hash_size)
+        perceptual_hash = self._perceptual_hashes.get(key)
+        if perceptual_hash is None:
+            if method not in PERCEPTUAL_HASHES:
+                raise ValueError(f"Perceptual hash must be one of {tuple(PERCEPTUAL_HASHES)}, not '{method}'.")
+            perceptual_hash = PERCEPTUAL_HASHES[method](self._hash_thumbnail(hash_size), hash_size)
+            if not self._pixels_may_change():
+                self._perceptual_hashes[key] = perceptual_hash
+        return perceptual_hash
+
+    def _hash_thumbnail(self, hash_size: int) -> Image.Image:
+        if self._pixels is not None or self._format is None:
+            return self._decoded()
+        image = Image.open(self._path) if self._path is not None else bytes_to_image(self._encodings[self._format])
+        # only the JPEG decoder can downscale while decoding, a no-op for the other formats
+        image.draft("L", (hash_size * 8, hash_size * 8))
+        return image
+
+    def _set_encoded(self, image_bytes: bytes, mime_type: Optional[str]) -> None:
+        mime_type = mime_type or sniff_mime_type(image_bytes)
+        image_format = _format_of_mime_type(mime_type)
+        if image_format is None:
+            # unknown encoding, decode it now so an invalid image fails early
+            self._pixels = bytes_to_image(image_bytes)
+            self._pixels.load()
+            return
+        self._format = image_format
+        self._encodings[image_format] = image_bytes
+
+    def _set_file(self, path: Path, mime_type: Optional[str]) -> None:
+        with open(path, "rb") as file:
+            # mmap fails on an empty file
+            if path.stat().st_size == 0:
+                raise ValueError(f"'{path}' is empty")
+            mapping = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        image_format = _format_of_mime_type(mime_type)
+        if image_format is None:
+            # let Pillow identify the file, only the header is read
+            with Image.open(path) as image:
+                image_format = image.format
+        self._path = path
+        self._format = image_format
+        self._encodings[image_format] = mapping
+
+    def _detach(self) -> None:
+        """Read the file in memory, before it gets overwritten"""
+        original = self._encodings[self._format]
+        self._encodings[self._format] = bytes(original)
+        original.close()
+        self._path = None
+        if self._pixels is not None and not self._pixels_exposed and getattr(self._pixels, "fp", None) is not None:
+            # the pixels are not loaded yet, decode them from the bytes
+            self._pixels = None
+
+    #
+    # the pixels are decoded lazily, handing them out or replacing them invalidates the encodings
+    #
+    def _decoded(self) -> Image.Image:
+        """The pixels, decoded on first access, for reading only : use image() to edit them"""
+        pixels = self._pixels
+        if pixels is None:
+            if self._path is not None:
+                pixels = Image.open(self._path)
+            else:
+                pixels = bytes_to_image(self._encodings[self._format])
+            self._pixels = pixels
+            _pixel_budget.track(self, pixels)
+        elif _pixel_budget.max_bytes is not None:
+            _pixel_budget.touch(self)
+        return pixels
+
+    @property
+    def _image(self) -> Image.Image:
+        return self.image()
+
+    @_image.setter
+    def _image(self, image: Image.Image) -> None:
+        self.set_image(image)
+
+    def image(self) -> Image.Image:
+        """
+        The Pillow image, decoded on first access.
+
+        The image can be edited in place : from now on, the encodings (the original one included)
+        are computed from the pixels, they follow the edits.
+        """
+        pixels = self._decoded()
+        if not self._pixels_exposed:
+            # the edits live in these pixels only : they are loaded, and never dropped by the budget
+            pixels.load()
+            _pixel_budget.forget(self)
+            self._pixels_exposed = True
+            self._drop_derived()
+        return pixels
+
+    def set_image(self, image: Image.Image) -> None:
+        """Replace the pixels, the original encoding is dropped"""
+        # the pixels can't be decoded again, they are not subject to the budget anymore
+        _pixel_budget.forget(self)
+        self._pixels = image
+        self._array = None
+        self._pixels_exposed = False
+        self._content_hash = None
+        self._perceptual_hashes = {}
+        self._encodings.clear()
+        self._base64.clear()
+        self._format = None
+        self._path = None
+
+    def _drop_pixels(self) -> None:
+        """Drop the decoded pixels, they are decoded again from the original encoding on the next access"""
+        # the pixels handed out by image() may have been edited
+        if self._format is not None and not self._pixels_exposed:
+            self._pixels = None
+
+    def _pixels_may_change(self) -> bool:
+        """True when the caller can edit the pixels : created from pixels (or a numpy array), or handed out by image()"""
+        return self._format is None or self._pixels_exposed
+
+    def _drop_derived(self) -> None:
+        """Drop the cached encodings and hashes, the original encoding is kept but not reused"""
+        self._encodings = {key: value for key, value in self._encodings.items() if key == self._format}
+        self._base64 = {}
+        self._content_hash = None
+        self._perceptual_hashes = {}
+
+    def is_decoded(self) -> bool:
+        """True when the pixels have been decoded"""
+        return self._pixels is not None
+
+    def path(self) -> Optional[Path]:
+        """The file backing the image, None for an image in memory"""
+        return self._path
+
+    def size(self) -> Tuple[int, int]:
+        """The (width, height) of the image, read from the header of the original encoding when not decoded"""
+        if self._pixels is not None or self._format is None:
+            return self._decoded().size
+        if self._path is not None:
+            with Image.open(self._path) as image:
+                return image.size
+        with bytes_to_image(self._encodings[self._format]) as image:
+            return image.size
+
+    def format(self) -> Optional[str]:
+        """The format of the original encoding (e.g. 'PNG', 'JPEG'), None for an image created from pixels"""
+        return self._format
+
+    def mime_type(self) -> str:
+        """The MIME type of the original encoding, 'image/png' (the default encoding) for an image created from pixels"""
+        return Image.MIME.get(self._format, "image/png") if self._format is not None else "image/png"
+
+    def copy(self) -> "ImageMedia":
+        """A copy sharing the encoded bytes (immutable), the decoded pixels are copied"""
+        metadata = dict(self._metadata) if self._metadata is not None else None
+        if self._pixels_may_change():
+            return ImageMedia(self._decoded().copy(), metadata)
+        if self._path is not None:
+            media = ImageMedia(self._path, metadata, mime_type=self.mime_type())
+        else:
+            media = ImageMedia(self._encodings[self._format], metadata, mime_type=self.mime_type())
+        if self._pixels is not None:
+            media._pixels = self._pixels.copy()
+        return media
+
+
+    def _normalize_format(self, format: Optional[str]) -> str:
+        format = (format or self._format or 'PNG').upper()
+        return 'JPEG' if format == 'JPG' else format
 
+    def to_bytes(self, format: Optional[str] = 'PNG') -> bytes:
+        """
+        Encode the image.
+
+        Args:
+            format (Optional[str]): Image format for encoding (default: 'PNG'), None for the original encoding
+
+        Returns:
+            bytes: The encoded image, the original bytes when the format matches (a copy of the
+            file for a file-backed image, use to_buffer() or iter_bytes() to avoid it)
+        """
+        encoded = self.to_buffer(format)
+        return encoded if isinstance(encoded, bytes) else bytes(encoded)
+
+    def to_buffer(self, format: Optional[str] = None) -> Union[bytes, mmap.mmap]:
+        """
+        The encoded image as a bytes-like object, without copying the file of a file-backed image.
+
+        Args:
+            format (Optional[str]): Image format for encoding (default: None, the original encoding)
+
+        Returns:
+            Union[bytes, mmap.mmap]: The encoded bytes, or the read-only memory map of the file
+        """
+        format = self._normalize_format(format)
+        encoded = self._encodings.get(format) if not self._pixels_may_change() else None
+        if encoded is None:
+            # Create an in-memory bytes buffer
+            buffer = BytesIO()
+            # Save the image to the buffer in the specified format
+            self._decoded().save(buffer, format=format)
+            # Get the bytes from the buffer
+            encoded = buffer.getvalue()
+            # pixels that the caller can edit (or shared with a numpy array) are encoded on every call
+            if not self._pixels_may_change():
+                self._encodings[format] = encoded
+        return encoded
+
+    def iter_bytes(self, format: Optional[str] = None, chunk_size: int = 1 << 16) -> Iterator[bytes]:
+        """
+        Stream the encoded image by chunks, for example as the content of an httpx upload.
+
+        The original encoding of a file-backed image is read from the file as the chunks are consumed,
+        without decoding the pixels nor copying the whole file in memory.
+
+        Args:
+            format (Optional[str]): Image format for encoding (default: None, the original encoding)
+            chunk_size (int): Size of the chunks, in bytes
 
-    def to_base64(self, format='PNG') -> str:
+        Returns:
+            Iterator[bytes]: The chunks of the encoded image
+        """
+        encoded = self.to_buffer(format)
+        for start in range(0, len(encoded), chunk_size):
+            yield encoded[start:start + chunk_size]
+
+    def to_base64(self, format: Optional[str] = 'PNG') -> str:
         """
         Convert the image to a base64 encoded string.
 
         Args:
-            format (str): Image format for encoding (default: 'PNG')
+            format (Optional[str]): Image format for encoding (default: 'PNG'), None for the original encoding
 
         Returns:
             str: Base64 encoded string representation of the image
@@ -61,14 +473,15 @@ class ImageMedia(Media):
         Example:
             base64_str = image_media.to_base64('JPEG')
         """
-        # Create an in-memory bytes buffer
-        buffer = BytesIO()
-        # Save the image to the buffer in the specified format
-        self._image.save(buffer, format=format)
-        # Get the bytes from the buffer
-        image_bytes = buffer.getvalue()
-        # Encode the bytes as base64 and decode to a string
-        base64_str = base64.b64encode(image_bytes).decode('utf-8')
+        format = self._normalize_format(format)
+        base64_str = self._base64.get(format) if not self._pixels_may_change() else None
+        if base64_str is None:
+            # Encode the bytes as base64 and decode to a string
+            base64_str = base64.b64encode(self.to_buffer(format)).decode('utf-8')
+            # the base64 of a file is not kept in memory, it's as large as the file,
+            # and the base64 of pixels that can be edited would get stale
+            if not self._pixels_may_change() and (self._path is None or format != self._format):
+                self._base64[format] = base64_str
         return base64_str
 
 
@@ -76,6 +489,10 @@ class ImageMedia(Media):
         """
         Save the image to a file with metadata support.
 
+        When the file format matches the original encoding, and image() has not handed out the pixels,
+        the original bytes are written as is (with the metadata added as PNG text chunks), without
+        re-encoding the image.
+
         Args:
             filepath (str): Path where the image should be saved
 
@@ -83,10 +500,226 @@ class ImageMedia(Media):
             image_media.save_to_file('output.png')
         """
         metadata = self._metadata
-        self._image.load()  # Ensures image is fully loaded
+        if self._path is not None and Path(filepath).resolve() == self._path.resolve():
+            # the mapping of a file can't be read anymore once the file is truncated
+            self._detach()
+        file_format = Image.registered_extensions().get(Path(filepath).suffix.lower())
+        if file_format is not None and file_format == self._format and not self._pixels_exposed:
+            encoded = self._encodings[self._format]
+            if file_format == 'PNG' and metadata:
+                text = _latin1_text(metadata)
+                if text is not None:
+                    encoded = png_add_text(bytes(encoded), text)
+                else:
+                    encoded = None
+            # metadata are only written in the PNG files, like Pillow does
+            if encoded is not None:
+                Path(filepath).write_bytes(encoded)
+                return
+
+        pixels = self._decoded()
+        pixels.load()  # Ensures image is fully loaded
         file_metameta = PngInfo()
         if metadata is not None:
             for key, value in metadata.items():
                 file_metameta.add_text(key, value)
         # save to file
-        self._image.save(filepath, pnginfo=file_metameta)
+        pixels.save(filepath, pnginfo=file_metameta)
+
+
+def stack_images(images: Sequence[ImageMedia], mode: Optional[str] = None) -> "np.ndarray":
+    """
+    Stack images of the same size into a single (N, H, W, C) numpy array, to run vectorized
+    filters across a whole batch.
+
+    Args:
+        images (Sequence[ImageMedia]): The images
+        mode (Optional[str]): Pillow mode of the array (L, RGB, RGBA, I;16, I, F), defaults to the mode of the first image
+
+    Returns:
+        np.ndarray: The pixels of the images, in order
+
+    Raises:
+        ValueError: If there is no image, or they don't have the same size
+
+    Example:
+        batch = stack_images(images)
+        images = unstack_images(np.clip(batch * 1.2, 0, 255).astype(np.uint8))
+    """
+    np = _numpy()
+    if not images:
+        raise ValueError("Expecting at least one image")
+    # read only, the pixels are not handed out
+    first = images[0]._decoded()
+    mode = mode or _numpy_mode(first)
+    dtype, channels = _NUMPY_MODES[mode]
+    width, height = first.size
+    batch = np.empty((len(images), height, width, channels), dtype=dtype)
+    for index, media in enumerate(images):
+        pixels = media._decoded()
+        if pixels.size != (width, height):
+            raise ValueError(f"Image {index} is {pixels.size}, expecting {(width, height)}")
+        if pixels.mode != mode:
+            pixels = pixels.convert(mode)
+        batch[index] = np.asarray(pixels).reshape(height, width, channels)
+    return batch
+
+
+def unstack_images(batch: "np.ndarray", metadata: Optional[Dict[str, Any]] = None) -> List[ImageMedia]:
+    """
+    Split a (N, H, W, C) numpy array into images. The L, RGBA and I;16 images share
+    the memory of the batch (see ImageMedia.from_numpy).
+
+    Args:
+        batch (np.ndarray): The pixels of the images
+        metadata (Optional[Dict[str, Any]]): Metadata associated with each image
+
+    Returns:
+        List[ImageMedia]: The images
+    """
+    if batch.ndim != 4:
+        raise ValueError(f"Expecting a (N, H, W, C) array, not {batch.shape}")
+    return [ImageMedia.from_numpy(pixels, dict(metadata) if metadata is not None else None) for pixels in batch]
+
+
+def _mode_of(dtype: str, channels: int) -> str:
+    for mode, numpy_mode in _NUMPY_MODES.items():
+        if numpy_mode == (dtype, channels):
+            return mode
+    raise ValueError(f"Unsupported array of {dtype} with {channels} channels")
+
+
+def _numpy_mode(image: Image.Image) -> str:
+    """The mode of an image, or the mode it is converted to for numpy"""
+    if image.mode in _NUMPY_MODES:
+        return image.mode
+    if image.mode == "1":
+        return "L"
+    if image.mode.startswith("I;16"):
+        return "I;16"
+    if image.mode == "P":
+        return "RGBA" if "transparency" in image.info else "RGB"
+    return "RGBA" if "A" in image.getbands() else "RGB"
+
+
+class PixelBudget:
+    """
+    Memory budget of the decoded pixels of the ImageMedia.
+
+    When the decoded images take more than max_bytes, the pixels of the least recently used
+    ones are dropped. Only the images keeping their original encoding (created from bytes, base64
+    or a file) are subject to the budget, their pixels are decoded again on the next access.
+    The image being accessed is never dropped, even if it doesn't fit in the budget alone.
+
+    Args:
+        max_bytes (Optional[int]): Budget of the decoded pixels, None for unlimited
+    """
+
+    def __init__(self, max_bytes: Optional[int] = None) -> None:
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        # id of the images, least recently used first
+        self._images: "OrderedDict[int, Tuple[weakref.ref, int]]" = OrderedDict()
+        self._used = 0
+
+    def used(self) -> int:
+        """Bytes of decoded pixels currently tracked"""
+        with self._lock:
+            return self._used
+
+    def track(self, media: ImageMedia, pixels: Image.Image) -> None:
+        """Record the pixels decoded by an image, and drop other pixels if the budget is exceeded"""
+        if self.max_bytes is None or media.format() is None:
+            return
+        with self._lock:
+            self._remove(id(media))
+            self._images[id(media)] = (weakref.ref(media), image_nbytes(pixels))
+            self._used += self._images[id(media)][1]
+            victims = self._evict()
+        for victim in victims:
+            victim._drop_pixels()
+
+    def touch(self, media: ImageMedia) -> None:
+        with self._lock:
+            if id(media) in self._images:
+                self._images.move_to_end(id(media))
+
+    def forget(self, media: ImageMedia) -> None:
+        with self._lock:
+            self._remove(id(media))
+
+    def resize(self, max_bytes: Optional[int]) -> None:
+        """Change the budget, dropping the pixels above the new one"""
+        with self._lock:
+            self.max_bytes = max_bytes
+            if max_bytes is None:
+                self._images.clear()
+                self._used = 0
+                return
+            victims = self._evict(keep_last=False)
+        for victim in victims:
+            victim._drop_pixels()
+
+    def _remove(self, key: int) -> None:
+        entry = self._images.pop(key, None)
+        if entry is not None:
+            self._used -= entry[1]
+
+    def _evict(self, keep_last: bool = True) -> list:
+        victims = []
+        while self._used > self.max_bytes and len(self._images) > (1 if keep_last else 0):
+            _, (reference, size) = self._images.popitem(last=False)
+            self._used -= size
+            # the garbage collected images are only removed here
+            media = reference()
+            if media is not None:
+                victims.append(media)
+        if victims:
+            logger.debug("pixel budget exceeded, dropping the pixels of %d images", len(victims))
+        return victims
+
+
+_pixel_budget = PixelBudget()
+
+
+def set_pixel_budget(max_bytes: Optional[int]) -> None:
+    """
+    Set the memory budget of the decoded pixels, shared by all the ImageMedia.
+
+    Args:
+        max_bytes (Optional[int]): Budget in bytes, None for unlimited (the default)
+
+    Example:
+        # keep at most 2 GB of decoded pixels
+        set_pixel_budget(2 << 30)
+    """
+    _pixel_budget.resize(max_bytes)
+
+
+def pixel_budget() -> PixelBudget:
+    """The memory budget of the decoded pixels"""
+    return _pixel_budget
+
+
+def _format_of_mime_type(mime_type: Optional[str]) -> Optional[str]:
+    if mime_type is None:
+        return None
+    # make sure all the Pillow plugins (and their MIME types) are registered
+    Image.init()
+    for image_format, format_mime_type in Image.MIME.items():
+        if format_mime_type == mime_type:
+            return image_format
+    return None
+
+
+def _latin1_text(metadata: Dict[str, Any]) -> Optional[Dict[str, str]]:
+    """The metadata as tEXt chunks, None when they need Pillow (iTXt chunks, non string values)"""
+    try:
+        for key, value in metadata.items():
+            if not isinstance(key, str) or not isinstance(value, str):
+                return None
+            key.encode('latin-1')
+            value.encode('latin-1')
+    except UnicodeEncodeError:
+        return None
+    return metadata
@@ -0,0 +1,304 @@
+import os
+import json
+import logging
+import threading
+from io import BytesIO
+from pathlib import Path
+from dataclasses import dataclass, replace
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from typing import Any, Dict, List, Optional, Union
+from PIL import Image
+from PIL.PngImagePlugin import PngInfo
+
+from .image_media import ImageMedia, _latin1_text
+from ..utils.image_utils import bytes_to_image, png_add_text
+
+logger = logging.getLogger(__name__)
+logger.addHandler(logging.NullHandler())
+
+"""
+background persistence of the images
+
+Encoding a large PNG with the default zlib level takes longer than generating it on a local
+platform. The ImageSink encodes and writes the images in a pool of workers, so the generation
+loop only pays for queueing them.
+"""
+
+SINK_FORMATS = ("PNG", "WEBP", "JPEG")
+
+# EXIF tags of the metadata written in the JPEG and WEBP files, the other keys go to UserComment as JSON
+_EXIF_TAGS = {
+    "software": 0x0131,
+    "description": 0x010E,
+    "artist": 0x013B,
+    "author": 0x013B,
+    "copyright": 0x8298,
+}
+_EXIF_IFD = 0x8769
+_EXIF_USER_COMMENT = 0x9286
+
+
+@dataclass(frozen=True)
+class SaveOptions:
+    """
+    Encoding of the saved images.
+
+    Attributes:
+        format (Optional[str]): PNG, WEBP or JPEG, None to use the extension of the file (PNG if unknown)
+        png_compress_level (int): zlib level of the PNG files, 0 (fastest) to 9 (smallest)
+        webp_lossless (bool): Lossless WEBP, the quality is then the compression effort
+        quality (int): Quality of the JPEG and lossy WEBP files, 1 to 100
+    """
+    format: Optional[str] = None
+    png_compress_level: int = 1
+    webp_lossless: bool = True
+    quality: int = 90
+
+    def __post_init__(self) -> None:
+        if self.format is not None:
+            format = self.format.upper()
+            format = "JPEG" if format == "JPG" else format
+            if format not in SINK_FORMATS:
+                raise ValueError(f"Format must be one of {SINK_FORMATS}, not '{self.format}'.")
+            object.__setattr__(self, "format", format)
+        if not 0 <= self.png_compress_level <= 9:
+            raise ValueError("png_compress_level must be between 0 and 9")
+
+    def format_of(self, filepath: Union[str, Path]) -> str:
+        """The format used to write filepath"""
+        if self.format is not None:
+            return self.format
+        format = Image.registered_extensions().get(Path(filepath).suffix.lower())
+        return format if format in SINK_FORMATS else "PNG"
+
+
+def encode_image(image: Union[bytes, Image.Image], original_format: Optional[str], metadata: Optional[Dict[str, Any]],
+                 format: str, options: SaveOptions) -> bytes:
+    """
+    Encode an image with its metadata.
+
+    An original encoding in the requested format is kept as is (the PNG metadata are added as text chunks).
+
+    Args:
+        image (Union[bytes, Image.Image]): The original encoding of the image, or its pixels
+        original_format (Optional[str]): Format of the original encoding, None for pixels
+        metadata (Optional[Dict[str, Any]]): Metadata written in the file
+        format (str): PNG, WEBP or JPEG
+        options (SaveOptions): Encoding options
+
+    Returns:
+        bytes: The encoded file
+    """
+    if isinstance(image, bytes) and original_format == format:
+        if not metadata:
+            return image
+        if format == "PNG" and _latin1_text(metadata) is not None:
+            return png_add_text(image, metadata)
+    pixels = bytes_to_image(image) if isinstance(image, bytes) else image
+
+    buffer = BytesIO()
+    if format == "PNG":
+        pnginfo = PngInfo()
+        for key, value in (metadata or {}).items():
+            pnginfo.add_text(key, str(value))
+        pixels.save(buffer, format="PNG", compress_level=options.png_compress_level, pnginfo=pnginfo)
+    else:
+        params: Dict[str, Any] = {"quality": options.quality}
+        if format == "JPEG" and pixels.mode not in ("RGB", "L", "CMYK"):
+            pixels = pixels.convert("RGB")
+        if format == "WEBP":
+            params["lossless"] = options.webp_lossless
+        if metadata:
+            params["exif"] = _exif(metadata)
+        pixels.save(buffer, format=format, **params)
+    return buffer.getvalue()
+
+
+def write_image(media: ImageMedia, filepath: Union[str, Path], options: Optional[SaveOptions] = None) -> int:
+    """
+    Encode and write an image, on the calling thread.
+
+    Returns:
+        int: The number of bytes written
+    """
+    options = options or SaveOptions()
+    return _write(_payload(media), media.format(), media._metadata, str(filepath), options)
+
+
+@dataclass
+class ImageSinkStats:
+    """
+    Statistics of an ImageSink.
+
+    Attributes:
+        submitted (int): Number of images submitted
+        written (int): Number of files written
+        failed (int): Number of failed writes
+        bytes_written (int): Size of the written files
+        pending (int): Images queued or being written
+    """
+    submitted: int = 0
+    written: int = 0
+    failed: int = 0
+    bytes_written: int = 0
+    pending: int = 0
+
+
+class ImageSink:
+    """
+    Asynchronous writer of images.
+
+    The images are encoded and written by a pool of workers (threads by default, Pillow releases
+    the GIL while compressing, or processes). The queue is bounded : submit() only blocks when
+    max_queue images are already waiting, so a slow disk slows down the generation instead of
+    filling the memory. Each file is written to a temporary file first, then renamed.
+
+    Args:
+        options (Optional[SaveOptions]): Default encoding options
+        max_workers (int): Number of workers
+        max_queue (int): Maximum number of images queued or being written
+        processes (bool): Use a process pool instead of threads
+
+    Example:
+        with ImageSink(options=SaveOptions(format="WEBP")) as sink:
+            for index in range(100):
+                image = platform.text2image(model="flux-1-schnell", prompt=prompt)
+                sink.submit(image, f"output/{index}.webp")
+    """
+
+    def __init__(self, options: Optional[SaveOptions] = None, max_workers: int = 2, max_queue: int = 16,
+                 processes: bool = False) -> None:
+        if max_queue < 1:
+            raise ValueError("max_queue must be at least 1")
+        self._options = options or SaveOptions()
+        self._executor: Executor = ProcessPoolExecutor(max_workers=max_workers) if processes \
+            else ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="polymage-sink")
+        self._slots = threading.BoundedSemaphore(max_queue)
+        self._lock = threading.Lock()
+        self._pending: set = set()
+        self._errors: List[BaseException] = []
+        self._stats = ImageSinkStats()
+        self._closed = False
+
+    def submit(self, media: ImageMedia, filepath: Union[str, Path], options: Optional[SaveOptions] = None) -> Future:
+        """
+        Queue an image to be written.
+
+        Args:
+            media (ImageMedia): The image, with its metadata
+            filepath (Union[str, Path]): Path of the file
+            options (Optional[SaveOptions]): Encoding options, the options of the sink by default
+
+        Returns:
+            Future: Resolved with the number of bytes written
+        """
+        if self._closed:
+            raise RuntimeError("The image sink is closed")
+        options = options or self._options
+        # the original encoding is captured now, the pixels of an image without encoding
+        # are shared with the worker thread : don't modify them before the write is done
+        payload = _payload(media)
+        metadata = dict(media._metadata) if media._metadata is not None else None
+        self._slots.acquire()
+        try:
+            future = self._executor.submit(_write, payload, media.format(), metadata, str(filepath), options)
+        except BaseException:
+            self._slots.release()
+            raise
+        with self._lock:
+            self._stats.submitted += 1
+            self._pending.add(future)
+        future.add_done_callback(lambda done: self._done(done, filepath))
+        return future
+
+    def _done(self, future: Future, filepath: Union[str, Path]) -> None:
+        self._slots.release()
+        with self._lock:
+            self._pending.discard(future)
+            if future.cancelled():
+                return
+            error = future.exception()
+            if error is None:
+                self._stats.written += 1
+                self._stats.bytes_written += future.result()
+            else:
+                self._stats.failed += 1
+                self._errors.append(error)
+        if error is not None:
+            logger.error("Failed to write %s: %s", filepath, error)
+
+    def stats(self) -> ImageSinkStats:
+        """A snapshot of the sink statistics"""
+        with self._lock:
+            return replace(self._stats, pending=len(self._pending))
+
+    def flush(self, timeout: Optional[float] = None) -> None:
+        """
+        Wait until the images submitted so far are written.
+
+        Raises:
+            TimeoutError: If the images are not written within timeout seconds
+            Exception: The first error raised by the writes failed since the last flush
+        """
+        with self._lock:
+            pending = list(self._pending)
+        _, not_done = wait(pending, timeout=timeout)
+        if not_done:
+            raise TimeoutError(f"{len(not_done)} images are still being written")
+        with self._lock:
+            errors, self._errors = self._errors, []
+        if errors:
+            raise errors[0]
+
+    def close(self, wait: bool = True) -> None:
+        """Write the queued images (unless wait is False) and stop the workers"""
+        if self._closed:
+            return
+        self._closed = True
+        try:
+            if wait:
+                self.flush()
+        finally:
+            self._executor.shutdown(wait=wait, cancel_futures=not wait)
+
+    def __enter__(self) -> "ImageSink":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.close()
+
+
+def _payload(media: ImageMedia) -> Union[bytes, Image.Image]:
+    """The original encoding of an image, or its pixels : cheap to send to a worker process"""
+    if media.format() is not None:
+        return media.to_bytes(format=None)
+    return media.image()
+
+
+def _write(image: Union[bytes, Image.Image], original_format: Optional[str], metadata: Optional[Dict[str, Any]],
+           filepath: str, options: SaveOptions) -> int:
+    encoded = encode_image(image, original_format, metadata, options.format_of(filepath), options)
+    path = Path(filepath)
+    temporary = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    try:
+        temporary.write_bytes(encoded)
+        os.replace(temporary, path)
+    except BaseException:
+        temporary.unlink(missing_ok=True)
+        raise
+    return len(encoded)
+
+
+def _exif(metadata: Dict[str, Any]) -> Image.Exif:
+    exif = Image.Exif()
+    others = {}
+    for key, value in metadata.items():
+        tag = _EXIF_TAGS.get(str(key).lower())
+        if tag is not None and tag not in exif:
+            exif[tag] = str(value)
+        else:
+            others[key] = value
+    if others:
+        comment = json.dumps(others, default=str)
+        exif.get_ifd(_EXIF_IFD)[_EXIF_USER_COMMENT] = b"ASCII\0\0\0" + comment.encode("ascii")
+    return exif
@@ -0,0 +1,163 @@
+import mmap
+import base64
+import logging
+from io import BytesIO
+from dataclasses import dataclass
+from typing import Any, Dict, Optional, Tuple, Union
+from PIL import Image
+
+from .image_media import ImageMedia
+from ..utils.image_utils import bytes_to_image
+
+logger = logging.getLogger(__name__)
+logger.addHandler(logging.NullHandler())
+
+"""
+encoding of the images uploaded to the vision models
+
+A vision model only looks at about one megapixel, sending it a full resolution lossless PNG
+wastes the upload bandwidth. The policy is declared per model, in the platform_params of the YAML files :
+
+    platform_params:
+      upload_encoding:
+        max_long_edge: 1024
+        format: JPEG
+        quality: 85
+"""
+
+# formats that can be sent to the vision models
+UPLOAD_FORMATS = ("JPEG", "WEBP", "PNG")
+# encodings accepted by the vision APIs (OpenAI, Groq, Together...) : the other originals are sent as PNG
+ACCEPTED_MIME_TYPES = ("image/png", "image/jpeg", "image/webp", "image/gif")
+
+
+def default_upload(image: ImageMedia) -> Tuple[Union[bytes, mmap.mmap], str]:
+    """
+    The encoding of an image sent without policy : its original encoding when the vision APIs
+    accept it, PNG otherwise.
+
+    Returns:
+        Tuple[Union[bytes, mmap.mmap], str]: The encoded image and its MIME type
+    """
+    if _accepted(image):
+        return image.to_buffer(format=None), image.mime_type()
+    return image.to_buffer(format="PNG"), "image/png"
+
+
+@dataclass(frozen=True)
+class UploadEncoding:
+    """
+    Upload encoding policy of a model.
+
+    Attributes:
+        max_long_edge (Optional[int]): The images are downscaled to fit this size, None to keep the resolution
+        format (str): Preferred upload format, JPEG, WEBP or PNG
+        quality (int): Quality of the lossy formats, 1 to 100
+    """
+    max_long_edge: Optional[int] = None
+    format: str = "JPEG"
+    quality: int = 85
+
+    def __post_init__(self) -> None:
+        if self.format.upper() not in UPLOAD_FORMATS:
+            raise ValueError(f"Upload format must be one of {UPLOAD_FORMATS}, not '{self.format}'.")
+        object.__setattr__(self, "format", self.format.upper())
+
+    @classmethod
+    def from_dict(cls, params: Dict[str, Any]) -> "UploadEncoding":
+        return cls(
+            max_long_edge=params.get("max_long_edge"),
+            format=params.get("format", "JPEG"),
+            quality=params.get("quality", 85),
+        )
+
+    def encode(self, image: ImageMedia) -> "EncodedUpload":
+        """
+        Encode an image with the policy.
+
+        The original encoding is sent as is when it already matches the policy,
+        or when the re-encoded image would be bigger (if the vision APIs accept it).
+        The savings are measured against the upload without policy, see default_upload.
+        """
+        # the original encoding of a file-backed image is not copied
+        original = image.to_buffer(format=None) if _accepted(image) else None
+
+        fits = self.max_long_edge is None or max(image.size()) <= self.max_long_edge
+        if original is not None and fits and image.format() == self.format:
+            return EncodedUpload(original, image.mime_type(), len(original), passthrough=True)
+
+        pixels = image._decoded()
+        if not fits:
+            if image.format() == "JPEG":
+                # let the JPEG decoder downscale, much faster than decoding the full image
+                pixels = Image.open(image.path()) if image.path() is not None else bytes_to_image(original)
+                pixels.draft("RGB", _fit(pixels.size, self.max_long_edge))
+            else:
+                pixels = pixels.copy()
+            pixels.thumbnail((self.max_long_edge, self.max_long_edge), Image.LANCZOS)
+        if self.format == "JPEG" and pixels.mode != "RGB":
+            pixels = pixels.convert("RGB")
+
+        buffer = BytesIO()
+        if self.format == "PNG":
+            pixels.save(buffer, format="PNG")
+        else:
+            pixels.save(buffer, format=self.format, quality=self.quality)
+        encoded = buffer.getvalue()
+
+        if original is not None:
+            if fits and len(encoded) >= len(original):
+                return EncodedUpload(original, image.mime_type(), len(original), passthrough=True)
+            return EncodedUpload(encoded, Image.MIME[self.format], len(original))
+        # the PNG sent without policy, already encoded when it is the policy
+        default_size = len(encoded) if fits and self.format == "PNG" else len(image.to_buffer(format="PNG"))
+        return EncodedUpload(encoded, Image.MIME[self.format], default_size)
+
+
+@dataclass(frozen=True)
+class EncodedUpload:
+    """
+    An image encoded for the upload.
+
+    Attributes:
+        data (Union[bytes, mmap.mmap]): The encoded image, the memory map of the file for a file-backed original
+        mime_type (str): Its MIME type
+        original_size (int): Size of the image sent without policy (see default_upload), in bytes
+        passthrough (bool): True when data is the original encoding
+    """
+    data: Union[bytes, mmap.mmap]
+    mime_type: str
+    original_size: int
+    passthrough: bool = False
+
+    @property
+    def bytes_saved(self) -> int:
+        return max(self.original_size - len(self.data), 0)
+
+    def to_data_url(self) -> str:
+        return f"data:{self.mime_type};base64,{base64.b64encode(self.data).decode('utf-8')}"
+
+
+@dataclass
+class UploadStats:
+    """
+    Statistics of the images uploaded by a platform.
+
+    Attributes:
+        images (int): Number of uploaded images
+        bytes_sent (int): Encoded bytes sent (before base64)
+        bytes_saved (int): Bytes saved by the upload encoding policies
+    """
+    images: int = 0
+    bytes_sent: int = 0
+    bytes_saved: int = 0
+
+
+def _accepted(image: ImageMedia) -> bool:
+    return image.format() is not None and image.mime_type() in ACCEPTED_MIME_TYPES
+
+
+def _fit(size: Tuple[int, int], max_long_edge: int) -> Tuple[int, int]:
+    width, height = size
+    scale = max_long_edge / max(width, height)
+    return max(int(width * scale), 1), max(int(height * scale), 1)
@@ -1,21 +1,56 @@
-import yaml
 from abc import ABC, abstractmethod
-from typing import Dict, List, Any
+from typing import TYPE_CHECKING, Dict, List, Any, Mapping, Optional, Sequence, Tuple, Type
+
+from .params_schema import compile_params_schema, validate_params
+from ..utils.frozen_dict import FrozenDict, freeze
+
+if TYPE_CHECKING:
+    from pydantic import BaseModel
+
 
 class Model(ABC):
+    """
+    A model served by a platform.
+
+    A model is immutable : the registry shares the same instance with every call, without copying it.
+    The parameters are read-only mappings, params() builds the parameters of a call.
+    """
+    __slots__ = ("_name", "_internal_name", "_capabilities", "_default_params", "_platform_params", "_schema")
+
     _name: str
     _internal_name: str
-    _capabilities: List[str]
-    _default_params: Dict[str, Any]
-    _platform_params: Dict[str, Any]
-
-    def __init__(self, name: str="", internal_name: str="", capabilities: List[str]=[], default_params: Dict[str, Any]={}, platform_params: Dict[str, Any]={} ) -> None:
-        self._name = name
-        self._internal_name = internal_name
-        self._capabilities = capabilities
-        self._default_params = default_params
+    _capabilities: Tuple[str, ...]
+    _default_params: FrozenDict
+    _platform_params: FrozenDict
+
+    def __init__(self, name: str="", internal_name: str="", capabilities: Sequence[str]=(), default_params: Optional[Mapping[str, Any]]=None, platform_params: Optional[Mapping[str, Any]]=None ) -> None:
+        object.__setattr__(self, "_name", name)
+        object.__setattr__(self, "_internal_name", internal_name)
+        object.__setattr__(self, "_capabilities", tuple(capabilities))
+        object.__setattr__(self, "_default_params", _frozen_params(default_params))
         # some platforms (for example cloudfare) use some specific parameters
-        self._platform_params = platform_params
+        object.__setattr__(self, "_platform_params", _frozen_params(platform_params))
+        # parameter schema, compiled on first use
+        object.__setattr__(self, "_schema", None)
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        raise AttributeError(f"{type(self).__name__} is immutable, use replace()")
+
+    def __delattr__(self, name: str) -> None:
+        raise AttributeError(f"{type(self).__name__} is immutable, use replace()")
+
+    # immutable : the copies are the model itself
+    def __copy__(self) -> "Model":
+        return self
+
+    def __deepcopy__(self, memo: Dict[int, Any]) -> "Model":
+        return self
+
+    def __reduce__(self):
+        return self.__class__, (self._name, self._internal_name, self._capabilities, self._default_params, self._platform_params)
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}(name={self._name!r}, internal_name={self._internal_name!r})"
 
     #
     # getters
@@ -26,32 +61,67 @@ class Model(ABC):
     def internal_name(self) -> str:
         return self._internal_name
 
-    def capabilities(self) -> List[str]:
+    def capabilities(self) -> Tuple[str, ...]:
         return self._capabilities
 
-    def default_params(self) -> Dict[str, Any]:
+    def default_params(self) -> FrozenDict:
         return self._default_params
 
-    def platform_params(self) -> Dict[str, Any]:
+    def platform_params(self) -> FrozenDict:
         return self._platform_params
 
-    #
-    # setters
-    #
-    def set_name(self, name: str) -> None:
-        self._name = name.lower()
+    def params(self, **overrides: Any) -> Dict[str, Any]:
+        """
+        The parameters of a call : the default params overlaid with the overrides.
+
+        The result is a new dict, that the caller can complete. The nested values are shared
+        with the model, they are read-only.
+        """
+        return {**self._default_params, **overrides}
 
-    def set_internal_name(self, internal_name: str) -> None:
-        self._internal_name = internal_name.lower()
+    def params_schema(self) -> Type["BaseModel"]:
+        """The schema of the parameters, see params_schema.py"""
+        if self._schema is None:
+            schema = compile_params_schema(self._name, self._default_params, self._platform_params.get("params_schema"))
+            object.__setattr__(self, "_schema", schema)
+        return self._schema
 
-    def set_capabilities(self, capabilities: List[str]) -> None:
-        self._capabilities = capabilities
+    def validate_params(self, overrides: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Validate parameters overriding the default params.
 
-    def set_default_params(self, default_params: Dict[str, Any]) -> None:
-        self._default_params = default_params
+        Returns:
+            Dict[str, Any]: The overrides, coerced to the types of the schema
 
-    def set_platform_params(self, platform_params: Dict[str, Any]) -> None:
-        self._platform_params = platform_params
+        Raises:
+            ValueError: If a parameter has a wrong type or breaks a constraint of the schema
+        """
+        if not overrides:
+            return overrides
+        return validate_params(self.params_schema(), self._name, overrides)
+
+    #
+    # modified copies
+    #
+    def replace(self, **changes: Any) -> "Model":
+        """
+        A copy of the model with some changed attributes.
+
+        Example:
+            model = model.replace(default_params={**model.default_params(), "steps": 4})
+        """
+        attributes = {
+            "name": self._name,
+            "internal_name": self._internal_name,
+            "capabilities": self._capabilities,
+            "default_params": self._default_params,
+            "platform_params": self._platform_params,
+        }
+        unknown = set(changes) - set(attributes)
+        if unknown:
+            raise TypeError(f"Unknown model attributes: {', '.join(sorted(unknown))}")
+        attributes.update(changes)
+        return self.__class__(**attributes)
 
     @classmethod
     def from_dict(cls, dict: Dict[str, Any]):
@@ -68,3 +138,7 @@ class Model(ABC):
         model = cls(model_name, model_internal_name, model_capabilities, model_default_params, model_platform_params)
         return model
 
+
+def _frozen_params(params: Optional[Mapping[str, Any]]) -> FrozenDict:
+    # a FrozenDict is shared as is
+    return freeze(params if isinstance(params, dict) else dict(params or {}))
@@ -0,0 +1,88 @@
+from typing import TYPE_CHECKING, Any, Dict, Literal, Mapping, Optional, Tuple, Type
+
+if TYPE_CHECKING:
+    from pydantic import BaseModel
+
+"""
+parameter schema of the models
+
+The type of each parameter is the type of its default value. Constraints can be added, and
+parameters without default declared, in the params_schema of the platform_params :
+
+    platform_params:
+      params_schema:
+        steps: {ge: 1, le: 50}
+        width: {type: int, multiple_of: 64}
+        sampler: {choices: [DPM++ 2M Trailing, Euler A Trailing]}
+
+The schema is compiled once per model, only the overridden parameters are validated.
+pydantic is imported on the first compilation, it is not needed to import the registry.
+"""
+
+# types of the declared parameters
+_TYPES: Dict[str, Any] = {"int": int, "float": float, "bool": bool, "str": str, "list": list, "dict": dict}
+# constraints passed to pydantic Field
+_CONSTRAINTS = ("ge", "gt", "le", "lt", "multiple_of", "min_length", "max_length")
+
+
+def compile_params_schema(model_name: str, default_params: Mapping[str, Any],
+                          declared: Optional[Mapping[str, Mapping[str, Any]]] = None) -> Type["BaseModel"]:
+    """
+    Build the pydantic model validating the parameters of a model.
+
+    Args:
+        model_name (str): Name of the model, used in the error messages
+        default_params (Mapping[str, Any]): The default params of the model
+        declared (Optional[Mapping[str, Mapping[str, Any]]]): The params_schema of the model
+
+    Returns:
+        Type[BaseModel]: The schema, all its fields are optional
+    """
+    from pydantic import ConfigDict, Field, create_model
+
+    declared = declared or {}
+    fields: Dict[str, Tuple[Any, Any]] = {}
+    for name in {*default_params, *declared}:
+        spec = declared.get(name, {})
+        if "choices" in spec:
+            annotation = Literal[tuple(spec["choices"])]
+        elif "type" in spec:
+            if spec["type"] not in _TYPES:
+                raise ValueError(f"Unknown type '{spec['type']}' of the parameter '{name}' of model '{model_name}'")
+            annotation = _TYPES[spec["type"]]
+        else:
+            annotation = _annotation(default_params.get(name))
+        constraints = {key: spec[key] for key in _CONSTRAINTS if key in spec}
+        fields[name] = (Optional[annotation], Field(None, **constraints))
+    return create_model(f"{_class_name(model_name)}Params", __config__=ConfigDict(extra="ignore"), **fields)
+
+
+def validate_params(schema: Type["BaseModel"], model_name: str, params: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Validate the parameters known by the schema, the others are returned as is.
+
+    Raises:
+        ValueError: If a parameter has a wrong type or breaks a constraint
+    """
+    from pydantic import ValidationError
+
+    known = {name: value for name, value in params.items() if name in schema.model_fields}
+    if not known:
+        return params
+    try:
+        validated = schema.model_validate(known)
+    except ValidationError as e:
+        raise ValueError(f"Invalid parameters for model '{model_name}': {e}") from e
+    return {**params, **{name: getattr(validated, name) for name in known}}
+
+
+def _annotation(default: Any) -> Any:
+    # bool before int, bool is a subclass of int
+    for kind in (bool, int, float, str):
+        if isinstance(default, kind):
+            return kind
+    return Any
+
+
+def _class_name(model_name: str) -> str:
+    return "".join(part.capitalize() for part in model_name.replace("_", "-").replace(".", "-").split("-")) or "Model"
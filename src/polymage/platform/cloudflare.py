@@ -1,17 +1,22 @@
 import random
+import asyncio
 import logging
-import requests
-from typing import Any, List
+import httpx
+from typing import Any, AsyncIterable, Iterable, List, Dict, Tuple
 from pydantic import BaseModel
 from PIL import Image
 
 from .platform import Platform
 from ..model.model import Model
 from ..media.image_media import ImageMedia
+from ..utils.json_stream import decode_json_base64, adecode_json_base64
 
 logger = logging.getLogger(__name__)
 logger.addHandler(logging.NullHandler())
 
+# the base64 output_type returns the image in result.image
+IMAGE_PATH = ("result", "image")
+
 """
 Clouflare provide AI workers with some free tier
 
@@ -26,14 +31,14 @@ class CloudflarePlatform(Platform):
 		self._api_id = api_id
 		self._api_key = api_key
 
-	def _text2image(self, model: Model, prompt: str, **kwargs: Any) -> ImageMedia:
+	#
+	# requests are built once, and shared by the sync and async calls
+	#
+	def _text2image_request(self, model: Model, prompt: str, **kwargs: Any) -> Tuple[str, Dict[str, str], Dict[str, Any]]:
 		CLOUDFLARE_ID = self._api_id
 		CLOUDFLARE_TOKEN = self._api_key
 
-		payload = model.default_params()
-		# get output_type from the platform_params
-		platform_params = model.platform_params()
-		output_type = platform_params['output_type']
+		payload = model.params(**kwargs)
 		# add the prompt to the params
 		payload["prompt"] = prompt
 
@@ -42,19 +47,46 @@ class CloudflarePlatform(Platform):
 			'Content-Type': 'application/json',
 			'Authorization': 'Bearer ' + CLOUDFLARE_TOKEN
 		}
-		data = payload
+		return url, headers, payload
+
+	#
+	# the responses are streamed : a base64 image is decoded as it is received
+	#
+	def _image_data(self, response: httpx.Response, chunks: Iterable[bytes], model: Model) -> bytes:
+		response.raise_for_status()  # Raise an exception for HTTP errors
+		# get output_type from the platform_params
+		output_type = model.platform_params()['output_type']
+		if output_type == "bytes":
+			# image is returned as binary
+			return b"".join(chunks)
+		# image is returned as base64
+		_, images = decode_json_base64(chunks, [IMAGE_PATH])
+		return _first_image(images)
+
+	async def _aimage_data(self, response: httpx.Response, chunks: AsyncIterable[bytes], model: Model) -> bytes:
+		response.raise_for_status()
+		output_type = model.platform_params()['output_type']
+		if output_type == "bytes":
+			return b"".join([chunk async for chunk in chunks])
+		_, images = await adecode_json_base64(chunks, [IMAGE_PATH])
+		return _first_image(images)
+
+	def _text2image(self, model: Model, prompt: str, **kwargs: Any) -> ImageMedia:
+		url, headers, data = self._text2image_request(model, prompt, **kwargs)
 		try:
-			response = requests.post(url, headers=headers, json=data)
-			response.raise_for_status()  # Raise an exception for HTTP errors
-			if output_type == "bytes":
-				# image is returned as binary
-				image_data = response.content
-				return ImageMedia(image_data,{'Software': f"{self.platform_name()}/{model.name()}", 'Description': prompt})
-			else:
-				# image is returned as base64
-				result = response.json()
-				image_data = result['result']['image']
-				return ImageMedia(image_data,{'Software': f"{self.platform_name()}/{model.name()}", 'Description': prompt})
+			with self._http_client().stream("POST", url, headers=headers, json=data) as response:
+				image_data = self._image_data(response, response.iter_bytes(), model)
+			return ImageMedia(image_data, {'Software': f"{self.platform_name()}/{model.name()}", 'Description': prompt})
+		except Exception:
+			logging.error("API call failed", exc_info=True)
+			raise
+
+	async def _atext2image(self, model: Model, prompt: str, **kwargs: Any) -> ImageMedia:
+		url, headers, data = self._text2image_request(model, prompt, **kwargs)
+		try:
+			async with self._async_http_client().stream("POST", url, headers=headers, json=data) as response:
+				image_data = await self._aimage_data(response, response.aiter_bytes(), model)
+			return ImageMedia(image_data, {'Software': f"{self.platform_name()}/{model.name()}", 'Description': prompt})
 		except Exception:
 			logging.error("API call failed", exc_info=True)
 			raise
@@ -78,3 +110,9 @@ class CloudflarePlatform(Platform):
 	def _image2data(self, model: str, response_model: BaseModel, prompt: str, image: Image.Image, **kwargs: Any) -> Any:
 		"""Not supported"""
 		pass
+
+
+def _first_image(images: List[bytes]) -> bytes:
+	if not images:
+		raise ValueError("The response doesn't contain any image")
+	return images[0]
@@ -1,45 +1,133 @@
+import asyncio
 import logging
-import requests
-from typing import List, Any
+import threading
+import httpx
+from dataclasses import dataclass
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Any, Callable, Dict, Tuple, Optional, Sequence
 from pydantic import BaseModel
 from PIL import Image
 
 from .platform import Platform
+from .generation_handle import GenerationHandle, AsyncGenerationHandle, GenerationProgress, GenerationCancelled, DEFAULT_POLL_INTERVAL
 from ..model.model import Model
 from ..utils.image_utils import fit_to_nearest_aspect_ratio
+from ..utils.json_stream import decode_json_base64, adecode_json_base64
 from ..media.image_media import ImageMedia
 
 logger = logging.getLogger(__name__)
 logger.addHandler(logging.NullHandler())
 
+# the sdapi responses carry the generated images as base64 strings in the images array
+IMAGES_PATH = ("images", None)
+# images rendered at once when the model doesn't set max_batch_size in its platform_params
+DEFAULT_MAX_BATCH_SIZE = 4
+
+
+@dataclass(frozen=True)
+class GenerationRequest:
+    """
+    An image to generate with DrawThingsPlatform.text2image_batch.
+
+    Attributes:
+        prompt (str): The prompt
+        seed (int): The seed, -1 for a random one
+    """
+    prompt: str
+    seed: int = -1
+
+
+@dataclass
+class GenerationBatch:
+    """
+    A txt2img call rendering several requests : the i-th image of the batch uses seed + i
+    (or a random seed when seed is -1).
+
+    Attributes:
+        prompt (str): The prompt shared by the requests
+        seed (int): Seed of the first image
+        indices (List[int]): Positions of the requests rendered by the batch
+    """
+    prompt: str
+    seed: int
+    indices: List[int]
+
+    @property
+    def size(self) -> int:
+        return len(self.indices)
+
+
+def pack_generations(requests: Sequence[GenerationRequest], max_batch_size: int = DEFAULT_MAX_BATCH_SIZE) -> List[GenerationBatch]:
+    """
+    Pack image requests into as few txt2img calls as possible.
+
+    The requests sharing a prompt are rendered together : the random seeds in batches of
+    max_batch_size, the fixed seeds by runs of consecutive values (seeds 7, 8 and 9 are a
+    single batch starting at seed 7).
+
+    Args:
+        requests (Sequence[GenerationRequest]): The images to generate
+        max_batch_size (int): Maximum number of images of a call
+
+    Returns:
+        List[GenerationBatch]: The calls to make
+
+    Example:
+        batches = pack_generations([GenerationRequest("a cat", seed) for seed in (1, 2, 3, 10)])
+        # two batches : seeds 1 to 3, then seed 10
+    """
+    if max_batch_size < 1:
+        raise ValueError("max_batch_size must be at least 1")
+    by_prompt: Dict[str, List[int]] = {}
+    for index, request in enumerate(requests):
+        by_prompt.setdefault(request.prompt, []).append(index)
+
+    batches: List[GenerationBatch] = []
+    for prompt, indices in by_prompt.items():
+        random = [index for index in indices if requests[index].seed == -1]
+        fixed = sorted((index for index in indices if requests[index].seed != -1), key=lambda index: requests[index].seed)
+        for start in range(0, len(random), max_batch_size):
+            batches.append(GenerationBatch(prompt, -1, random[start:start + max_batch_size]))
+        batch = None
+        for index in fixed:
+            seed = requests[index].seed
+            if batch is not None and batch.size < max_batch_size and seed == batch.seed + batch.size:
+                batch.indices.append(index)
+            else:
+                batch = GenerationBatch(prompt, seed, [index])
+                batches.append(batch)
+    return batches
+
 
 class DrawThingsPlatform(Platform):
     def __init__(self, host: str = "127.0.0.1:7860", **kwargs: Any) -> None:
         super().__init__('drawthings', **kwargs)
         self.host = host
+        # the generations started with a handle run one at a time, like the server renders them
+        self._generation_executor: Optional[ThreadPoolExecutor] = None
 
+    def close(self) -> None:
+        with self._clients_lock:
+            executor, self._generation_executor = self._generation_executor, None
+        if executor is not None:
+            executor.shutdown(wait=False)
+        super().close()
 
-    def _text2image(self, model: Model, prompt: str, **kwargs: Any) -> ImageMedia:
-        payload = model.default_params()
+    #
+    # requests are built once, and shared by the sync and async calls
+    #
+    def _txt2img_request(self, model: Model, prompt: str, **kwargs: Any) -> Tuple[str, Dict[str, Any]]:
+        payload = model.params(**kwargs)
         payload["model"] = model.internal_name()
         payload["prompt"] = prompt
-        try:
-            response = requests.post(f"http://{self.host}/sdapi/v1/txt2img", json=payload)
-            response.raise_for_status()
-            json_data = response.json()
-            base64_string = json_data["images"][0]
-            return ImageMedia(base64_string, {'Software': f"{self.platform_name()}/{model.name()}", 'Description': prompt})
-        except Exception:
-            logging.error("API call failed", exc_info=True)
-            raise
-
+        return f"http://{self.host}/sdapi/v1/txt2img", payload
 
-    def _image2image(self, model: Model, prompt: str, media: ImageMedia, **kwargs: Any) -> ImageMedia:
-        payload = model.default_params()
+    def _img2img_request(self, model: Model, prompt: str, media: ImageMedia, **kwargs: Any) -> Tuple[str, Dict[str, Any]]:
+        payload = model.params(**kwargs)
         payload["model"] = model.internal_name()
         payload["prompt"] = prompt
         # for image2image it's better to fit the to the nearest aspect ratio
-        media._image = fit_to_nearest_aspect_ratio(media._image)
+        media._image = fit_to_nearest_aspect_ratio(media._decoded())
         # and we need to pass the image size
         width, height = media._image.size
         payload["width"] = width
@@ -47,13 +135,238 @@ class DrawThingsPlatform(Platform):
         # convert the image to base64
         base64_image = media.to_base64()
         payload["init_images"] = [base64_image]
+        return f"http://{self.host}/sdapi/v1/img2img", payload
 
-        try:
-            response = requests.post(f"http://{self.host}/sdapi/v1/img2img", json=payload)
+    #
+    # the responses are streamed : the base64 images are decoded as they are received,
+    # without holding the whole body, the parsed string and the decoded bytes at once
+    #
+    def _post_images(self, url: str, payload: Dict[str, Any]) -> List[bytes]:
+        with self._http_client().stream("POST", url, json=payload) as response:
             response.raise_for_status()
-            json_data = response.json()
-            base64_string = json_data["images"][0]
-            return ImageMedia(base64_string, {'Software': f"{self.platform_name()}/{model.name()}"})
+            _, images = decode_json_base64(response.iter_bytes(), [IMAGES_PATH])
+        return images
+
+    async def _apost_images(self, url: str, payload: Dict[str, Any]) -> List[bytes]:
+        async with self._async_http_client().stream("POST", url, json=payload) as response:
+            response.raise_for_status()
+            _, images = await adecode_json_base64(response.aiter_bytes(), [IMAGES_PATH])
+        return images
+
+    def _image_from_images(self, images: List[bytes], metadata: Dict[str, Any]) -> ImageMedia:
+        if not images:
+            raise ValueError("The response doesn't contain any image")
+        # the pixels are decoded lazily, from the original encoding
+        return ImageMedia(images[0], metadata)
+
+    def _images_from_images(self, images: List[bytes], count: int, metadata: Dict[str, Any]) -> List[ImageMedia]:
+        if len(images) < count:
+            raise ValueError(f"The response contains {len(images)} images instead of {count}")
+        return [ImageMedia(image, dict(metadata)) for image in images[:count]]
+
+    #
+    # batches : a txt2img call renders batch_size images on the GPU at once, the images
+    # of a call with a fixed seed use the seeds seed, seed + 1, ...
+    #
+    def _batch_calls(self, model: Model, count: int, **kwargs: Any) -> List[Tuple[int, Dict[str, Any]]]:
+        """Split count images in calls of at most max_batch_size images : (size, kwargs) of each call"""
+        max_batch_size = model.platform_params().get("max_batch_size", DEFAULT_MAX_BATCH_SIZE)
+        seed = kwargs.get("seed", model.default_params().get("seed", -1))
+        calls = []
+        for start in range(0, count, max_batch_size):
+            size = min(max_batch_size, count - start)
+            params = {**kwargs, "batch_size": size, "batch_count": 1}
+            if seed is not None and seed != -1:
+                params["seed"] = seed + start
+            calls.append((size, params))
+        return calls
+
+    def _txt2img_batch(self, model: Model, prompt: str, size: int, **kwargs: Any) -> List[ImageMedia]:
+        url, payload = self._txt2img_request(model, prompt, **kwargs)
+        images = self._post_images(url, payload)
+        return self._images_from_images(images, size, {'Software': f"{self.platform_name()}/{model.name()}", 'Description': prompt})
+
+    async def _atxt2img_batch(self, model: Model, prompt: str, size: int, **kwargs: Any) -> List[ImageMedia]:
+        url, payload = self._txt2img_request(model, prompt, **kwargs)
+        images = await self._apost_images(url, payload)
+        return self._images_from_images(images, size, {'Software': f"{self.platform_name()}/{model.name()}", 'Description': prompt})
+
+    def _text2images(self, model: Model, prompt: str, count: int, cancelled: Optional[threading.Event] = None,
+                     **kwargs: Any) -> List[ImageMedia]:
+        result = []
+        for size, params in self._batch_calls(model, count, **kwargs):
+            # a cancelled generation handle doesn't send the remaining batches
+            if cancelled is not None and cancelled.is_set():
+                raise GenerationCancelled("The generation was cancelled")
+            result.extend(self._guarded_call(lambda: self._txt2img_batch(model, prompt, size, **params)))
+        return result
+
+    async def _atext2images(self, model: Model, prompt: str, count: int, **kwargs: Any) -> List[ImageMedia]:
+        # the server renders one batch at a time, the calls are sent one after the other
+        result = []
+        for size, params in self._batch_calls(model, count, **kwargs):
+            result.extend(await self._aguarded_call(lambda: self._atxt2img_batch(model, prompt, size, **params)))
+        return result
+
+    #
+    # generation handles : the generation runs in the background, while its progress is polled
+    # from /sdapi/v1/progress. The server renders one generation at a time, and /sdapi/v1/interrupt
+    # stops the current one : a handle only interrupts the server once its generation is running.
+    #
+    def start_text2image(self, model: str, prompt: str, count: int = 1, timeout: Optional[float] = None,
+                         poll_interval: float = DEFAULT_POLL_INTERVAL, **kwargs: Any) -> GenerationHandle:
+        """
+        Start a text2image generation in the background.
+
+        Args:
+            model: The model identifier to use
+            prompt: The input text prompt
+            count: Number of images to generate
+            timeout: The generation is interrupted after timeout seconds, None to wait as long as needed
+            poll_interval: Seconds between two progress polls
+            **kwargs: Additional sdapi parameters
+
+        Returns:
+            GenerationHandle: Handle of the generation, its result is the list of the generated images
+
+        Example:
+            handle = platform.start_text2image(model="flux-1-schnell", prompt="a lighthouse", timeout=120)
+            for progress in handle.progress(previews=True):
+                progress.preview and progress.preview.save_to_file("preview.png")
+            images = handle.result()
+        """
+        platform_model, kwargs = self._resolve_call(model, kwargs)
+        return self._start(lambda cancelled: self._text2images(platform_model, prompt, count, cancelled, **kwargs),
+                           timeout, poll_interval)
+
+    def start_image2image(self, model: str, prompt: str, media: List[ImageMedia], timeout: Optional[float] = None,
+                          poll_interval: float = DEFAULT_POLL_INTERVAL, **kwargs: Any) -> GenerationHandle:
+        """Start an image2image generation in the background, see start_text2image"""
+        platform_model, kwargs = self._resolve_call(model, kwargs)
+        return self._start(lambda cancelled: [self._guarded_call(lambda: self._image2image(platform_model, prompt, media[0], **kwargs))],
+                           timeout, poll_interval)
+
+    async def astart_text2image(self, model: str, prompt: str, count: int = 1, timeout: Optional[float] = None,
+                                poll_interval: float = DEFAULT_POLL_INTERVAL, **kwargs: Any) -> AsyncGenerationHandle:
+        """Async version of start_text2image, the generation runs in an asyncio task"""
+        platform_model, kwargs = self._resolve_call(model, kwargs)
+        task = asyncio.create_task(self._atext2images(platform_model, prompt, count, **kwargs))
+        return AsyncGenerationHandle(task, self._aprogress, self._ainterrupt, timeout, poll_interval)
+
+    async def astart_image2image(self, model: str, prompt: str, media: List[ImageMedia], timeout: Optional[float] = None,
+                                 poll_interval: float = DEFAULT_POLL_INTERVAL, **kwargs: Any) -> AsyncGenerationHandle:
+        """Async version of start_image2image"""
+        platform_model, kwargs = self._resolve_call(model, kwargs)
+
+        async def generate() -> List[ImageMedia]:
+            return [await self._aguarded_call(lambda: self._aimage2image(platform_model, prompt, media[0], **kwargs))]
+
+        return AsyncGenerationHandle(asyncio.create_task(generate()), self._aprogress, self._ainterrupt, timeout, poll_interval)
+
+    def _start(self, call: Callable[[threading.Event], List[ImageMedia]], timeout: Optional[float], poll_interval: float) -> GenerationHandle:
+        """Run call(cancelled) in the generation worker, cancelled is set when the handle is cancelled"""
+        with self._clients_lock:
+            if self._generation_executor is None:
+                self._generation_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="polymage-drawthings")
+            executor = self._generation_executor
+        cancelled = threading.Event()
+        return GenerationHandle(executor.submit(call, cancelled), self._progress, self._interrupt, timeout, poll_interval, cancelled)
+
+    def _progress_request(self, previews: bool) -> Tuple[str, Dict[str, Any]]:
+        return f"http://{self.host}/sdapi/v1/progress", {"skip_current_image": "false" if previews else "true"}
+
+    def _progress_from_response(self, response: httpx.Response) -> Optional[GenerationProgress]:
+        if response.status_code in (404, 405, 501):
+            # the server doesn't report the progress
+            return None
+        response.raise_for_status()
+        return GenerationProgress.from_sdapi(response.json())
+
+    def _progress(self, previews: bool = False) -> Optional[GenerationProgress]:
+        """Progress of the generation running on the server, None if the server doesn't report it"""
+        url, params = self._progress_request(previews)
+        return self._progress_from_response(self._http_client().get(url, params=params, timeout=self._connect_timeout))
+
+    async def _aprogress(self, previews: bool = False) -> Optional[GenerationProgress]:
+        url, params = self._progress_request(previews)
+        return self._progress_from_response(await self._async_http_client().get(url, params=params, timeout=self._connect_timeout))
+
+    def _interrupt(self) -> None:
+        """Interrupt the generation running on the server"""
+        self._http_client().post(f"http://{self.host}/sdapi/v1/interrupt", timeout=self._connect_timeout).raise_for_status()
+
+    async def _ainterrupt(self) -> None:
+        response = await self._async_http_client().post(f"http://{self.host}/sdapi/v1/interrupt", timeout=self._connect_timeout)
+        response.raise_for_status()
+
+    def text2image_batch(self, model: str, requests: Sequence[GenerationRequest], **kwargs: Any) -> List[ImageMedia]:
+        """
+        Generate the images of several prompts and seeds in as few txt2img calls as possible (see pack_generations).
+
+        Args:
+            model: The model identifier to use
+            requests: The images to generate
+            **kwargs: Additional sdapi parameters, shared by all the images
+
+        Returns:
+            List[ImageMedia]: The images, in the order of the requests
+        """
+        platform_model, kwargs = self._resolve_call(model, kwargs)
+        max_batch_size = platform_model.platform_params().get("max_batch_size", DEFAULT_MAX_BATCH_SIZE)
+        result: List[Optional[ImageMedia]] = [None] * len(requests)
+        for batch in pack_generations(requests, max_batch_size):
+            params = {**kwargs, "seed": batch.seed, "batch_size": batch.size, "batch_count": 1}
+            images = self._guarded_call(lambda: self._txt2img_batch(platform_model, batch.prompt, batch.size, **params))
+            for index, image in zip(batch.indices, images):
+                result[index] = image
+        return result
+
+    async def atext2image_batch(self, model: str, requests: Sequence[GenerationRequest], **kwargs: Any) -> List[ImageMedia]:
+        """Async version of text2image_batch"""
+        platform_model, kwargs = self._resolve_call(model, kwargs)
+        max_batch_size = platform_model.platform_params().get("max_batch_size", DEFAULT_MAX_BATCH_SIZE)
+        result: List[Optional[ImageMedia]] = [None] * len(requests)
+        for batch in pack_generations(requests, max_batch_size):
+            params = {**kwargs, "seed": batch.seed, "batch_size": batch.size, "batch_count": 1}
+            images = await self._aguarded_call(lambda: self._atxt2img_batch(platform_model, batch.prompt, batch.size, **params))
+            for index, image in zip(batch.indices, images):
+                result[index] = image
+        return result
+
+
+    def _text2image(self, model: Model, prompt: str, **kwargs: Any) -> ImageMedia:
+        url, payload = self._txt2img_request(model, prompt, **kwargs)
+        try:
+            images = self._post_images(url, payload)
+            return self._image_from_images(images, {'Software': f"{self.platform_name()}/{model.name()}", 'Description': prompt})
+        except Exception:
+            logging.error("API call failed", exc_info=True)
+            raise
+
+    async def _atext2image(self, model: Model, prompt: str, **kwargs: Any) -> ImageMedia:
+        url, payload = self._txt2img_request(model, prompt, **kwargs)
+        try:
+            images = await self._apost_images(url, payload)
+            return self._image_from_images(images, {'Software': f"{self.platform_name()}/{model.name()}", 'Description': prompt})
+        except Exception:
+            logging.error("API call failed", exc_info=True)
+            raise
+
+
+    def _image2image(self, model: Model, prompt: str, media: ImageMedia, **kwargs: Any) -> ImageMedia:
+        url, payload = self._img2img_request(model, prompt, media, **kwargs)
+        try:
+            images = self._post_images(url, payload)
+            return self._image_from_images(images, {'Software': f"{self.platform_name()}/{model.name()}"})
+        except Exception:
+            logging.error("API call failed", exc_info=True)
+            raise
+
+    async def _aimage2image(self, model: Model, prompt: str, media: ImageMedia, **kwargs: Any) -> ImageMedia:
+        url, payload = await asyncio.to_thread(self._img2img_request, model, prompt, media, **kwargs)
+        try:
+            images = await self._apost_images(url, payload)
+            return self._image_from_images(images, {'Software': f"{self.platform_name()}/{model.name()}"})
         except Exception:
             logging.error("API call failed", exc_info=True)
             raise
@@ -0,0 +1,308 @@
+import time
+import base64
+import asyncio
+import inspect
+import logging
+import threading
+from dataclasses import dataclass
+from concurrent.futures import Future, wait
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Iterator, List, Optional
+
+from ..media.image_media import ImageMedia
+
+logger = logging.getLogger(__name__)
+logger.addHandler(logging.NullHandler())
+
+"""
+handles of the long running image generations
+
+A local generation blocks for tens of seconds. The handle runs it in the background, polls
+the progress endpoint of the server while it runs, and interrupts it on demand or when it
+takes longer than its timeout, so the GPU is freed instead of finishing an abandoned job.
+"""
+
+DEFAULT_POLL_INTERVAL = 0.5
+
+# a failed poll, the polling goes on (a None progress stops it)
+_FAILED = object()
+
+
+class GenerationCancelled(Exception):
+	"""The generation was cancelled"""
+
+
+class GenerationTimeout(TimeoutError):
+	"""The generation took longer than its timeout, it was interrupted"""
+
+
+@dataclass(frozen=True)
+class GenerationProgress:
+	"""
+	Progress of a generation, as reported by the server.
+
+	Attributes:
+		progress (float): Completed fraction, 0.0 to 1.0
+		step (int): Current sampling step
+		steps (int): Number of sampling steps
+		eta (Optional[float]): Estimated remaining time in seconds, None if unknown
+		preview (Optional[ImageMedia]): Low resolution preview of the image being generated
+	"""
+	progress: float
+	step: int = 0
+	steps: int = 0
+	eta: Optional[float] = None
+	preview: Optional[ImageMedia] = None
+
+	@classmethod
+	def from_sdapi(cls, data: Dict[str, Any]) -> "GenerationProgress":
+		"""Parse a response of the sdapi progress endpoint"""
+		state = data.get("state") or {}
+		preview = data.get("current_image")
+		return cls(
+			progress=float(data.get("progress") or 0.0),
+			step=int(state.get("sampling_step") or 0),
+			steps=int(state.get("sampling_steps") or 0),
+			eta=data.get("eta_relative"),
+			preview=ImageMedia(base64.b64decode(preview)) if preview else None,
+		)
+
+	def same_state(self, other: Optional["GenerationProgress"]) -> bool:
+		return other is not None and (self.progress, self.step, self.steps) == (other.progress, other.step, other.steps) \
+			and (self.preview is None) == (other.preview is None)
+
+
+class GenerationHandle:
+	"""
+	A generation running in a worker thread.
+
+	Args:
+		future (Future): The generation, resolved with the generated images
+		poll (Callable[[bool], Optional[GenerationProgress]]): Reads the progress, with a preview
+			if the argument is True. Returns None when the server doesn't report the progress
+		interrupt (Callable[[], None]): Interrupts the generation running on the server
+		timeout (Optional[float]): Maximum duration of the generation in seconds, from its submission
+		poll_interval (float): Seconds between two progress polls
+		cancelled (Optional[threading.Event]): Set when the generation is cancelled or times out, the worker
+			checks it between its server calls so the remaining ones are not sent
+
+	Example:
+		handle = platform.start_text2image(model="flux-1-schnell", prompt=prompt, timeout=60)
+		for progress in handle.progress(previews=True):
+			print(f"step {progress.step}/{progress.steps}")
+		images = handle.result()
+	"""
+
+	def __init__(self, future: Future, poll: Callable[[bool], Optional[GenerationProgress]],
+				 interrupt: Callable[[], None], timeout: Optional[float] = None,
+				 poll_interval: float = DEFAULT_POLL_INTERVAL, cancelled: Optional[threading.Event] = None) -> None:
+		self._future = future
+		self._cancel_event = cancelled if cancelled is not None else threading.Event()
+		self._poll = poll
+		self._interrupt = interrupt
+		self._deadline = time.monotonic() + timeout if timeout is not None else None
+		self._poll_interval = poll_interval
+		self._cancelled = False
+		self._timed_out = False
+
+	def done(self) -> bool:
+		return self._future.done() or self._cancelled
+
+	def cancel(self) -> bool:
+		"""
+		Cancel the generation : a queued generation is dropped, a running one is interrupted on the server.
+
+		Returns:
+			bool: False if the generation was already done
+		"""
+		if self.done():
+			return False
+		self._cancelled = True
+		self._cancel_event.set()
+		if not self._future.cancel():
+			_interrupt(self._interrupt)
+		return True
+
+	def progress(self, previews: bool = False) -> Iterator[GenerationProgress]:
+		"""
+		Yield the progress of the generation until it is done. Nothing is yielded when
+		the server doesn't report the progress.
+
+		Args:
+			previews (bool): Request a low resolution preview of the image at each poll
+
+		Raises:
+			GenerationTimeout: If the generation takes longer than its timeout
+		"""
+		last = None
+		polling = True
+		while not self.done():
+			self._check_deadline()
+			if polling and self._future.running():
+				current = _poll(self._poll, previews)
+				if current is _FAILED:
+					pass
+				elif current is None:
+					polling = False
+				elif not current.same_state(last):
+					last = current
+					yield current
+			wait([self._future], timeout=self._wait_time(self._poll_interval))
+		self._check_deadline()
+
+	def result(self, timeout: Optional[float] = None) -> List[ImageMedia]:
+		"""
+		Wait for the generated images.
+
+		Args:
+			timeout (Optional[float]): Seconds to wait, within the timeout of the generation
+
+		Raises:
+			GenerationCancelled: If the generation was cancelled
+			GenerationTimeout: If the generation takes longer than its timeout (it is interrupted)
+			TimeoutError: If the images are not ready within timeout seconds
+		"""
+		if self._cancelled:
+			raise GenerationCancelled("The generation was cancelled")
+		wait([self._future], timeout=self._wait_time(timeout))
+		if not self._future.done():
+			self._check_deadline()
+			raise TimeoutError("The generation is still running")
+		return self._future.result()
+
+	def _wait_time(self, timeout: Optional[float]) -> Optional[float]:
+		if self._deadline is None:
+			return timeout
+		remaining = max(self._deadline - time.monotonic(), 0.0)
+		return remaining if timeout is None else min(timeout, remaining)
+
+	def _check_deadline(self) -> None:
+		if self._timed_out or (self._deadline is not None and time.monotonic() >= self._deadline and not self._future.done()):
+			if not self._timed_out:
+				logger.warning("Generation timed out, interrupting it")
+				self._timed_out = True
+				self.cancel()
+			raise GenerationTimeout("The generation took longer than its timeout")
+		if self._cancelled:
+			raise GenerationCancelled("The generation was cancelled")
+
+
+class AsyncGenerationHandle:
+	"""
+	Async version of GenerationHandle, the generation runs in an asyncio task.
+
+	Example:
+		handle = await platform.astart_text2image(model="flux-1-schnell", prompt=prompt, timeout=60)
+		async for progress in handle.progress():
+			print(f"{progress.progress:.0%}")
+		images = await handle.result()
+	"""
+
+	def __init__(self, task: "asyncio.Task[List[ImageMedia]]", poll: Callable[[bool], Awaitable[Optional[GenerationProgress]]],
+				 interrupt: Callable[[], Awaitable[None]], timeout: Optional[float] = None,
+				 poll_interval: float = DEFAULT_POLL_INTERVAL) -> None:
+		self._task = task
+		self._poll = poll
+		self._interrupt = interrupt
+		self._deadline = time.monotonic() + timeout if timeout is not None else None
+		self._poll_interval = poll_interval
+		self._cancelled = False
+		self._timed_out = False
+
+	def done(self) -> bool:
+		return self._task.done() or self._cancelled
+
+	async def cancel(self) -> bool:
+		"""Async version of GenerationHandle.cancel"""
+		if self.done():
+			return False
+		self._cancelled = True
+		# a task that hasn't started has sent nothing : the server may be running the generation of another client
+		running = self._running()
+		self._task.cancel()
+		if running:
+			await _ainterrupt(self._interrupt)
+		return True
+
+	async def progress(self, previews: bool = False) -> AsyncIterator[GenerationProgress]:
+		"""Async version of GenerationHandle.progress"""
+		last = None
+		polling = True
+		while not self.done():
+			await self._check_deadline()
+			if polling and self._running():
+				current = await _apoll(self._poll, previews)
+				if current is _FAILED:
+					pass
+				elif current is None:
+					polling = False
+				elif not current.same_state(last):
+					last = current
+					yield current
+			await asyncio.wait({self._task}, timeout=self._wait_time(self._poll_interval))
+		await self._check_deadline()
+
+	async def result(self, timeout: Optional[float] = None) -> List[ImageMedia]:
+		"""Async version of GenerationHandle.result"""
+		if self._cancelled:
+			raise GenerationCancelled("The generation was cancelled")
+		await asyncio.wait({self._task}, timeout=self._wait_time(timeout))
+		if not self._task.done():
+			await self._check_deadline()
+			raise TimeoutError("The generation is still running")
+		return self._task.result()
+
+	def _wait_time(self, timeout: Optional[float]) -> Optional[float]:
+		if self._deadline is None:
+			return timeout
+		remaining = max(self._deadline - time.monotonic(), 0.0)
+		return remaining if timeout is None else min(timeout, remaining)
+
+	def _running(self) -> bool:
+		"""True once the task has started, the equivalent of Future.running()"""
+		if self._task.done():
+			return False
+		coroutine = self._task.get_coro()
+		return not inspect.iscoroutine(coroutine) or inspect.getcoroutinestate(coroutine) != inspect.CORO_CREATED
+
+	async def _check_deadline(self) -> None:
+		if self._timed_out or (self._deadline is not None and time.monotonic() >= self._deadline and not self._task.done()):
+			if not self._timed_out:
+				logger.warning("Generation timed out, interrupting it")
+				self._timed_out = True
+				await self.cancel()
+			raise GenerationTimeout("The generation took longer than its timeout")
+		if self._cancelled:
+			raise GenerationCancelled("The generation was cancelled")
+
+
+#
+# the progress and interrupt endpoints are best effort : their failures never fail the generation
+#
+def _poll(poll: Callable[[bool], Optional[GenerationProgress]], previews: bool) -> Any:
+	try:
+		return poll(previews)
+	except Exception:
+		logger.debug("Failed to poll the generation progress", exc_info=True)
+		return _FAILED
+
+
+async def _apoll(poll: Callable[[bool], Awaitable[Optional[GenerationProgress]]], previews: bool) -> Any:
+	try:
+		return await poll(previews)
+	except Exception:
+		logger.debug("Failed to poll the generation progress", exc_info=True)
+		return _FAILED
+
+
+def _interrupt(interrupt: Callable[[], None]) -> None:
+	try:
+		interrupt()
+	except Exception:
+		logger.warning("Failed to interrupt the generation", exc_info=True)
+
+
+async def _ainterrupt(interrupt: Callable[[], Awaitable[None]]) -> None:
+	try:
+		await interrupt()
+	except Exception:
+		logger.warning("Failed to interrupt the generation", exc_info=True)
@@ -1,10 +1,10 @@
 import json
+import asyncio
 import logging
-from typing import Optional, List, Any
+from typing import Optional, List, Any, Dict, Iterator, AsyncIterator, Callable, Awaitable
 from pydantic import BaseModel
 from PIL import Image
-from groq import Groq
-from tenacity import retry, stop_after_attempt, retry_if_exception_type, wait_random_exponential
+from groq import Groq, AsyncGroq, DefaultHttpxClient, DefaultAsyncHttpxClient, APIConnectionError
 
 from ..model.model import Model
 from ..media.media import Media
@@ -22,51 +22,125 @@ logger.addHandler(logging.NullHandler())
 
 
 class GroqPlatform(Platform):
+    _unavailable_errors = (APIConnectionError,)
+
     def __init__(self, api_key: str, **kwargs: Any) -> None:
         super().__init__('groq', **kwargs)
         self._api_key = api_key
 
 
-    def _text2text(self, model: Model, prompt: str, media: Optional[List[Media]] = None, response_model: Optional[BaseModel] = None, **kwargs: Any) -> str:
+    def _client(self) -> Groq:
+        return self._get_client("groq", lambda: Groq(
+            api_key=self._api_key,
+            # retries are handled by the platform retry policy
+            max_retries=0,
+            http_client=DefaultHttpxClient(**self._http_client_options()),
+        ))
+
+    def _async_client(self) -> AsyncGroq:
+        return self._get_async_client("groq", lambda: AsyncGroq(
+            api_key=self._api_key,
+            # retries are handled by the platform retry policy
+            max_retries=0,
+            http_client=DefaultAsyncHttpxClient(**self._http_client_options(asynchronous=True)),
+        ))
+
+    #
+    # requests are built once, and shared by the sync and async calls
+    #
+    def _text2text_request(self, model: Model, prompt: str, **kwargs: Any) -> Dict[str, Any]:
         system_prompt: Optional[str] = kwargs.get("system_prompt", "You are a helpful assistant.")
-        client = Groq(api_key=self._api_key)
-        chat_completion = client.chat.completions.create(
-            model=model.platform_name(),
+        return dict(
+            self._chat_params(model, {}, **kwargs),
+            model=model.internal_name(),
             messages=[
                 {"role": "system", "content": system_prompt},
                 {"role": "user", "content": prompt},
             ],
         )
+
+    def _text2data_request(self, model: Model, prompt: str, response_model: BaseModel, **kwargs: Any) -> Dict[str, Any]:
+        json_schema = response_model.model_json_schema()
+        json_schema_name = json_schema['title']
+
+        request = self._text2text_request(model, prompt, **kwargs)
+        request["response_format"] = {
+            "type": "json_schema",
+            "json_schema": {
+                "name": json_schema_name,
+                "schema": json_schema,
+            },
+        }
+        request.setdefault("temperature", 0.8)
+        return request
+
+    def _image2text_request(self, model: Model, prompt: str, urls: List[str], **kwargs: Any) -> Dict[str, Any]:
+        defaults = {"temperature": 1, "max_completion_tokens": 1024, "top_p": 1, "stop": None}
+        return dict(
+            self._chat_params(model, defaults, **kwargs),
+            model=model.internal_name(),
+            messages=[
+                {
+                    "role": "user",
+                    "content": [
+                        {"type": "text", "text": prompt},
+                        *(
+                            {
+                                "type": "image_url",
+                                "image_url": {
+                                    "url": url,
+                                },
+                            }
+                            for url in urls
+                        ),
+                    ],
+                }
+            ],
+            stream=False,
+        )
+
+
+    def _text2text(self, model: Model, prompt: str, media: Optional[List[Media]] = None, response_model: Optional[BaseModel] = None, **kwargs: Any) -> str:
+        chat_completion = self._client().chat.completions.create(**self._text2text_request(model, prompt, **kwargs))
+        return chat_completion.choices[0].message.content.strip()
+
+    async def _atext2text(self, model: Model, prompt: str, media: Optional[List[Media]] = None, response_model: Optional[BaseModel] = None, **kwargs: Any) -> str:
+        chat_completion = await self._async_client().chat.completions.create(**self._text2text_request(model, prompt, **kwargs))
         return chat_completion.choices[0].message.content.strip()
 
+    def _text2text_stream(self, model: Model, prompt: str, media: Optional[List[Media]] = None, **kwargs: Any) -> Iterator[str]:
+        request = self._text2text_request(model, prompt, **kwargs)
+        with self._client().chat.completions.create(stream=True, **request) as stream:
+            for chunk in stream:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+
+    async def _atext2text_stream(self, model: Model, prompt: str, media: Optional[List[Media]] = None, **kwargs: Any) -> AsyncIterator[str]:
+        request = self._text2text_request(model, prompt, **kwargs)
+        async with await self._async_client().chat.completions.create(stream=True, **request) as stream:
+            async for chunk in stream:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+
+
     #
     # using structured data may sometime fail, because the result is not a valid JSON
-    # if the JSON is not valid, retry 3 times
+    # json.JSONDecodeError is retried by the retry policy of the platform
     #
-    @retry(retry=retry_if_exception_type(json.JSONDecodeError), stop=stop_after_attempt(3), wait=wait_random_exponential(multiplier=3))
     def _text2data(self, model: Model, prompt: str, response_model: BaseModel, media: Optional[List[Media]] = None, **kwargs: Any) -> str:
-        system_prompt: Optional[str] = kwargs.get("system_prompt", "You are a helpful assistant.")
-        client = Groq(api_key=self._api_key)
+        try:
+            chat_completion = self._client().chat.completions.create(**self._text2data_request(model, prompt, response_model, **kwargs))
+        except:
+            logging.error("API call failed", exc_info=True)
+            raise
 
-        json_schema = response_model.model_json_schema()
-        json_schema_name = json_schema['title']
+        json_string = chat_completion.choices[0].message.content.strip()
+        # return a python Dict
+        return json.loads(json_string)
 
+    async def _atext2data(self, model: Model, prompt: str, response_model: BaseModel, media: Optional[List[Media]] = None, **kwargs: Any) -> str:
         try:
-            chat_completion = client.chat.completions.create(
-                model=model.internal_name(),
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": prompt}
-                ],
-                response_format={
-                    "type": "json_schema",
-                    "json_schema": {
-                        "name": json_schema_name,
-                        "schema": json_schema,
-                    },
-                },
-                temperature=0.8,
-            )
+            chat_completion = await self._async_client().chat.completions.create(**self._text2data_request(model, prompt, response_model, **kwargs))
         except:
             logging.error("API call failed", exc_info=True)
             raise
@@ -77,41 +151,49 @@ class GroqPlatform(Platform):
 
 
     def _image2text(self, model: Model, prompt: str, media: List[ImageMedia], **kwargs: Any) -> str:
-        client = Groq(api_key=self._api_key)
         if len(media) == 0:
             return ""
-        else:
-            image = media[0]
-            base64_image = image.to_base64()
+        return self._image2text_call(model, prompt, media, **kwargs)()
 
-        try:
-            chat_completion = client.chat.completions.create(
-                model=model.internal_name(),
-                messages=[
-                    {
-                        "role": "user",
-                        "content": [
-                            {"type": "text", "text": prompt},
-                            {
-                                "type": "image_url",
-                                "image_url": {
-                                    "url": f"data:image/jpeg;base64,{base64_image}",
-                                },
-                            },
-                        ],
-                    }
-                ],
-                temperature=1,
-                max_completion_tokens=1024,
-                top_p=1,
-                stream=False,
-                stop=None,
-            )
-        except Exception as e:
-            logging.error("API call failed", exc_info=True)
-            raise
+    async def _aimage2text(self, model: Model, prompt: str, media: List[ImageMedia], **kwargs: Any) -> str:
+        if len(media) == 0:
+            return ""
+        return await self._aimage2text_call(model, prompt, media, **kwargs)()
 
-        return chat_completion.choices[0].message.content.strip()
+    #
+    # the images are encoded by the first attempt, the retries send the same request
+    #
+    def _image2text_call(self, model: Model, prompt: str, media: List[ImageMedia], **kwargs: Any) -> Callable[[], str]:
+        request: Dict[str, Any] = {}
+
+        def call() -> str:
+            if not request:
+                request.update(self._image2text_request(model, prompt, self._image_data_urls(model, media), **kwargs))
+            try:
+                chat_completion = self._client().chat.completions.create(**request)
+            except Exception as e:
+                logging.error("API call failed", exc_info=True)
+                raise
+            return chat_completion.choices[0].message.content.strip()
+
+        return call
+
+    def _aimage2text_call(self, model: Model, prompt: str, media: List[ImageMedia], **kwargs: Any) -> Callable[[], Awaitable[str]]:
+        request: Dict[str, Any] = {}
+
+        async def call() -> str:
+            if not request:
+                # image encoding is CPU bound, keep it out of the event loop
+                urls = await asyncio.to_thread(self._image_data_urls, model, media)
+                request.update(self._image2text_request(model, prompt, urls, **kwargs))
+            try:
+                chat_completion = await self._async_client().chat.completions.create(**request)
+            except Exception as e:
+                logging.error("API call failed", exc_info=True)
+                raise
+            return chat_completion.choices[0].message.content.strip()
+
+        return call
 
 
     def _text2image(self, model: Model, prompt: str, **kwargs: Any) -> Image.Image:
@@ -123,4 +205,3 @@ class GroqPlatform(Platform):
         """Not supported"""
         pass
 
-
@@ -1,10 +1,9 @@
 import json
 import logging
-from typing import Optional, List, Any
+from typing import Optional, List, Any, Dict, Iterator, AsyncIterator
 from pydantic import BaseModel
 from PIL import Image
-from huggingface_hub import InferenceClient
-from tenacity import retry, stop_after_attempt, retry_if_exception_type, wait_random_exponential
+from huggingface_hub import InferenceClient, AsyncInferenceClient
 
 from polymage.model.model import Model
 from polymage.media.media import Media
@@ -41,52 +40,100 @@ class HuggingFacePlatform(Platform):
         self._api_key = api_key
 
 
-    def _text2text(self, model: Model, prompt: str, media: Optional[List[Media]] = None, response_model: Optional[BaseModel] = None, **kwargs: Any) -> str:
+    def _client(self, provider: Optional[str] = None) -> InferenceClient:
+        # huggingface_hub shares one keep-alive HTTP session between all the InferenceClient,
+        # so we keep one InferenceClient per provider
+        return self._get_client(f"inference:{provider}", lambda: InferenceClient(
+            provider=provider,
+            api_key=self._api_key,
+            timeout=self._timeout,
+        ))
+
+    def _async_client(self, provider: Optional[str] = None) -> AsyncInferenceClient:
+        return self._get_async_client(f"inference:{provider}", lambda: AsyncInferenceClient(
+            provider=provider,
+            api_key=self._api_key,
+            timeout=self._timeout,
+        ))
+
+    #
+    # requests are built once, and shared by the sync and async calls
+    #
+    def _text2text_request(self, model: Model, prompt: str, **kwargs: Any) -> Dict[str, Any]:
         system_prompt: Optional[str] = kwargs.get("system_prompt", "You are a helpful assistant.")
-        client = InferenceClient(api_key=self._api_key)
+        return dict(
+            self._chat_params(model, {}, **kwargs),
+            model=model.internal_name(),
+            messages=[
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": prompt},
+            ],
+        )
+
+    def _text2data_request(self, model: Model, prompt: str, response_model: BaseModel, **kwargs: Any) -> Dict[str, Any]:
+        json_schema = response_model.model_json_schema()
+        json_schema_name = json_schema['title']
+
+        request = self._text2text_request(model, prompt, **kwargs)
+        request["response_format"] = {
+            "type": "json_schema",
+            "json_schema": {
+                "name": json_schema_name,
+                "schema": json_schema,
+            },
+        }
+        request.setdefault("temperature", 0.8)
+        return request
+
 
+    def _text2text(self, model: Model, prompt: str, media: Optional[List[Media]] = None, response_model: Optional[BaseModel] = None, **kwargs: Any) -> str:
         try:
-            chat_completion = client.chat.completions.create(
-                model=model.internal_name(),
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": prompt},
-                ],
-            )
+            chat_completion = self._client().chat.completions.create(**self._text2text_request(model, prompt, **kwargs))
         except:
             logging.error("API call failed", exc_info=True)
             raise
 
         return chat_completion.choices[0].message.content.strip()
 
+    async def _atext2text(self, model: Model, prompt: str, media: Optional[List[Media]] = None, response_model: Optional[BaseModel] = None, **kwargs: Any) -> str:
+        try:
+            chat_completion = await self._async_client().chat.completions.create(**self._text2text_request(model, prompt, **kwargs))
+        except:
+            logging.error("API call failed", exc_info=True)
+            raise
+
+        return chat_completion.choices[0].message.content.strip()
+
+    def _text2text_stream(self, model: Model, prompt: str, media: Optional[List[Media]] = None, **kwargs: Any) -> Iterator[str]:
+        request = self._text2text_request(model, prompt, **kwargs)
+        for chunk in self._client().chat.completions.create(stream=True, **request):
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+
+    async def _atext2text_stream(self, model: Model, prompt: str, media: Optional[List[Media]] = None, **kwargs: Any) -> AsyncIterator[str]:
+        request = self._text2text_request(model, prompt, **kwargs)
+        async for chunk in await self._async_client().chat.completions.create(stream=True, **request):
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+
     #
     # using structured data may sometime fail, because the result is not a valid JSON
-    # if the JSON is not valid, retry 3 times
+    # json.JSONDecodeError is retried by the retry policy of the platform
     #
-    @retry(retry=retry_if_exception_type(json.JSONDecodeError), stop=stop_after_attempt(3), wait=wait_random_exponential(multiplier=3))
     def _text2data(self, model: Model, prompt: str, response_model: BaseModel, media: Optional[List[Media]] = None, **kwargs: Any) -> str:
-        system_prompt: Optional[str] = kwargs.get("system_prompt", "You are a helpful assistant.")
-        client = InferenceClient(api_key=self._api_key)
+        try:
+            chat_completion = self._client().chat.completions.create(**self._text2data_request(model, prompt, response_model, **kwargs))
+        except:
+            logging.error("API call failed", exc_info=True)
+            raise
 
-        json_schema = response_model.model_json_schema()
-        json_schema_name = json_schema['title']
+        json_string = chat_completion.choices[0].message.content.strip()
+        # return a python Dict
+        return json.loads(json_string)
 
+    async def _atext2data(self, model: Model, prompt: str, response_model: BaseModel, media: Optional[List[Media]] = None, **kwargs: Any) -> str:
         try:
-            chat_completion = client.chat.completions.create(
-                model=model.internal_name(),
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": prompt}
-                ],
-                response_format={
-                    "type": "json_schema",
-                    "json_schema": {
-                        "name": json_schema_name,
-                        "schema": json_schema,
-                    },
-                },
-                temperature=0.8,
-            )
+            chat_completion = await self._async_client().chat.completions.create(**self._text2data_request(model, prompt, response_model, **kwargs))
         except:
             logging.error("API call failed", exc_info=True)
             raise
@@ -102,11 +149,22 @@ class HuggingFacePlatform(Platform):
 
 
     def _text2image(self, model: Model, prompt: str, **kwargs: Any) -> Image.Image:
-        client = InferenceClient(provider="hf-inference", api_key=self._api_key)
+        # output is a PIL.Image object
+        try:
+            image = self._client(provider="hf-inference").text_to_image(
+                prompt,
+                model=model.internal_name(),
+            )
+        except:
+            logging.error("API call failed", exc_info=True)
+            raise
 
+        return ImageMedia(image, {'Software': f"{self.platform_name()}/{model.name()}"})
+
+    async def _atext2image(self, model: Model, prompt: str, **kwargs: Any) -> Image.Image:
         # output is a PIL.Image object
         try:
-            image = client.text_to_image(
+            image = await self._async_client(provider="hf-inference").text_to_image(
                 prompt,
                 model=model.internal_name(),
             )
@@ -121,4 +179,3 @@ class HuggingFacePlatform(Platform):
         """Not supported"""
         pass
 
-
@@ -1,10 +1,10 @@
 import json
+import asyncio
 import logging
-from typing import Optional, List, Any
-from openai import OpenAI
+from typing import Optional, List, Any, Dict, Iterator, AsyncIterator, Callable, Awaitable
+from openai import OpenAI, AsyncOpenAI, DefaultHttpxClient, DefaultAsyncHttpxClient, APIConnectionError
 from pydantic import BaseModel
 from PIL import Image
-from tenacity import retry, stop_after_attempt, retry_if_exception_type
 
 from polymage.model.model import Model
 from polymage.media.media import Media
@@ -17,90 +17,153 @@ logger.addHandler(logging.NullHandler())
 
 
 class LMStudioPlatform(Platform):
+	_unavailable_errors = (APIConnectionError,)
+
 	def __init__(self, host: str = "127.0.0.1:1234", **kwargs: Any) -> None:
 		super().__init__('lmstudio', **kwargs)
 		self._host = host
 		self._api_key = "lm-studio"  # Dummy key (LM Studio doesn't require real keys)
 
 
-	def _text2text(self, model: Model, prompt: str, media: Optional[List[Media]] = None, response_model: Optional[BaseModel] = None, **kwargs: Any) -> str:
+	def _client(self) -> OpenAI:
+		return self._get_client("openai", lambda: OpenAI(
+			base_url=f"http://{self._host}/v1",  # LM Studio's default endpoint
+			api_key=self._api_key,
+			# retries are handled by the platform retry policy
+			max_retries=0,
+			http_client=DefaultHttpxClient(**self._http_client_options()),
+		))
+
+	def _async_client(self) -> AsyncOpenAI:
+		return self._get_async_client("openai", lambda: AsyncOpenAI(
+			base_url=f"http://{self._host}/v1",  # LM Studio's default endpoint
+			api_key=self._api_key,
+			# retries are handled by the platform retry policy
+			max_retries=0,
+			http_client=DefaultAsyncHttpxClient(**self._http_client_options(asynchronous=True)),
+		))
+
+	#
+	# requests are built once, and shared by the sync and async calls
+	#
+	def _text2text_request(self, model: Model, prompt: str, **kwargs: Any) -> Dict[str, Any]:
 		system_prompt: Optional[str] = kwargs.get("system_prompt", "")
-		client = OpenAI(
-				base_url=f"http://{self._host}/v1",  # LM Studio's default endpoint
-				api_key=self._api_key
-			)
-		response = client.chat.completions.create(
+		return dict(
+			self._chat_params(model, {"temperature": 0.8}, **kwargs),
 			model=model.internal_name(),
 			messages=[
 				{"role": "system", "content": system_prompt},
 				{"role": "user", "content": prompt}
 			],
-			temperature=0.8
 		)
+
+	def _text2data_request(self, model: Model, prompt: str, response_model: BaseModel, **kwargs: Any) -> Dict[str, Any]:
+		json_schema = response_model.model_json_schema()
+		json_schema_name = json_schema['title']
+
+		request = self._text2text_request(model, prompt, **kwargs)
+		request["response_format"] = {
+			"type": "json_schema",
+			"json_schema": {
+				"name": json_schema_name,
+				"schema": json_schema,
+			},
+		}
+		return request
+
+	def _image2text_request(self, model: Model, prompt: str, urls: List[str], **kwargs: Any) -> Dict[str, Any]:
+		return dict(
+			self._chat_params(model, {}, **kwargs),
+			model=model.internal_name(),
+			input=[
+				{
+					"role": "user",
+					"content": [
+						{"type": "input_text", "text": prompt},
+						*({"type": "input_image", "image_url": url} for url in urls),
+					],
+				}
+			],
+		)
+
+
+	def _text2text(self, model: Model, prompt: str, media: Optional[List[Media]] = None, response_model: Optional[BaseModel] = None, **kwargs: Any) -> str:
+		response = self._client().chat.completions.create(**self._text2text_request(model, prompt, **kwargs))
 		return response.choices[0].message.content.strip()
 
+	async def _atext2text(self, model: Model, prompt: str, media: Optional[List[Media]] = None, response_model: Optional[BaseModel] = None, **kwargs: Any) -> str:
+		response = await self._async_client().chat.completions.create(**self._text2text_request(model, prompt, **kwargs))
+		return response.choices[0].message.content.strip()
+
+
+	def _text2text_stream(self, model: Model, prompt: str, media: Optional[List[Media]] = None, **kwargs: Any) -> Iterator[str]:
+		request = self._text2text_request(model, prompt, **kwargs)
+		with self._client().chat.completions.create(stream=True, **request) as stream:
+			for chunk in stream:
+				if chunk.choices and chunk.choices[0].delta.content:
+					yield chunk.choices[0].delta.content
+
+	async def _atext2text_stream(self, model: Model, prompt: str, media: Optional[List[Media]] = None, **kwargs: Any) -> AsyncIterator[str]:
+		request = self._text2text_request(model, prompt, **kwargs)
+		async with await self._async_client().chat.completions.create(stream=True, **request) as stream:
+			async for chunk in stream:
+				if chunk.choices and chunk.choices[0].delta.content:
+					yield chunk.choices[0].delta.content
+
 
 	#
 	# using structured data may sometime fail, because the result is not a valid JSON
-	# if the JSON is not valid, retry 3 times
+	# json.JSONDecodeError is retried by the retry policy of the platform
 	#
-	@retry(retry=retry_if_exception_type(json.JSONDecodeError), stop=stop_after_attempt(3))
 	def _text2data(self, model: Model, prompt: str, response_model: BaseModel, media: Optional[List[Media]] = None, **kwargs: Any) -> str:
-		system_prompt: Optional[str] = kwargs.get("system_prompt", "")
-		client = OpenAI(
-				base_url=f"http://{self._host}/v1",  # LM Studio's default endpoint
-				api_key=self._api_key
-		)
-
-		json_schema = response_model.model_json_schema()
-		json_schema_name = json_schema['title']
+		chat_completion = self._client().chat.completions.create(**self._text2data_request(model, prompt, response_model, **kwargs))
+		json_string = chat_completion.choices[0].message.content.strip()
+		# return a python Dict
+		return json.loads(json_string)
 
-		chat_completion = client.chat.completions.create(
-			model=model.internal_name(),
-			messages=[
-				{"role": "system", "content": system_prompt},
-				{"role": "user", "content": prompt}
-			],
-			response_format={
-				"type": "json_schema",
-				"json_schema": {
-					"name": json_schema_name,
-					"schema": json_schema,
-				},
-			},
-			temperature=0.8,
-		)
+	async def _atext2data(self, model: Model, prompt: str, response_model: BaseModel, media: Optional[List[Media]] = None, **kwargs: Any) -> str:
+		chat_completion = await self._async_client().chat.completions.create(**self._text2data_request(model, prompt, response_model, **kwargs))
 		json_string = chat_completion.choices[0].message.content.strip()
 		# return a python Dict
 		return json.loads(json_string)
 
 
 	def _image2text(self, model: Model, prompt: str, media: List[ImageMedia], **kwargs: Any) -> str:
-		client = OpenAI(
-			base_url="http://localhost:1234/v1",  # LM Studio's default endpoint
-			api_key="lm-studio"  # Dummy key (LM Studio doesn't require real keys)
-		)
 		if len(media) == 0:
 			return ""
-		else:
-			image = media[0]
-			base64_image = image.to_base64()
+		return self._image2text_call(model, prompt, media, **kwargs)()
 
-		response = client.responses.create(
-			model=model.internal_name(),
-			input=[
-				{
-					"role": "user",
-					"content": [
-						{"type": "input_text", "text": prompt},
-						{"type": "input_image", "image_url": f"data:image/png;base64,{base64_image}"},
-					],
-				}
-			],
-		)
-		return response.output[0].content[0].text
+	async def _aimage2text(self, model: Model, prompt: str, media: List[ImageMedia], **kwargs: Any) -> str:
+		if len(media) == 0:
+			return ""
+		return await self._aimage2text_call(model, prompt, media, **kwargs)()
+
+	#
+	# the images are encoded by the first attempt, the retries send the same request
+	#
+	def _image2text_call(self, model: Model, prompt: str, media: List[ImageMedia], **kwargs: Any) -> Callable[[], str]:
+		request: Dict[str, Any] = {}
 
+		def call() -> str:
+			if not request:
+				request.update(self._image2text_request(model, prompt, self._image_data_urls(model, media), **kwargs))
+			response = self._client().responses.create(**request)
+			return response.output[0].content[0].text
 
+		return call
+
+	def _aimage2text_call(self, model: Model, prompt: str, media: List[ImageMedia], **kwargs: Any) -> Callable[[], Awaitable[str]]:
+		request: Dict[str, Any] = {}
+
+		async def call() -> str:
+			if not request:
+				# image encoding is CPU bound, keep it out of the event loop
+				urls = await asyncio.to_thread(self._image_data_urls, model, media)
+				request.update(self._image2text_request(model, prompt, urls, **kwargs))
+			response = await self._async_client().responses.create(**request)
+			return response.output[0].content[0].text
+
+		return call
 
 
 	def _text2image(self, model: str, prompt: str, **kwargs: Any) -> Image.Image:
@@ -110,4 +173,3 @@ class LMStudioPlatform(Platform):
 	def _image2image(self, model: str, prompt: str, image: Image.Image, **kwargs: Any) -> Image.Image:
 		"""Not supported"""
 		pass
-
@@ -1,28 +1,482 @@
+import os
+import base64
+import asyncio
+import inspect
 import logging
+import threading
 from abc import ABC, abstractmethod
-from typing import List, Dict, Optional, Any
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import replace
+from typing import List, Dict, Optional, Any, Callable, Tuple, Iterator, AsyncIterator, Awaitable
+import httpx
 from pydantic import BaseModel
 
 from polymage.registry import ModelRegistry
 from polymage.model.model import Model
 from polymage.media.media import Media
 from polymage.media.image_media import ImageMedia
+from polymage.media.upload_encoding import UploadEncoding, UploadStats, default_upload
+from polymage.platform.text_stream import TextStream, AsyncTextStream
+from polymage.cache.response_cache import ResponseCache, make_cache_key, media_digest, copy_response
+from polymage.platform.single_flight import SingleFlight
+from polymage.platform.rate_limiter import RateLimiter
+from polymage.platform.retry_policy import RetryPolicy, CircuitBreaker
 
 logger = logging.getLogger(__name__)
 logger.addHandler(logging.NullHandler())
 
 
+#
+# connection pool defaults, shared by every platform instance
+#
+DEFAULT_POOL_SIZE = 10
+DEFAULT_IDLE_TIMEOUT = 30.0
+DEFAULT_TIMEOUT = 600.0
+DEFAULT_CONNECT_TIMEOUT = 10.0
+
+# separator of the answers of a chunked image2text call
+CHUNKED_ANSWER_SEPARATOR = "\n\n"
+
+
 class Platform(ABC):
-	def __init__(self, name: str, **kwargs: Any) -> None:
+	"""
+	Abstract base class for all the platforms (local or cloud) able to run a model.
+
+	Each platform instance owns its HTTP/SDK clients : they are created lazily on first use,
+	then reused by all the capability methods, so the connections are kept alive between calls.
+	The clients are thread-safe and can be shared by several worker threads.
+
+	Args:
+		name (str): The platform name, as used in the models YAML files
+		pool_size (int): Maximum number of connections kept in the pool
+		idle_timeout (float): Number of seconds an idle connection is kept alive
+		timeout (float): Read timeout for a request, in seconds
+		connect_timeout (float): Timeout to establish a connection, in seconds
+		cache (Optional[ResponseCache]): Optional cache for the responses, shared or not with other platforms
+		coalesce (bool): Identical calls made at the same time share a single request to the backend
+		rate_limiter (Optional[RateLimiter]): Requests and tokens quotas, by default the platform only follows the rate limit headers of the provider
+		retry_policy (Optional[RetryPolicy]): Retry of the transient failures, defaults to RetryPolicy()
+		circuit_breaker (Optional[CircuitBreaker]): Fails fast when the backend is down, defaults to CircuitBreaker()
+
+	Example:
+		with LMStudioPlatform(host="127.0.0.1:1234", pool_size=4) as platform:
+			platform.text2text(model="gemma-3-12b", prompt="Hello")
+	"""
+	def __init__(self, name: str, pool_size: int = DEFAULT_POOL_SIZE, idle_timeout: float = DEFAULT_IDLE_TIMEOUT,
+				 timeout: float = DEFAULT_TIMEOUT, connect_timeout: float = DEFAULT_CONNECT_TIMEOUT,
+				 cache: Optional[ResponseCache] = None, coalesce: bool = False,
+				 rate_limiter: Optional[RateLimiter] = None, retry_policy: Optional[RetryPolicy] = None,
+				 circuit_breaker: Optional[CircuitBreaker] = None, default_params: Optional[Dict[str, Any]] = None,
+				 **kwargs: Any) -> None:
 		self._name = name.lower()
+		self._pool_size = pool_size
+		self._idle_timeout = idle_timeout
+		self._timeout = timeout
+		self._connect_timeout = connect_timeout
+		# long-lived clients, created on first use
+		self._clients: Dict[str, Any] = {}
+		# async clients are bound to the event loop that created them
+		self._async_clients: Dict[str, Tuple[asyncio.AbstractEventLoop, Any]] = {}
+		self._clients_lock = threading.Lock()
+		self._cache = cache
+		self._single_flight = SingleFlight() if coalesce else None
+		self._rate_limiter = rate_limiter if rate_limiter is not None else RateLimiter()
+		self._retry_policy = retry_policy if retry_policy is not None else RetryPolicy()
+		self._circuit_breaker = circuit_breaker if circuit_breaker is not None else CircuitBreaker(self._name)
+		self._default_params: Dict[str, Any] = dict(default_params or {})
+		self._upload_stats = UploadStats()
+		self._upload_lock = threading.Lock()
+		# workers encoding the images of a multi-image request, created on first use
+		self._encoding_executor: Optional[ThreadPoolExecutor] = None
+
 
+	# SDK specific errors raised when the backend can't be reached, retried and counted by the circuit breaker
+	_unavailable_errors: Tuple[type, ...] = ()
 
 	def platform_name(self) -> str:
 		return self._name
 
+	#
+	# connection pool management
+	#
+	def _http_client_options(self, asynchronous: bool = False) -> Dict[str, Any]:
+		"""
+		Options used to build the httpx clients (pool size, keep-alive, timeouts, and the hook
+		feeding the rate limit headers of the responses to the rate limiter)
+
+		Args:
+			asynchronous (bool): Options for an httpx.AsyncClient, whose hooks must be coroutines
+		"""
+		limiter = self._rate_limiter
+
+		def observe(response: httpx.Response) -> None:
+			limiter.observe_response(response)
+
+		async def aobserve(response: httpx.Response) -> None:
+			limiter.observe_response(response)
+
+		return {
+			"event_hooks": {"response": [aobserve if asynchronous else observe]},
+			"limits": httpx.Limits(
+				max_connections=self._pool_size,
+				max_keepalive_connections=self._pool_size,
+				keepalive_expiry=self._idle_timeout,
+			),
+			"timeout": httpx.Timeout(self._timeout, connect=self._connect_timeout),
+		}
+
+	def _get_client(self, key: str, factory: Callable[[], Any]) -> Any:
+		"""
+		Return the client registered under key, creating it with factory on first use.
+
+		Args:
+			key (str): Client identifier, unique for this platform instance
+			factory (Callable[[], Any]): Builds the client when it doesn't exist yet
+
+		Returns:
+			Any: The shared client
+		"""
+		client = self._clients.get(key)
+		if client is None:
+			with self._clients_lock:
+				client = self._clients.get(key)
+				if client is None:
+					client = factory()
+					self._clients[key] = client
+		return client
+
+	def _http_client(self) -> httpx.Client:
+		"""Shared keep-alive HTTP client, for the platforms calling a REST API directly"""
+		return self._get_client("http", lambda: httpx.Client(**self._http_client_options()))
+
+	def _get_async_client(self, key: str, factory: Callable[[], Any]) -> Any:
+		"""
+		Return the async client registered under key for the running event loop,
+		creating it with factory on first use (or when the event loop has changed).
+
+		Args:
+			key (str): Client identifier, unique for this platform instance
+			factory (Callable[[], Any]): Builds the async client when it doesn't exist yet
+
+		Returns:
+			Any: The shared async client
+		"""
+		loop = asyncio.get_running_loop()
+		entry = self._async_clients.get(key)
+		if entry is None or entry[0] is not loop:
+			stale = None
+			with self._clients_lock:
+				entry = self._async_clients.get(key)
+				if entry is None or entry[0] is not loop:
+					stale = entry
+					entry = (loop, factory())
+					self._async_clients[key] = entry
+			if stale is not None:
+				_close_stale_async_client(*stale)
+		return entry[1]
+
+	def _async_http_client(self) -> httpx.AsyncClient:
+		"""Shared keep-alive async HTTP client, for the platforms calling a REST API directly"""
+		return self._get_async_client("http", lambda: httpx.AsyncClient(**self._http_client_options(asynchronous=True)))
+
+	def close(self) -> None:
+		"""Close all the clients (and their pooled connections) owned by this platform"""
+		with self._clients_lock:
+			clients = list(self._clients.values())
+			self._clients.clear()
+			executor, self._encoding_executor = self._encoding_executor, None
+		if executor is not None:
+			executor.shutdown(wait=False)
+		for client in clients:
+			close = getattr(client, "close", None)
+			if close is not None:
+				try:
+					close()
+				except Exception:
+					logger.warning("Failed to close client", exc_info=True)
+
+	def __enter__(self) -> "Platform":
+		return self
+
+	def __exit__(self, exc_type, exc_value, traceback) -> None:
+		self.close()
+
+	async def aclose(self) -> None:
+		"""Close all the clients, sync and async, owned by this platform"""
+		with self._clients_lock:
+			entries = list(self._async_clients.values())
+			self._async_clients.clear()
+		running = asyncio.get_running_loop()
+		for loop, client in entries:
+			if loop is running:
+				await _aclose_client(client)
+			else:
+				_close_stale_async_client(loop, client)
+		self.close()
+
+	async def __aenter__(self) -> "Platform":
+		return self
+
+	async def __aexit__(self, exc_type, exc_value, traceback) -> None:
+		await self.aclose()
+
+
+	#
+	# images sent to the vision models
+	#
+	def _image_data_url(self, model: Model, image: ImageMedia) -> str:
+		"""
+		Data URL of an image sent to a vision model, encoded with the upload_encoding policy
+		of the model (platform_params in the YAML files). Without a policy, the original
+		encoding of the image is sent when the vision APIs accept it, PNG otherwise.
+		"""
+		policy = model.platform_params().get("upload_encoding")
+		if policy is None:
+			data, mime_type = default_upload(image)
+			# the base64 of the original encoding may already be known
+			original = image.format() is not None and mime_type == image.mime_type()
+			base64_image = image.to_base64(format=None) if original else base64.b64encode(data).decode("utf-8")
+			bytes_sent, bytes_saved = len(data), 0
+		else:
+			encoded = UploadEncoding.from_dict(policy).encode(image)
+			# the base64 of the original encoding is already known
+			base64_image = image.to_base64(format=None) if encoded.passthrough else base64.b64encode(encoded.data).decode("utf-8")
+			mime_type = encoded.mime_type
+			bytes_sent, bytes_saved = len(encoded.data), encoded.bytes_saved
+		with self._upload_lock:
+			self._upload_stats.images += 1
+			self._upload_stats.bytes_sent += bytes_sent
+			self._upload_stats.bytes_saved += bytes_saved
+		logger.debug("%s: uploading a %s image of %d bytes, %d bytes saved", model.name(), mime_type, bytes_sent, bytes_saved)
+		return f"data:{mime_type};base64,{base64_image}"
+
+	def _image_data_urls(self, model: Model, images: List[ImageMedia]) -> List[str]:
+		"""
+		Data URLs of the images of a request, in order. The images are encoded concurrently,
+		Pillow releases the GIL while resizing and encoding.
+		"""
+		if len(images) == 1:
+			return [self._image_data_url(model, images[0])]
+		with self._clients_lock:
+			if self._encoding_executor is None:
+				self._encoding_executor = ThreadPoolExecutor(max_workers=min(8, os.cpu_count() or 1), thread_name_prefix="polymage-encoding")
+			executor = self._encoding_executor
+		return list(executor.map(lambda image: self._image_data_url(model, image), images))
+
+	def _image_batches(self, model: Model, media: List[ImageMedia]) -> List[List[ImageMedia]]:
+		"""
+		Split the images of an image2text call into requests. A model served with multi_image
+		(platform_params in the YAML files) receives up to max_images images per request,
+		the other models one image per request.
+		"""
+		if model.platform_params().get("multi_image"):
+			max_images = model.platform_params().get("max_images") or len(media)
+		else:
+			max_images = 1
+		return [media[start:start + max_images] for start in range(0, len(media), max_images)]
+
+	def upload_stats(self) -> UploadStats:
+		"""A snapshot of the statistics of the images uploaded by this platform"""
+		with self._upload_lock:
+			return replace(self._upload_stats)
+
+	#
+	# response cache and coalescing of the identical calls
+	#
+	def _resolve_call(self, model: str, kwargs: Dict[str, Any]) -> Tuple[Model, Dict[str, Any]]:
+		"""
+		The model of a call, and the parameters overriding its default params.
+
+		The parameters are layered : the model defaults (YAML), then the defaults of this platform
+		instance, then the call kwargs (which include the agent defaults). The overrides are
+		validated against the parameter schema of the model.
+
+		Raises:
+			ValueError: If the model isn't registered, or a parameter is invalid
+		"""
+		platform_model = ModelRegistry.getModelByName(model, self._name)
+		overrides = {**self._default_params, **kwargs} if self._default_params else kwargs
+		return platform_model, platform_model.validate_params(overrides)
+
+	def _request_key(self, capability: str, model: Model, prompt: str, media: Optional[List[Media]] = None,
+					 response_model: Optional[BaseModel] = None, **kwargs: Any) -> Optional[str]:
+		"""
+		Content-addressed key of a call, used by the response cache and the call coalescing.
+
+		Returns:
+			Optional[str]: The key, or None when the call must be made as is
+		"""
+		if self._cache is None and self._single_flight is None:
+			return None
+		params = model.params(**kwargs)
+		# a random seed gives a different result on every call
+		if params.get("seed") == -1:
+			if self._cache is not None:
+				self._cache.record_bypass()
+			return None
+		system_prompt = params.pop("system_prompt", None)
+		return make_cache_key(
+			platform=self._name,
+			capability=capability,
+			model=model.internal_name(),
+			params=params,
+			prompt=prompt,
+			system_prompt=system_prompt,
+			response_model=response_model.model_json_schema() if response_model is not None else None,
+			media=[media_digest(m) for m in media] if media else None,
+		)
+
+	def _chat_params(self, model: Model, defaults: Dict[str, Any], **kwargs: Any) -> Dict[str, Any]:
+		"""
+		The parameters sent in the body of a chat request : the defaults of the platform, overlaid with
+		the default params of the model and the call kwargs. The system_prompt is sent as a message,
+		and a random seed (-1) is left to the provider.
+		"""
+		params = {**defaults, **model.params(**kwargs)}
+		params.pop("system_prompt", None)
+		if params.get("seed") == -1:
+			del params["seed"]
+		return params
+
+	def _estimate_tokens(self, model: Model, prompt: str, **kwargs: Any) -> int:
+		"""Rough token count of a text call (about 4 characters per token), for the tokens per minute quota"""
+		params = model.params(**kwargs)
+		text = prompt + (params.get("system_prompt") or "")
+		max_tokens = params.get("max_tokens") or params.get("max_completion_tokens") or 0
+		return len(text) // 4 + int(max_tokens)
+
+	def is_transient(self, error: BaseException) -> bool:
+		"""True when a new attempt may succeed, as classified by the retry policy of the platform"""
+		return self._retry_policy.is_transient(error, self._unavailable_errors)
+
+	def _guarded_call(self, call: Callable[[], Any], tokens: int = 0) -> Any:
+		"""Make the call under the retry policy, the circuit breaker and the rate limiter"""
+		for attempt in self._retry_policy.retrying(self._unavailable_errors):
+			with attempt:
+				return self._attempt(call, tokens)
+
+	def _attempt(self, call: Callable[[], Any], tokens: int) -> Any:
+		self._circuit_breaker.before_call()
+		self._rate_limiter.acquire(tokens)
+		try:
+			value = call()
+		except Exception as e:
+			self._rate_limiter.observe_error(e)
+			self._circuit_breaker.record_failure(e, self._unavailable_errors)
+			raise
+		self._circuit_breaker.record_success()
+		return value
+
+	async def _aguarded_call(self, call: Callable[[], Awaitable[Any]], tokens: int = 0) -> Any:
+		"""Async version of _guarded_call"""
+		async for attempt in self._retry_policy.aretrying(self._unavailable_errors):
+			with attempt:
+				return await self._aattempt(call, tokens)
+
+	async def _aattempt(self, call: Callable[[], Awaitable[Any]], tokens: int) -> Any:
+		self._circuit_breaker.before_call()
+		await self._rate_limiter.aacquire(tokens)
+		try:
+			value = await call()
+		except Exception as e:
+			self._rate_limiter.observe_error(e)
+			self._circuit_breaker.record_failure(e, self._unavailable_errors)
+			raise
+		self._circuit_breaker.record_success()
+		return value
+
+	def _guarded_stream(self, open_stream: Callable[[], Iterator[str]], tokens: int = 0) -> Iterator[str]:
+		"""
+		Stream the deltas of open_stream. Opening the stream, up to its first delta, is a guarded call :
+		it is retried, and counted by the circuit breaker. The deltas after the first one are not,
+		a retry would repeat the text already handed to the caller.
+		"""
+		deltas: Optional[Iterator[str]] = None
+
+		def first_delta() -> Optional[str]:
+			nonlocal deltas
+			deltas = open_stream()
+			return next(deltas, None)
+
+		first = self._guarded_call(first_delta, tokens)
+		if first is None:
+			return
+		yield first
+		yield from deltas
+
+	async def _aguarded_stream(self, open_stream: Callable[[], AsyncIterator[str]], tokens: int = 0) -> AsyncIterator[str]:
+		"""Async version of _guarded_stream"""
+		deltas: Optional[AsyncIterator[str]] = None
+
+		async def first_delta() -> Optional[str]:
+			nonlocal deltas
+			deltas = open_stream()
+			return await anext(deltas, None)
+
+		first = await self._aguarded_call(first_delta, tokens)
+		if first is None:
+			return
+		try:
+			yield first
+			async for delta in deltas:
+				yield delta
+		finally:
+			aclose = getattr(deltas, "aclose", None)
+			if aclose is not None:
+				await aclose()
+
+	def _cached_call(self, key: Optional[str], call: Callable[[], Any], tokens: int = 0) -> Any:
+		"""
+		Return the cached response for key, or make the call and cache its response.
+		When coalescing is enabled, the identical calls in flight share the same request.
+		"""
+		if key is None:
+			return self._guarded_call(call, tokens)
+		if self._cache is not None:
+			hit, value = self._cache.get(key)
+			if hit:
+				return value
+
+		def load() -> Any:
+			value = self._guarded_call(call, tokens)
+			if self._cache is not None:
+				self._cache.set(key, value)
+			return value
+
+		if self._single_flight is None:
+			return load()
+		value, shared = self._single_flight.do(key, load)
+		return copy_response(value) if shared else value
+
+	async def _acached_call(self, key: Optional[str], call: Callable[[], Awaitable[Any]], tokens: int = 0) -> Any:
+		"""Async version of _cached_call, the disk tier is accessed from a worker thread"""
+		if key is None:
+			return await self._aguarded_call(call, tokens)
+		persistent = self._cache is not None and self._cache.persistent
+		if self._cache is not None:
+			if persistent:
+				hit, value = await asyncio.to_thread(self._cache.get, key)
+			else:
+				hit, value = self._cache.get(key)
+			if hit:
+				return value
+
+		async def load() -> Any:
+			value = await self._aguarded_call(call, tokens)
+			if persistent:
+				await asyncio.to_thread(self._cache.set, key, value)
+			elif self._cache is not None:
+				self._cache.set(key, value)
+			return value
+
+		if self._single_flight is None:
+			return await load()
+		value, shared = await self._single_flight.ado(key, load)
+		return copy_response(value) if shared else value
+
 
 	def text2text(self, model: str, prompt: str, media: Optional[List[Media]] = None,
-				  response_model: Optional[str] = None, **kwargs: Any) -> Any:
+				  response_model: Optional[str] = None, stream: bool = False, **kwargs: Any) -> Any:
 		"""
         Convert text to text with optional structured output.
 
@@ -31,18 +485,72 @@ class Platform(ABC):
             prompt: The input text prompt
             media: Optional list of media objects
             response_model: Optional Pydantic model for structured output
+            stream: Return a TextStream yielding the text deltas as they are generated
             **kwargs: Additional platform-specific arguments
 
         Returns:
-            Any: Text response or structured data
+            Any: Text response or structured data, or a TextStream when stream is True
+
+        Raises:
+            ValueError: If stream is requested with a response_model
         """
 		# get the model object for this platform
-		platform_model = ModelRegistry.getModelByName(model, self._name)
+		platform_model, kwargs = self._resolve_call(model, kwargs)
+		if stream:
+			if response_model is not None:
+				raise ValueError("stream is not supported with a response_model")
+			if self._cache is not None:
+				self._cache.record_bypass()
+			deltas = self._guarded_stream(lambda: self._text2text_stream(platform_model, prompt, media=media, **kwargs),
+										  self._estimate_tokens(platform_model, prompt, **kwargs))
+			return TextStream(deltas, name=f"{self._name}/{platform_model.name()}")
+		if response_model is None:
+			key = self._request_key("text2text", platform_model, prompt, media=media, **kwargs)
+			tokens = self._estimate_tokens(platform_model, prompt, **kwargs)
+			return self._cached_call(key, lambda: self._text2text(platform_model, prompt, media=media, response_model=response_model, **kwargs), tokens)
+		# structured data output
+		else:
+			key = self._request_key("text2data", platform_model, prompt, media=media, response_model=response_model, **kwargs)
+			tokens = self._estimate_tokens(platform_model, prompt, **kwargs)
+			return self._cached_call(key, lambda: self._text2data(platform_model, prompt, media=media, response_model=response_model, **kwargs), tokens)
+
+	async def atext2text(self, model: str, prompt: str, media: Optional[List[Media]] = None,
+						 response_model: Optional[str] = None, stream: bool = False, **kwargs: Any) -> Any:
+		"""
+		Async version of text2text.
+
+		Args:
+			model: The model identifier to use
+			prompt: The input text prompt
+			media: Optional list of media objects
+			response_model: Optional Pydantic model for structured output
+			stream: Return an AsyncTextStream yielding the text deltas as they are generated
+			**kwargs: Additional platform-specific arguments
+
+		Returns:
+			Any: Text response or structured data, or an AsyncTextStream when stream is True
+
+		Raises:
+			ValueError: If stream is requested with a response_model
+		"""
+		platform_model, kwargs = self._resolve_call(model, kwargs)
+		if stream:
+			if response_model is not None:
+				raise ValueError("stream is not supported with a response_model")
+			if self._cache is not None:
+				self._cache.record_bypass()
+			deltas = self._aguarded_stream(lambda: self._atext2text_stream(platform_model, prompt, media=media, **kwargs),
+										   self._estimate_tokens(platform_model, prompt, **kwargs))
+			return AsyncTextStream(deltas, name=f"{self._name}/{platform_model.name()}")
 		if response_model is None:
-			return self._text2text(platform_model, prompt, media=media, response_model=response_model, **kwargs)
+			key = self._request_key("text2text", platform_model, prompt, media=media, **kwargs)
+			tokens = self._estimate_tokens(platform_model, prompt, **kwargs)
+			return await self._acached_call(key, lambda: self._atext2text(platform_model, prompt, media=media, response_model=response_model, **kwargs), tokens)
 		# structured data output
 		else:
-			return self._text2data(platform_model, prompt, media=media, response_model=response_model, **kwargs)
+			key = self._request_key("text2data", platform_model, prompt, media=media, response_model=response_model, **kwargs)
+			tokens = self._estimate_tokens(platform_model, prompt, **kwargs)
+			return await self._acached_call(key, lambda: self._atext2data(platform_model, prompt, media=media, response_model=response_model, **kwargs), tokens)
 
 	@abstractmethod
 	def _text2text(self, model: Model, prompt: str, media: Optional[List[Media]] = None,
@@ -55,6 +563,31 @@ class Platform(ABC):
 		"""Platform-specific execution interface for text-to-structured data conversion"""
 		pass
 
+	#
+	# the async interfaces default to running the sync implementation in a worker thread,
+	# platforms with an async client override them
+	#
+	async def _atext2text(self, model: Model, prompt: str, media: Optional[List[Media]] = None,
+						  response_model: Optional[BaseModel] = None, **kwargs: Any) -> Any:
+		"""Platform-specific async execution interface for text-to-text conversion"""
+		return await asyncio.to_thread(self._text2text, model, prompt, media=media, response_model=response_model, **kwargs)
+
+	async def _atext2data(self, model: Model, prompt: str, response_model: str, media: Optional[List[Media]] = None, **kwargs: Any) -> Dict[str, Any]:
+		"""Platform-specific async execution interface for text-to-structured data conversion"""
+		return await asyncio.to_thread(self._text2data, model, prompt, media=media, response_model=response_model, **kwargs)
+
+	#
+	# platforms able to stream the completion override these, the default
+	# implementation returns the whole completion as a single delta
+	#
+	def _text2text_stream(self, model: Model, prompt: str, media: Optional[List[Media]] = None, **kwargs: Any) -> Iterator[str]:
+		"""Platform-specific execution interface for streamed text-to-text conversion"""
+		yield self._text2text(model, prompt, media=media, **kwargs)
+
+	async def _atext2text_stream(self, model: Model, prompt: str, media: Optional[List[Media]] = None, **kwargs: Any) -> AsyncIterator[str]:
+		"""Platform-specific async execution interface for streamed text-to-text conversion"""
+		yield await self._atext2text(model, prompt, media=media, **kwargs)
+
 
 	def text2image(self, model: str, prompt: str, **kwargs: Any) -> ImageMedia:
 		"""
@@ -68,18 +601,87 @@ class Platform(ABC):
         Returns:
             ImageMedia: Generated image media object
         """
-		platform_model = ModelRegistry.getModelByName(model, self._name)
-		return self._text2image(platform_model, prompt, **kwargs)
+		platform_model, kwargs = self._resolve_call(model, kwargs)
+		key = self._request_key("text2image", platform_model, prompt, **kwargs)
+		return self._cached_call(key, lambda: self._text2image(platform_model, prompt, **kwargs))
+
+	async def atext2image(self, model: str, prompt: str, **kwargs: Any) -> ImageMedia:
+		"""
+		Async version of text2image.
+
+		Args:
+			model: The model identifier to use
+			prompt: The input text prompt
+			**kwargs: Additional platform-specific arguments
+
+		Returns:
+			ImageMedia: Generated image media object
+		"""
+		platform_model, kwargs = self._resolve_call(model, kwargs)
+		key = self._request_key("text2image", platform_model, prompt, **kwargs)
+		return await self._acached_call(key, lambda: self._atext2image(platform_model, prompt, **kwargs))
 
 	@abstractmethod
 	def _text2image(self, model: Model, prompt: str, **kwargs: Any) -> ImageMedia:
 		"""Platform-specific execution interface for text-to-image conversion"""
 		pass
 
+	async def _atext2image(self, model: Model, prompt: str, **kwargs: Any) -> ImageMedia:
+		"""Platform-specific async execution interface for text-to-image conversion"""
+		return await asyncio.to_thread(self._text2image, model, prompt, **kwargs)
+
+	def text2images(self, model: str, prompt: str, count: int, **kwargs: Any) -> List[ImageMedia]:
+		"""
+		Generate several images from the same prompt.
+
+		The platforms able to render a batch generate the images in as few calls as possible,
+		the others make a text2image call per image. A fixed seed is incremented for each image,
+		a random seed (-1) stays random. The responses are not cached.
+
+		Args:
+			model: The model identifier to use
+			prompt: The input text prompt
+			count: Number of images to generate
+			**kwargs: Additional platform-specific arguments
+
+		Returns:
+			List[ImageMedia]: The generated images, in the order of their seeds
+
+		Raises:
+			ValueError: If count is lower than 1
+		"""
+		if count < 1:
+			raise ValueError("count must be at least 1")
+		platform_model, kwargs = self._resolve_call(model, kwargs)
+		return self._text2images(platform_model, prompt, count, **kwargs)
+
+	async def atext2images(self, model: str, prompt: str, count: int, **kwargs: Any) -> List[ImageMedia]:
+		"""Async version of text2images"""
+		if count < 1:
+			raise ValueError("count must be at least 1")
+		platform_model, kwargs = self._resolve_call(model, kwargs)
+		return await self._atext2images(platform_model, prompt, count, **kwargs)
+
+	def _text2images(self, model: Model, prompt: str, count: int, **kwargs: Any) -> List[ImageMedia]:
+		"""Platform-specific batch generation, one guarded _text2image call per image by default"""
+		return [self._guarded_call(lambda: self._text2image(model, prompt, **params))
+				for params in _seeded_params(model, count, kwargs)]
+
+	async def _atext2images(self, model: Model, prompt: str, count: int, **kwargs: Any) -> List[ImageMedia]:
+		"""Platform-specific async batch generation, the images are requested concurrently by default"""
+		return list(await asyncio.gather(*(
+			self._aguarded_call(lambda params=params: self._atext2image(model, prompt, **params))
+			for params in _seeded_params(model, count, kwargs)
+		)))
+
 	def image2text(self, model: str, prompt: str, media: List[ImageMedia], **kwargs: Any) -> str:
 		"""
         Convert image to text.
 
+        A model served with multi_image (platform_params) receives all the images in a single request.
+        When there are more images than the model accepts (max_images), or when the model only
+        accepts one image, a request is sent per chunk and the answers are joined.
+
         Args:
             model: The model identifier to use
             prompt: The input text prompt guiding the image analysis
@@ -92,16 +694,66 @@ class Platform(ABC):
         Raises:
             ValueError: If media list is empty
         """
-		platform_model = ModelRegistry.getModelByName(model, self._name)
+		platform_model, kwargs = self._resolve_call(model, kwargs)
+		if not media:
+			raise ValueError("Media list cannot be empty")
+		tokens = self._estimate_tokens(platform_model, prompt, **kwargs)
+		answers = []
+		# more images than the model accepts in a request : one request per chunk
+		for images in self._image_batches(platform_model, media):
+			key = self._request_key("image2text", platform_model, prompt, media=images, **kwargs)
+			answers.append(self._cached_call(key, self._image2text_call(platform_model, prompt, images, **kwargs), tokens))
+		return CHUNKED_ANSWER_SEPARATOR.join(answers)
+
+	async def aimage2text(self, model: str, prompt: str, media: List[ImageMedia], **kwargs: Any) -> str:
+		"""
+		Async version of image2text.
+
+		Args:
+			model: The model identifier to use
+			prompt: The input text prompt guiding the image analysis
+			media: List of ImageMedia objects to process
+			**kwargs: Additional platform-specific arguments
+
+		Returns:
+			str: Text description or caption of the image(s)
+
+		Raises:
+			ValueError: If media list is empty
+		"""
+		platform_model, kwargs = self._resolve_call(model, kwargs)
 		if not media:
 			raise ValueError("Media list cannot be empty")
-		return self._image2text(platform_model, prompt, media=media, **kwargs)
+		tokens = self._estimate_tokens(platform_model, prompt, **kwargs)
+
+		async def chunk(images: List[ImageMedia]) -> str:
+			key = self._request_key("image2text", platform_model, prompt, media=images, **kwargs)
+			return await self._acached_call(key, self._aimage2text_call(platform_model, prompt, images, **kwargs), tokens)
+
+		# more images than the model accepts in a request : the chunks are sent concurrently
+		answers = await asyncio.gather(*(chunk(images) for images in self._image_batches(platform_model, media)))
+		return CHUNKED_ANSWER_SEPARATOR.join(answers)
 
 	@abstractmethod
 	def _image2text(self, model: Model, prompt: str, media: List[ImageMedia], **kwargs: Any) -> str:
 		"""Platform-specific execution interface for image-to-text conversion"""
 		pass
 
+	async def _aimage2text(self, model: Model, prompt: str, media: List[ImageMedia], **kwargs: Any) -> str:
+		"""Platform-specific async execution interface for image-to-text conversion"""
+		return await asyncio.to_thread(self._image2text, model, prompt, media=media, **kwargs)
+
+	def _image2text_call(self, model: Model, prompt: str, media: List[ImageMedia], **kwargs: Any) -> Callable[[], str]:
+		"""
+		The call made, and retried, for an image2text request. The platforms encoding the images
+		override it to encode them on the first attempt only, the retries send the same request.
+		"""
+		return lambda: self._image2text(model, prompt, media=media, **kwargs)
+
+	def _aimage2text_call(self, model: Model, prompt: str, media: List[ImageMedia], **kwargs: Any) -> Callable[[], Awaitable[str]]:
+		"""Async version of _image2text_call"""
+		return lambda: self._aimage2text(model, prompt, media=media, **kwargs)
+
 
 	def image2image(self, model: str, prompt: str, media: List[ImageMedia], **kwargs: Any) -> ImageMedia:
 		"""
@@ -116,12 +768,68 @@ class Platform(ABC):
         Returns:
             ImageMedia: Transformed image media object
         """
-		platform_model = ModelRegistry.getModelByName(model, self._name)
+		platform_model, kwargs = self._resolve_call(model, kwargs)
+		if media is not None:
+			image = media[0]
+			key = self._request_key("image2image", platform_model, prompt, media=[image], **kwargs)
+			return self._cached_call(key, lambda: self._image2image(platform_model, prompt, media=image, **kwargs))
+
+	async def aimage2image(self, model: str, prompt: str, media: List[ImageMedia], **kwargs: Any) -> ImageMedia:
+		"""
+		Async version of image2image.
+
+		Args:
+			model: The model identifier to use
+			prompt: The input text prompt guiding the transformation
+			media: List of ImageMedia objects to process
+			**kwargs: Additional platform-specific arguments
+
+		Returns:
+			ImageMedia: Transformed image media object
+		"""
+		platform_model, kwargs = self._resolve_call(model, kwargs)
 		if media is not None:
 			image = media[0]
-			return self._image2image(platform_model, prompt, media=image, **kwargs)
+			key = self._request_key("image2image", platform_model, prompt, media=[image], **kwargs)
+			return await self._acached_call(key, lambda: self._aimage2image(platform_model, prompt, media=image, **kwargs))
 
 	@abstractmethod
 	def _image2image(self, model: Model, prompt: str, media: ImageMedia, **kwargs: Any) -> ImageMedia:
 		"""Platform-specific execution interface for image-to-image conversion"""
 		pass
+
+	async def _aimage2image(self, model: Model, prompt: str, media: ImageMedia, **kwargs: Any) -> ImageMedia:
+		"""Platform-specific async execution interface for image-to-image conversion"""
+		return await asyncio.to_thread(self._image2image, model, prompt, media=media, **kwargs)
+
+
+async def _aclose_client(client: Any) -> None:
+	close = getattr(client, "aclose", None) or getattr(client, "close", None)
+	if close is None:
+		return
+	try:
+		result = close()
+		if inspect.isawaitable(result):
+			await result
+	except Exception:
+		logger.warning("Failed to close async client", exc_info=True)
+
+
+def _close_stale_async_client(loop: asyncio.AbstractEventLoop, client: Any) -> None:
+	"""
+	Close an async client created for another event loop, its connections belong to that loop.
+	The close is scheduled on the loop while it is open. A closed loop can't run it anymore :
+	the client is released, asyncio closes the sockets of its transports when they are collected.
+	"""
+	if loop.is_closed():
+		logger.debug("event loop of %r is closed, releasing the client", client)
+		return
+	asyncio.run_coroutine_threadsafe(_aclose_client(client), loop)
+
+
+def _seeded_params(model: Model, count: int, kwargs: Dict[str, Any]) -> List[Dict[str, Any]]:
+	"""The kwargs of each image of a batch : a fixed seed is incremented, like the sdapi batches do"""
+	seed = kwargs.get("seed", model.default_params().get("seed", -1))
+	if seed is None or seed == -1:
+		return [dict(kwargs) for _ in range(count)]
+	return [{**kwargs, "seed": seed + index} for index in range(count)]
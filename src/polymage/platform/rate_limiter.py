@@ -0,0 +1,275 @@
+import re
+import time
+import asyncio
+import logging
+import threading
+from dataclasses import dataclass, replace
+from email.utils import parsedate_to_datetime
+from typing import Any, Mapping, Optional
+
+logger = logging.getLogger(__name__)
+logger.addHandler(logging.NullHandler())
+
+"""
+client side rate limiting of the platforms
+
+A token bucket per quota (requests per minute, tokens per minute), shared by the threads
+and the asyncio tasks using the same platform. The buckets are adjusted with the rate limit
+headers sent by the providers, so we can run close to the quota without being throttled.
+"""
+
+# wait applied after a 429 response without any retry-after header
+DEFAULT_THROTTLED_WAIT = 1.0
+# longest block applied from the headers, a bogus reset value must not stall the platform
+DEFAULT_MAX_BLOCK = 60.0
+# reset values above this are absolute times (epoch seconds, or milliseconds), not durations
+_EPOCH_THRESHOLD = 1e9
+# marks the httpx responses already fed to the limiter, in their extensions
+_OBSERVED = "polymage.rate_limiter.observed"
+
+_DURATION_PART = re.compile(r"(\d+(?:\.\d+)?)(ms|h|m|s)")
+
+
+def parse_duration(value: str) -> Optional[float]:
+	"""
+	Parse a reset duration, as sent in the rate limit headers.
+
+	Accepts plain seconds ("7.5") and the Go style durations used by Groq and OpenAI ("1m30.5s", "6ms").
+
+	Returns:
+		Optional[float]: The duration in seconds, None if the value can't be parsed
+	"""
+	value = value.strip()
+	try:
+		return max(float(value), 0.0)
+	except ValueError:
+		pass
+	parts = _DURATION_PART.findall(value)
+	if not parts or "".join(number + unit for number, unit in parts) != value:
+		return None
+	units = {"ms": 0.001, "s": 1.0, "m": 60.0, "h": 3600.0}
+	return sum(float(number) * units[unit] for number, unit in parts)
+
+
+def parse_retry_after(value: str) -> Optional[float]:
+	"""Parse a retry-after header : a number of seconds, or an HTTP date"""
+	seconds = parse_duration(value)
+	if seconds is not None:
+		return seconds
+	try:
+		return max(parsedate_to_datetime(value).timestamp() - time.time(), 0.0)
+	except (TypeError, ValueError):
+		return None
+
+
+def parse_reset(value: str) -> Optional[float]:
+	"""
+	Parse an x-ratelimit-reset header : a duration, or an absolute time in epoch seconds
+	or milliseconds, as sent by some providers.
+
+	Returns:
+		Optional[float]: The number of seconds until the reset, None if the value can't be parsed
+	"""
+	seconds = parse_duration(value)
+	if seconds is None or seconds < _EPOCH_THRESHOLD:
+		return seconds
+	if seconds >= _EPOCH_THRESHOLD * 1000:
+		seconds /= 1000.0
+	return max(seconds - time.time(), 0.0)
+
+
+class TokenBucket:
+	"""
+	Token bucket refilled continuously at rate_per_minute.
+
+	A reservation is always granted : the level can go below zero, the caller then
+	waits until the bucket is refilled. The waits are ordered, so the callers are served fairly.
+
+	Args:
+		rate_per_minute (float): Refill rate of the bucket
+		capacity (Optional[float]): Maximum burst, defaults to one minute of quota
+	"""
+
+	def __init__(self, rate_per_minute: float, capacity: Optional[float] = None) -> None:
+		if rate_per_minute <= 0:
+			raise ValueError("rate_per_minute must be positive")
+		self.rate = rate_per_minute / 60.0
+		self.capacity = capacity if capacity is not None else rate_per_minute
+		self.level = self.capacity
+		self._updated = time.monotonic()
+
+	def _refill(self, now: float) -> None:
+		self.level = min(self.capacity, self.level + (now - self._updated) * self.rate)
+		self._updated = now
+
+	def reserve(self, amount: float, now: float) -> float:
+		"""Take amount from the bucket, and return the number of seconds to wait before using it"""
+		self._refill(now)
+		self.level -= amount
+		return 0.0 if self.level >= 0 else -self.level / self.rate
+
+	def clamp(self, remaining: float, now: float) -> None:
+		"""The provider knows better : never assume more than its remaining quota"""
+		self._refill(now)
+		self.level = min(self.level, remaining)
+
+
+@dataclass
+class RateLimiterStats:
+	"""
+	Statistics of a RateLimiter.
+
+	Attributes:
+		acquired (int): Number of granted requests
+		throttled (int): Number of requests that had to wait
+		waited (float): Total waiting time, in seconds
+		rate_limited (int): Number of 429 responses received
+	"""
+	acquired: int = 0
+	throttled: int = 0
+	waited: float = 0.0
+	rate_limited: int = 0
+
+
+class RateLimiter:
+	"""
+	Requests per minute and tokens per minute limiter, for one platform.
+
+	The limiter is thread-safe and can be shared by the sync and async calls, or by several
+	platform instances using the same API key. Without any configured quota it only follows
+	the rate limit headers of the provider (retry-after, x-ratelimit-remaining-*, x-ratelimit-reset-*).
+
+	Args:
+		requests_per_minute (Optional[float]): Requests quota, None for unlimited
+		tokens_per_minute (Optional[float]): Tokens quota (prompt and completion), None for unlimited
+		burst (Optional[float]): Maximum number of requests sent at once, defaults to the requests per minute
+		max_block (float): Longest wait, in seconds, applied from the retry-after and reset headers
+
+	Example:
+		limiter = RateLimiter(requests_per_minute=30, tokens_per_minute=6000)
+		platform = GroqPlatform(api_key=api_key, rate_limiter=limiter)
+	"""
+
+	def __init__(self, requests_per_minute: Optional[float] = None, tokens_per_minute: Optional[float] = None,
+				 burst: Optional[float] = None, max_block: float = DEFAULT_MAX_BLOCK) -> None:
+		if max_block <= 0:
+			raise ValueError("max_block must be positive")
+		self._lock = threading.Lock()
+		self._requests = TokenBucket(requests_per_minute, burst) if requests_per_minute else None
+		self._tokens = TokenBucket(tokens_per_minute) if tokens_per_minute else None
+		# set by a retry-after header, or an exhausted quota
+		self._blocked_until = 0.0
+		self._max_block = max_block
+		self._stats = RateLimiterStats()
+
+	def stats(self) -> RateLimiterStats:
+		"""A snapshot of the limiter statistics"""
+		with self._lock:
+			return replace(self._stats)
+
+	def _reserve(self, tokens: float) -> float:
+		with self._lock:
+			now = time.monotonic()
+			wait = max(self._blocked_until - now, 0.0)
+			if self._requests is not None:
+				wait = max(wait, self._requests.reserve(1, now))
+			if self._tokens is not None and tokens > 0:
+				wait = max(wait, self._tokens.reserve(tokens, now))
+			self._stats.acquired += 1
+			if wait > 0:
+				self._stats.throttled += 1
+				self._stats.waited += wait
+			return wait
+
+	def acquire(self, tokens: float = 0) -> float:
+		"""
+		Wait until a request of tokens tokens can be sent.
+
+		Args:
+			tokens (float): Estimated number of tokens used by the request
+
+		Returns:
+			float: The number of seconds waited
+		"""
+		wait = self._reserve(tokens)
+		if wait > 0:
+			logger.debug("rate limited, waiting %.3fs", wait)
+			time.sleep(wait)
+		return wait
+
+	async def aacquire(self, tokens: float = 0) -> float:
+		"""Async version of acquire, the event loop is not blocked while waiting"""
+		wait = self._reserve(tokens)
+		if wait > 0:
+			logger.debug("rate limited, waiting %.3fs", wait)
+			await asyncio.sleep(wait)
+		return wait
+
+	def observe(self, headers: Mapping[str, str], status_code: Optional[int] = None) -> None:
+		"""
+		Adjust the limiter with the rate limit headers of a response.
+
+		Args:
+			headers (Mapping[str, str]): The response headers
+			status_code (Optional[int]): The response status code
+		"""
+		headers = {key.lower(): value for key, value in headers.items()}
+		now = time.monotonic()
+		blocked_for = None
+
+		retry_after = headers.get("retry-after-ms")
+		if retry_after is not None:
+			seconds = parse_duration(retry_after)
+			blocked_for = seconds / 1000.0 if seconds is not None else None
+		elif headers.get("retry-after") is not None:
+			blocked_for = parse_retry_after(headers["retry-after"])
+
+		with self._lock:
+			# some providers use x-ratelimit-remaining for the requests quota
+			for suffix, bucket in (("-requests", self._requests), ("", self._requests), ("-tokens", self._tokens)):
+				remaining = _parse_number(headers.get(f"x-ratelimit-remaining{suffix}"))
+				if remaining is None:
+					continue
+				reset = headers.get(f"x-ratelimit-reset{suffix}")
+				reset_seconds = parse_reset(reset) if reset is not None else None
+				if remaining <= 0 and reset_seconds is not None:
+					# the quota is full again after the reset
+					blocked_for = max(blocked_for or 0.0, reset_seconds)
+				elif bucket is not None:
+					bucket.clamp(remaining, now)
+
+			if status_code == 429:
+				self._stats.rate_limited += 1
+				if blocked_for is None:
+					blocked_for = DEFAULT_THROTTLED_WAIT
+			if blocked_for:
+				blocked_for = min(blocked_for, self._max_block)
+				self._blocked_until = max(self._blocked_until, now + blocked_for)
+				logger.debug("provider quota exhausted, blocking the requests for %.3fs", blocked_for)
+
+	def observe_response(self, response: Any) -> None:
+		"""
+		Adjust the limiter with a response, only once : the response hook of the httpx clients
+		and observe_error can see the same response.
+		"""
+		extensions = getattr(response, "extensions", None)
+		if isinstance(extensions, dict):
+			if extensions.get(_OBSERVED):
+				return
+			extensions[_OBSERVED] = True
+		headers = getattr(response, "headers", None)
+		if headers is not None:
+			self.observe(headers, getattr(response, "status_code", None))
+
+	def observe_error(self, error: BaseException) -> None:
+		"""Adjust the limiter with the response attached to an SDK or httpx error, if any"""
+		self.observe_response(getattr(error, "response", None))
+
+
+def _parse_number(value: Any) -> Optional[float]:
+	if value is None:
+		return None
+	try:
+		return float(value)
+	except (TypeError, ValueError):
+		return None
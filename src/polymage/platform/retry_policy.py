@@ -0,0 +1,184 @@
+import json
+import time
+import logging
+import threading
+from typing import Any, FrozenSet, Optional, Tuple, Type
+import httpx
+from tenacity import (
+	AsyncRetrying,
+	Retrying,
+	before_sleep_log,
+	retry_if_exception,
+	stop_after_attempt,
+	stop_after_delay,
+	wait_random_exponential,
+)
+
+logger = logging.getLogger(__name__)
+logger.addHandler(logging.NullHandler())
+
+"""
+retry policy and circuit breaker, shared by all the platforms
+
+The transient failures (connection resets, timeouts, 5xx and 429 responses, invalid JSON
+in a structured output) are retried with a jittered exponential backoff. When a backend is down,
+the circuit breaker fails fast instead of waiting for a connect timeout on every call.
+"""
+
+# errors raised when the backend can't be reached, whatever the SDK
+UNAVAILABLE_ERRORS: Tuple[Type[BaseException], ...] = (httpx.TransportError, ConnectionError, TimeoutError)
+
+RETRYABLE_STATUS_CODES: FrozenSet[int] = frozenset({408, 425, 429, 500, 502, 503, 504})
+
+
+class CircuitOpenError(RuntimeError):
+	"""Raised instead of calling a backend considered down by its circuit breaker"""
+
+	def __init__(self, name: str, retry_in: float) -> None:
+		super().__init__(f"{name} is unavailable, calls are rejected for {retry_in:.1f}s")
+		self.retry_in = retry_in
+
+
+def status_code(error: BaseException) -> Optional[int]:
+	"""HTTP status code of an httpx or SDK error, None if the error has no response"""
+	code = getattr(error, "status_code", None)
+	if code is None:
+		code = getattr(getattr(error, "response", None), "status_code", None)
+	return code if isinstance(code, int) else None
+
+
+class RetryPolicy:
+	"""
+	Retry policy of the platform calls.
+
+	Args:
+		max_attempts (int): Maximum number of attempts, including the first one
+		max_elapsed (float): Stop retrying after this number of seconds
+		initial_wait (float): Base of the exponential backoff, in seconds
+		max_wait (float): Maximum wait between two attempts, in seconds
+		retry_on (Tuple[Type[BaseException], ...]): Additional error classes to retry
+		retry_statuses (FrozenSet[int]): HTTP status codes to retry
+
+	Example:
+		platform = GroqPlatform(api_key=api_key, retry_policy=RetryPolicy(max_attempts=6, max_elapsed=120))
+	"""
+
+	def __init__(self, max_attempts: int = 4, max_elapsed: float = 60.0, initial_wait: float = 0.5,
+				 max_wait: float = 20.0, retry_on: Tuple[Type[BaseException], ...] = (),
+				 retry_statuses: FrozenSet[int] = RETRYABLE_STATUS_CODES) -> None:
+		if max_attempts < 1:
+			raise ValueError("max_attempts must be at least 1")
+		self.max_attempts = max_attempts
+		self.max_elapsed = max_elapsed
+		self.initial_wait = initial_wait
+		self.max_wait = max_wait
+		self.retry_on = retry_on
+		self.retry_statuses = retry_statuses
+
+	def is_transient(self, error: BaseException, unavailable_errors: Tuple[Type[BaseException], ...] = ()) -> bool:
+		"""True when a new attempt may succeed"""
+		if isinstance(error, CircuitOpenError):
+			return False
+		if isinstance(error, UNAVAILABLE_ERRORS + unavailable_errors + self.retry_on + (json.JSONDecodeError,)):
+			return True
+		return status_code(error) in self.retry_statuses
+
+	def _options(self, unavailable_errors: Tuple[Type[BaseException], ...]) -> dict:
+		return dict(
+			retry=retry_if_exception(lambda e: self.is_transient(e, unavailable_errors)),
+			stop=stop_after_attempt(self.max_attempts) | stop_after_delay(self.max_elapsed),
+			wait=wait_random_exponential(multiplier=self.initial_wait, max=self.max_wait),
+			before_sleep=before_sleep_log(logger, logging.WARNING),
+			reraise=True,
+		)
+
+	def retrying(self, unavailable_errors: Tuple[Type[BaseException], ...] = ()) -> Retrying:
+		"""
+		A tenacity controller for a sync call.
+
+		Args:
+			unavailable_errors: The SDK specific errors raised when the backend can't be reached
+		"""
+		return Retrying(**self._options(unavailable_errors))
+
+	def aretrying(self, unavailable_errors: Tuple[Type[BaseException], ...] = ()) -> AsyncRetrying:
+		"""A tenacity controller for an async call"""
+		return AsyncRetrying(**self._options(unavailable_errors))
+
+
+class CircuitBreaker:
+	"""
+	Circuit breaker of a platform.
+
+	After failure_threshold consecutive failures showing the backend is unavailable
+	(connection errors, timeouts, 5xx responses), the circuit opens and the calls fail
+	immediately with a CircuitOpenError. After recovery_timeout seconds a single trial call
+	is let through : its success closes the circuit, its failure opens it again.
+	The streamed calls are not guarded by the circuit breaker.
+
+	Args:
+		name (str): Name used in the error messages
+		failure_threshold (int): Consecutive failures opening the circuit
+		recovery_timeout (float): Seconds before a trial call is let through
+	"""
+
+	CLOSED = "closed"
+	OPEN = "open"
+	HALF_OPEN = "half_open"
+
+	def __init__(self, name: str = "platform", failure_threshold: int = 5, recovery_timeout: float = 30.0) -> None:
+		self._name = name
+		self._failure_threshold = failure_threshold
+		self._recovery_timeout = recovery_timeout
+		self._lock = threading.Lock()
+		self._state = self.CLOSED
+		self._failures = 0
+		self._opened_at = 0.0
+
+	@property
+	def state(self) -> str:
+		with self._lock:
+			return self._state
+
+	def before_call(self) -> None:
+		"""
+		Check the circuit before a call.
+
+		Raises:
+			CircuitOpenError: If the circuit is open, or a trial call is already in flight
+		"""
+		with self._lock:
+			if self._state == self.CLOSED:
+				return
+			now = time.monotonic()
+			retry_in = self._opened_at + self._recovery_timeout - now
+			# a trial that didn't report back within recovery_timeout (cancelled call) is replaced
+			if retry_in <= 0:
+				# let this call through, as a trial
+				self._state = self.HALF_OPEN
+				self._opened_at = now
+				logger.info("%s circuit half-open, trying a call", self._name)
+				return
+		raise CircuitOpenError(self._name, max(retry_in, 0.0))
+
+	def record_success(self) -> None:
+		with self._lock:
+			if self._state != self.CLOSED:
+				logger.info("%s circuit closed", self._name)
+			self._state = self.CLOSED
+			self._failures = 0
+
+	def record_failure(self, error: BaseException, unavailable_errors: Tuple[Type[BaseException], ...] = ()) -> None:
+		"""Record a failed call, only the errors showing the backend is down are counted"""
+		code = status_code(error)
+		if not isinstance(error, UNAVAILABLE_ERRORS + unavailable_errors) and (code is None or code < 500):
+			# the backend answered : it is up
+			self.record_success()
+			return
+		with self._lock:
+			self._failures += 1
+			if self._state == self.HALF_OPEN or self._failures >= self._failure_threshold:
+				if self._state != self.OPEN:
+					logger.warning("%s circuit open after %d failures: %s", self._name, self._failures, error)
+				self._state = self.OPEN
+				self._opened_at = time.monotonic()
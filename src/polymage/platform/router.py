@@ -0,0 +1,462 @@
+import math
+import time
+import random
+import asyncio
+import logging
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, Future
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional, Tuple
+
+from pydantic import BaseModel
+
+from polymage.registry import ModelRegistry
+from polymage.model.model import Model
+from polymage.media.media import Media
+from polymage.media.image_media import ImageMedia
+from polymage.platform.platform import Platform
+from polymage.platform.retry_policy import CircuitOpenError
+
+logger = logging.getLogger(__name__)
+logger.addHandler(logging.NullHandler())
+
+"""
+router platform
+
+A logical model (e.g. flux-1-schnell) can be served by several platforms. The router sends
+each call to the platform with the best expected latency, using live statistics, and fails over
+to the next platform when a call fails on a transient error or an unavailable platform. The other
+errors (invalid parameters, 4xx responses) would fail on every platform, they are raised at once.
+
+With hedging enabled, a call still running after a percentile of its usual latency is duplicated
+on the next platform. An async call returns the first response and cancels the other one. A sync
+call runs on the caller's thread and can't be abandoned : the hedge answers when it fails.
+"""
+
+DEFAULT_EWMA_ALPHA = 0.3
+# an error rate close to 1 must not give an infinite cost, the platform is still tried last
+MIN_SUCCESS_RATE = 0.05
+
+
+@dataclass
+class RouteStats:
+	"""
+	Live statistics of a platform, for one logical model.
+
+	Attributes:
+		platform (str): The platform name
+		model (str): The logical model name
+		latency (Optional[float]): EWMA of the successful calls latency in seconds, None until a call succeeds
+		error_rate (float): EWMA of the failures, between 0 and 1
+		in_flight (int): Number of calls currently running on the platform
+		calls (int): Total number of calls
+		failures (int): Total number of failed calls
+		hedges (int): Number of duplicate requests sent to the platform by hedging
+		hedge_wins (int): Number of hedges that answered first
+	"""
+	platform: str
+	model: str
+	latency: Optional[float] = None
+	error_rate: float = 0.0
+	in_flight: int = 0
+	calls: int = 0
+	failures: int = 0
+	hedges: int = 0
+	hedge_wins: int = 0
+
+	def cost(self, default_latency: float) -> float:
+		"""
+		Expected time to serve one more call : latency, times the queue depth, penalized by the errors.
+
+		Args:
+			default_latency (float): Latency assumed for a platform that failed before any success
+		"""
+		if self.latency is None and self.failures == 0:
+			# never used : try it
+			return 0.0
+		latency = self.latency if self.latency is not None else default_latency
+		return latency * (self.in_flight + 1) / max(1.0 - self.error_rate, MIN_SUCCESS_RATE)
+
+
+@dataclass
+class HedgePolicy:
+	"""
+	Hedging of the slow calls.
+
+	Attributes:
+		percentile (float): A call still running after this percentile of the platform latency is hedged
+		max_extra_load (float): Maximum ratio of hedged calls, 0.05 adds at most 5% of requests
+		min_samples (int): Minimum number of observed latencies before hedging a platform
+		window (int): Number of recent latencies used to compute the percentile
+		max_workers (int): Worker threads running the sync hedged calls
+	"""
+	percentile: float = 0.95
+	max_extra_load: float = 0.05
+	min_samples: int = 20
+	window: int = 200
+	max_workers: int = 32
+
+
+class RouterPlatform(Platform):
+	"""
+	Platform dispatching each call to one of the platforms serving the requested model.
+
+	The candidates are ranked by cost (EWMA latency x queue depth, penalized by the EWMA
+	error rate), the platforms never used for a model are tried first. When a call fails on a
+	transient error (as classified by the retry policy of the platform) or an open circuit,
+	the next candidate is tried, the error of the last one is raised when all of them fail.
+
+	The router only dispatches : the cache, the rate limiting and the retries are the ones of the
+	platforms. The platforms belong to the caller, closing the router doesn't close them.
+
+	Args:
+		platforms (List[Platform]): The platforms to route to, one per platform name
+		alpha (float): Smoothing factor of the EWMA statistics, higher reacts faster
+		hedge (Optional[HedgePolicy]): Enables the hedging of the slow calls, disabled by default
+
+	Example:
+		router = RouterPlatform([HuggingFacePlatform(api_key=hf_key), CloudflarePlatform(...), DrawThingsPlatform()])
+		image = router.text2image(model="flux-1-schnell", prompt="a lighthouse at dawn")
+
+		# duplicate the captions slower than the p95 latency, for at most 5% of the calls
+		router = RouterPlatform([GroqPlatform(api_key=groq_key), TogetherAiPlatform(api_key=together_key)], hedge=HedgePolicy())
+	"""
+
+	def __init__(self, platforms: List[Platform], alpha: float = DEFAULT_EWMA_ALPHA,
+				 hedge: Optional[HedgePolicy] = None) -> None:
+		super().__init__('router')
+		if not platforms:
+			raise ValueError("RouterPlatform needs at least one platform")
+		self._platforms: Dict[str, Platform] = {platform.platform_name(): platform for platform in platforms}
+		self._alpha = alpha
+		self._stats: Dict[Tuple[str, str], RouteStats] = {}
+		self._stats_lock = threading.Lock()
+		# hedging
+		self._hedge = hedge
+		self._latencies: Dict[Tuple[str, str], Deque[float]] = {}
+		self._routed_count = 0
+		self._hedge_count = 0
+		self._executor: Optional[ThreadPoolExecutor] = None
+
+	def platforms(self) -> List[Platform]:
+		return list(self._platforms.values())
+
+	def stats(self) -> List[RouteStats]:
+		"""A snapshot of the statistics of every (platform, model) used so far"""
+		with self._stats_lock:
+			return [RouteStats(**vars(stats)) for stats in self._stats.values()]
+
+	#
+	# routing
+	#
+	def _candidates(self, model: str) -> List[Platform]:
+		"""The platforms serving model, best first"""
+		served_by = ModelRegistry.snapshot().platforms(model)
+		platforms = [platform for name, platform in self._platforms.items() if name in served_by]
+		if not platforms:
+			raise ValueError(f"No platform of the router serves model '{model}'.")
+		with self._stats_lock:
+			stats = [self._route_stats(platform, model) for platform in platforms]
+			latencies = [s.latency for s in stats if s.latency is not None]
+			default_latency = max(latencies) if latencies else 1.0
+			# random tie-break, so the new platforms share the first calls
+			ranked = [(s.cost(default_latency), random.random(), platform) for s, platform in zip(stats, platforms)]
+		ranked.sort(key=lambda entry: entry[:2])
+		return [platform for _, _, platform in ranked]
+
+	def _route_stats(self, platform: Platform, model: str) -> RouteStats:
+		"""The statistics of platform for model, call with _stats_lock held"""
+		key = (platform.platform_name(), model.lower())
+		stats = self._stats.get(key)
+		if stats is None:
+			stats = RouteStats(platform=key[0], model=key[1])
+			self._stats[key] = stats
+		return stats
+
+	def _started(self, platform: Platform, model: str) -> float:
+		with self._stats_lock:
+			stats = self._route_stats(platform, model)
+			stats.in_flight += 1
+			stats.calls += 1
+		return time.perf_counter()
+
+	def _finished(self, platform: Platform, model: str, start: float, error: Optional[BaseException]) -> None:
+		latency = time.perf_counter() - start
+		with self._stats_lock:
+			stats = self._route_stats(platform, model)
+			stats.in_flight -= 1
+			stats.error_rate += self._alpha * ((1.0 if error is not None else 0.0) - stats.error_rate)
+			if error is not None:
+				stats.failures += 1
+			# a failure is often fast (connection refused), it doesn't say anything about the latency
+			elif stats.latency is None:
+				stats.latency = latency
+			else:
+				stats.latency += self._alpha * (latency - stats.latency)
+			if error is None and self._hedge is not None:
+				key = (stats.platform, stats.model)
+				if key not in self._latencies:
+					self._latencies[key] = deque(maxlen=self._hedge.window)
+				self._latencies[key].append(latency)
+
+	def _abandoned(self, platform: Platform, model: str) -> None:
+		"""A cancelled call : its latency and outcome are unknown"""
+		with self._stats_lock:
+			self._route_stats(platform, model).in_flight -= 1
+
+	def _timed_call(self, platform: Platform, model: str, call: Callable[[Platform], Any]) -> Any:
+		start = self._started(platform, model)
+		try:
+			value = call(platform)
+		except Exception as e:
+			self._finished(platform, model, start, e)
+			raise
+		self._finished(platform, model, start, None)
+		return value
+
+	async def _atimed_call(self, platform: Platform, model: str, call: Callable[[Platform], Awaitable[Any]]) -> Any:
+		start = self._started(platform, model)
+		try:
+			value = await call(platform)
+		except asyncio.CancelledError:
+			self._abandoned(platform, model)
+			raise
+		except Exception as e:
+			self._finished(platform, model, start, e)
+			raise
+		self._finished(platform, model, start, None)
+		return value
+
+	@staticmethod
+	def _fails_over(platform: Platform, error: BaseException) -> bool:
+		"""True when the call may succeed on another platform : transient error, or platform unavailable"""
+		if isinstance(error, CircuitOpenError):
+			return True
+		return platform.is_transient(error)
+
+	def _failover(self, model: str, call: Callable[[Platform], Any], candidates: List[Platform]) -> Any:
+		"""Try the candidates in turn, until one of them succeeds"""
+		error: Optional[BaseException] = None
+		for platform in candidates:
+			try:
+				return self._timed_call(platform, model, call)
+			except Exception as e:
+				if not self._fails_over(platform, e):
+					raise
+				logger.warning("%s failed on %s, failing over: %s", model, platform.platform_name(), e)
+				error = e
+		raise error
+
+	async def _afailover(self, model: str, call: Callable[[Platform], Awaitable[Any]], candidates: List[Platform]) -> Any:
+		"""Async version of _failover"""
+		error: Optional[BaseException] = None
+		for platform in candidates:
+			try:
+				return await self._atimed_call(platform, model, call)
+			except Exception as e:
+				if not self._fails_over(platform, e):
+					raise
+				logger.warning("%s failed on %s, failing over: %s", model, platform.platform_name(), e)
+				error = e
+		raise error
+
+	#
+	# hedging
+	#
+	def _hedge_delay(self, candidates: List[Platform], model: str) -> Optional[float]:
+		"""Time after which a call on the first candidate is hedged, None when the call can't be hedged"""
+		if self._hedge is None or len(candidates) < 2:
+			return None
+		with self._stats_lock:
+			self._routed_count += 1
+			samples = self._latencies.get((candidates[0].platform_name(), model.lower()))
+			if samples is None or len(samples) < self._hedge.min_samples:
+				return None
+			ordered = sorted(samples)
+		return ordered[max(math.ceil(self._hedge.percentile * len(ordered)) - 1, 0)]
+
+	def _take_hedge(self, platform: Platform, model: str) -> bool:
+		"""Count a hedge, unless the extra load budget is exhausted"""
+		with self._stats_lock:
+			if self._hedge_count + 1 > self._hedge.max_extra_load * self._routed_count:
+				return False
+			self._hedge_count += 1
+			self._route_stats(platform, model).hedges += 1
+		logger.debug("hedging %s on %s", model, platform.platform_name())
+		return True
+
+	def _hedge_won(self, platform: Platform, model: str) -> None:
+		with self._stats_lock:
+			self._route_stats(platform, model).hedge_wins += 1
+
+	def _hedge_executor(self) -> ThreadPoolExecutor:
+		with self._stats_lock:
+			if self._executor is None:
+				self._executor = ThreadPoolExecutor(max_workers=self._hedge.max_workers, thread_name_prefix="polymage-hedge")
+			return self._executor
+
+	def _hedged_call(self, model: str, call: Callable[[Platform], Any], candidates: List[Platform], delay: float) -> Any:
+		"""
+		Run the call on the first candidate in the caller's thread, and duplicate it on the second one
+		in the hedge executor if it is still running after delay. A sync call can't be abandoned :
+		the caller waits for the first candidate, the hedge answers when the first candidate fails
+		(a slow call often ends in a timeout), its result is dropped otherwise.
+		"""
+		primary, secondary = candidates[0], candidates[1]
+		hedges: List[Future] = []
+		lock = threading.Lock()
+		finished = False
+
+		def start_hedge() -> None:
+			with lock:
+				if not finished and self._take_hedge(secondary, model):
+					hedges.append(self._hedge_executor().submit(self._timed_call, secondary, model, call))
+
+		timer = threading.Timer(delay, start_hedge)
+		timer.daemon = True
+		timer.start()
+		try:
+			return self._timed_call(primary, model, call)
+		except Exception as e:
+			if not self._fails_over(primary, e):
+				raise
+			logger.warning("%s failed on %s, failing over: %s", model, primary.platform_name(), e)
+			error: BaseException = e
+		finally:
+			with lock:
+				finished = True
+			timer.cancel()
+
+		remaining = candidates[1:]
+		if hedges:
+			try:
+				value = hedges[0].result()
+			except Exception as e:
+				if not self._fails_over(secondary, e):
+					raise
+				error = e
+			else:
+				self._hedge_won(secondary, model)
+				return value
+			remaining = candidates[2:]
+		if remaining:
+			return self._failover(model, call, remaining)
+		raise error
+
+	async def _ahedged_call(self, model: str, call: Callable[[Platform], Awaitable[Any]], candidates: List[Platform], delay: float) -> Any:
+		"""Async version of _hedged_call, the loser is cancelled"""
+		primary, secondary = candidates[0], candidates[1]
+		tasks: Dict[asyncio.Task, Platform] = {asyncio.ensure_future(self._atimed_call(primary, model, call)): primary}
+		done, _ = await asyncio.wait(tasks, timeout=delay)
+		if not done and self._take_hedge(secondary, model):
+			tasks[asyncio.ensure_future(self._atimed_call(secondary, model, call))] = secondary
+
+		error: Optional[BaseException] = None
+		pending = set(tasks)
+		try:
+			while pending:
+				done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+				for task in done:
+					if task.exception() is None:
+						if tasks[task] is secondary:
+							self._hedge_won(secondary, model)
+						return task.result()
+					error = task.exception()
+					if not self._fails_over(tasks[task], error):
+						raise error
+		finally:
+			for task in pending:
+				task.cancel()
+		remaining = [platform for platform in candidates if platform not in tasks.values()]
+		if remaining:
+			return await self._afailover(model, call, remaining)
+		raise error
+
+	def _route(self, model: str, call: Callable[[Platform], Any]) -> Any:
+		"""Make the call on the best platform, hedging the slow calls and failing over to the next ones"""
+		candidates = self._candidates(model)
+		delay = self._hedge_delay(candidates, model)
+		if delay is not None:
+			return self._hedged_call(model, call, candidates, delay)
+		return self._failover(model, call, candidates)
+
+	async def _aroute(self, model: str, call: Callable[[Platform], Awaitable[Any]]) -> Any:
+		"""Async version of _route"""
+		candidates = self._candidates(model)
+		delay = self._hedge_delay(candidates, model)
+		if delay is not None:
+			return await self._ahedged_call(model, call, candidates, delay)
+		return await self._afailover(model, call, candidates)
+
+	#
+	# the public interface is routed as is, each platform uses its own models, cache,
+	# rate limiter and retry policy
+	#
+	def text2text(self, model: str, prompt: str, media: Optional[List[Media]] = None,
+				  response_model: Optional[str] = None, stream: bool = False, **kwargs: Any) -> Any:
+		if stream:
+			# a stream can't fail over once started, send it to the best platform
+			return self._candidates(model)[0].text2text(model, prompt, media=media, response_model=response_model, stream=True, **kwargs)
+		return self._route(model, lambda platform: platform.text2text(model, prompt, media=media, response_model=response_model, **kwargs))
+
+	async def atext2text(self, model: str, prompt: str, media: Optional[List[Media]] = None,
+						 response_model: Optional[str] = None, stream: bool = False, **kwargs: Any) -> Any:
+		if stream:
+			return await self._candidates(model)[0].atext2text(model, prompt, media=media, response_model=response_model, stream=True, **kwargs)
+		return await self._aroute(model, lambda platform: platform.atext2text(model, prompt, media=media, response_model=response_model, **kwargs))
+
+	def text2image(self, model: str, prompt: str, **kwargs: Any) -> ImageMedia:
+		return self._route(model, lambda platform: platform.text2image(model, prompt, **kwargs))
+
+	async def atext2image(self, model: str, prompt: str, **kwargs: Any) -> ImageMedia:
+		return await self._aroute(model, lambda platform: platform.atext2image(model, prompt, **kwargs))
+
+	def text2images(self, model: str, prompt: str, count: int, **kwargs: Any) -> List[ImageMedia]:
+		return self._route(model, lambda platform: platform.text2images(model, prompt, count, **kwargs))
+
+	async def atext2images(self, model: str, prompt: str, count: int, **kwargs: Any) -> List[ImageMedia]:
+		return await self._aroute(model, lambda platform: platform.atext2images(model, prompt, count, **kwargs))
+
+	def image2text(self, model: str, prompt: str, media: List[ImageMedia], **kwargs: Any) -> str:
+		return self._route(model, lambda platform: platform.image2text(model, prompt, media=media, **kwargs))
+
+	async def aimage2text(self, model: str, prompt: str, media: List[ImageMedia], **kwargs: Any) -> str:
+		return await self._aroute(model, lambda platform: platform.aimage2text(model, prompt, media=media, **kwargs))
+
+	def image2image(self, model: str, prompt: str, media: List[ImageMedia], **kwargs: Any) -> ImageMedia:
+		return self._route(model, lambda platform: platform.image2image(model, prompt, media=media, **kwargs))
+
+	async def aimage2image(self, model: str, prompt: str, media: List[ImageMedia], **kwargs: Any) -> ImageMedia:
+		return await self._aroute(model, lambda platform: platform.aimage2image(model, prompt, media=media, **kwargs))
+
+	#
+	# the router has no model of its own, the calls never reach the platform-specific interface
+	#
+	def _text2text(self, model: Model, prompt: str, media: Optional[List[Media]] = None, response_model: Optional[BaseModel] = None, **kwargs: Any) -> Any:
+		"""Not supported"""
+		pass
+
+	def _text2data(self, model: Model, prompt: str, response_model: BaseModel, media: Optional[List[Media]] = None, **kwargs: Any) -> Any:
+		"""Not supported"""
+		pass
+
+	def _text2image(self, model: Model, prompt: str, **kwargs: Any) -> ImageMedia:
+		"""Not supported"""
+		pass
+
+	def _image2text(self, model: Model, prompt: str, media: List[ImageMedia], **kwargs: Any) -> str:
+		"""Not supported"""
+		pass
+
+	def _image2image(self, model: Model, prompt: str, media: ImageMedia, **kwargs: Any) -> ImageMedia:
+		"""Not supported"""
+		pass
+
+	def close(self) -> None:
+		"""Stop the hedging workers, the platforms are closed by their owner"""
+		with self._stats_lock:
+			executor, self._executor = self._executor, None
+		if executor is not None:
+			executor.shutdown(wait=False, cancel_futures=True)
+		super().close()
@@ -0,0 +1,137 @@
+import asyncio
+import logging
+import threading
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+logger.addHandler(logging.NullHandler())
+
+"""
+single-flight deduplication of the identical in-flight calls
+
+While a call with a given key is running, the identical calls don't reach the backend :
+they wait for the running call and share its result (or its exception).
+"""
+
+
+class _Call:
+	"""A sync call in flight, and the threads waiting for it"""
+
+	def __init__(self) -> None:
+		self.done = threading.Event()
+		self.value: Any = None
+		self.error: Optional[BaseException] = None
+		self.waiters = 0
+
+
+class _Flight:
+	"""An async call in flight, running in its own task"""
+
+	def __init__(self, task: "asyncio.Task[Any]") -> None:
+		self.task = task
+		self.waiters = 0
+
+
+class SingleFlight:
+	"""
+	Coalesce the identical calls made at the same time, from threads or from asyncio tasks.
+
+	The sync and async calls are coalesced separately : a thread never waits on an event loop,
+	and an asyncio task only waits for a call running on its own event loop.
+
+	Example:
+		flight = SingleFlight()
+		value, shared = flight.do(key, lambda: platform._text2image(model, prompt))
+	"""
+
+	def __init__(self) -> None:
+		self._lock = threading.Lock()
+		self._calls: Dict[str, _Call] = {}
+		self._flights: Dict[str, _Flight] = {}
+		self.coalesced = 0
+
+	def in_flight(self) -> int:
+		"""Number of distinct calls currently running"""
+		with self._lock:
+			return len(self._calls) + len(self._flights)
+
+	def do(self, key: str, fn: Callable[[], Any]) -> Tuple[Any, bool]:
+		"""
+		Run fn, unless a call with the same key is already running, then wait for its result.
+
+		Args:
+			key (str): Identifies the call, identical calls must have the same key
+			fn (Callable[[], Any]): The call to make
+
+		Returns:
+			Tuple[Any, bool]: The result, and True when it is shared with other callers
+
+		Raises:
+			Exception: Any exception raised by fn, in the caller and in all the waiters
+		"""
+		with self._lock:
+			call = self._calls.get(key)
+			if call is not None:
+				call.waiters += 1
+				self.coalesced += 1
+				leader = False
+			else:
+				call = _Call()
+				self._calls[key] = call
+				leader = True
+
+		if not leader:
+			logger.debug("waiting for in-flight call %s", key)
+			call.done.wait()
+			if call.error is not None:
+				raise call.error
+			return call.value, True
+
+		try:
+			call.value = fn()
+		except BaseException as e:
+			call.error = e
+			raise
+		finally:
+			with self._lock:
+				del self._calls[key]
+				shared = call.waiters > 0
+			call.done.set()
+		return call.value, shared
+
+	async def ado(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Tuple[Any, bool]:
+		"""
+		Async version of do.
+
+		The call runs in its own task : cancelling one of the callers doesn't cancel
+		the call for the others.
+
+		Returns:
+			Tuple[Any, bool]: The result, and True when it is shared with other callers
+		"""
+		loop = asyncio.get_running_loop()
+		with self._lock:
+			flight = self._flights.get(key)
+			if flight is not None and flight.task.get_loop() is loop and not flight.task.done():
+				flight.waiters += 1
+				self.coalesced += 1
+				leader = False
+			else:
+				flight = _Flight(loop.create_task(fn()))
+				flight.task.add_done_callback(lambda task: self._forget(key, flight))
+				self._flights[key] = flight
+				leader = True
+
+		if not leader:
+			logger.debug("waiting for in-flight call %s", key)
+		value = await asyncio.shield(flight.task)
+		# the waiters join before the task is done, so they are all counted by now
+		return value, not leader or flight.waiters > 0
+
+	def _forget(self, key: str, flight: "_Flight") -> None:
+		with self._lock:
+			if self._flights.get(key) is flight:
+				del self._flights[key]
+		# the exception is raised in the callers, mark it as retrieved in case all of them were cancelled
+		if not flight.task.cancelled():
+			flight.task.exception()
@@ -0,0 +1,142 @@
+import time
+import logging
+from dataclasses import dataclass
+from typing import Optional, List, Iterator, AsyncIterator
+
+logger = logging.getLogger(__name__)
+logger.addHandler(logging.NullHandler())
+
+
+@dataclass
+class StreamStats:
+	"""
+	Timing of a streamed text2text call.
+
+	Attributes:
+		ttft (Optional[float]): Time to first token, in seconds, None until a token is received
+		tokens (int): Number of streamed tokens (OpenAI compatible servers send one token per chunk)
+		duration (float): Total duration of the call, in seconds
+	"""
+	ttft: Optional[float] = None
+	tokens: int = 0
+	duration: float = 0.0
+
+	@property
+	def tokens_per_second(self) -> float:
+		"""Generation speed, measured after the first token"""
+		generation_time = self.duration - (self.ttft or 0.0)
+		if self.tokens <= 1 or generation_time <= 0:
+			return 0.0
+		return (self.tokens - 1) / generation_time
+
+
+class TextStream(Iterator[str]):
+	"""
+	Iterator over the text deltas of a streamed text2text call.
+
+	The request is sent on the first iteration, so the time to first token covers
+	the whole round trip. The stats are complete once the stream is exhausted.
+
+	Example:
+		stream = platform.text2text(model="gemma-3-12b", prompt="Tell me a story", stream=True)
+		for delta in stream:
+			print(delta, end="", flush=True)
+		print(stream.stats.ttft, stream.stats.tokens_per_second)
+	"""
+
+	def __init__(self, deltas: Iterator[str], name: str = "") -> None:
+		self._deltas = deltas
+		self._name = name
+		self._chunks: List[str] = []
+		self.stats = StreamStats()
+		self._iterator = self._stream()
+
+	def __iter__(self) -> "TextStream":
+		return self
+
+	def __next__(self) -> str:
+		return next(self._iterator)
+
+	def close(self) -> None:
+		"""Stop the stream, and release the underlying connection"""
+		self._iterator.close()
+		close = getattr(self._deltas, "close", None)
+		if close is not None:
+			close()
+
+	def text(self) -> str:
+		"""The text received so far"""
+		return "".join(self._chunks)
+
+	def _stream(self) -> Iterator[str]:
+		start = time.perf_counter()
+		try:
+			for delta in self._deltas:
+				if not delta:
+					continue
+				if self.stats.ttft is None:
+					self.stats.ttft = time.perf_counter() - start
+				self.stats.tokens += 1
+				self._chunks.append(delta)
+				yield delta
+		finally:
+			self.stats.duration = time.perf_counter() - start
+			_log_stats(self._name, self.stats)
+
+
+class AsyncTextStream(AsyncIterator[str]):
+	"""
+	Async iterator over the text deltas of a streamed text2text call.
+
+	Example:
+		stream = await platform.atext2text(model="gemma-3-12b", prompt="Tell me a story", stream=True)
+		async for delta in stream:
+			print(delta, end="", flush=True)
+		print(stream.stats.ttft, stream.stats.tokens_per_second)
+	"""
+
+	def __init__(self, deltas: AsyncIterator[str], name: str = "") -> None:
+		self._deltas = deltas
+		self._name = name
+		self._chunks: List[str] = []
+		self.stats = StreamStats()
+		self._iterator = self._stream()
+
+	def __aiter__(self) -> "AsyncTextStream":
+		return self
+
+	async def __anext__(self) -> str:
+		return await self._iterator.__anext__()
+
+	async def aclose(self) -> None:
+		"""Stop the stream, and release the underlying connection"""
+		await self._iterator.aclose()
+		aclose = getattr(self._deltas, "aclose", None)
+		if aclose is not None:
+			await aclose()
+
+	def text(self) -> str:
+		"""The text received so far"""
+		return "".join(self._chunks)
+
+	async def _stream(self) -> AsyncIterator[str]:
+		start = time.perf_counter()
+		try:
+			async for delta in self._deltas:
+				if not delta:
+					continue
+				if self.stats.ttft is None:
+					self.stats.ttft = time.perf_counter() - start
+				self.stats.tokens += 1
+				self._chunks.append(delta)
+				yield delta
+		finally:
+			self.stats.duration = time.perf_counter() - start
+			_log_stats(self._name, self.stats)
+
+
+def _log_stats(name: str, stats: StreamStats) -> None:
+	if stats.ttft is None:
+		logger.debug("%s stream ended without any token after %.3fs", name, stats.duration)
+	else:
+		logger.debug("%s stream: ttft=%.3fs, %d tokens, %.1f tokens/s", name, stats.ttft, stats.tokens, stats.tokens_per_second)
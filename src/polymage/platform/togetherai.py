@@ -1,10 +1,10 @@
 import json
+import asyncio
 import logging
-from typing import Optional, List, Any
-from openai import OpenAI
+from typing import Optional, List, Any, Dict, Iterator, AsyncIterator, Callable, Awaitable
+from openai import OpenAI, AsyncOpenAI, DefaultHttpxClient, DefaultAsyncHttpxClient, APIConnectionError
 from pydantic import BaseModel
 from PIL import Image
-from tenacity import retry, stop_after_attempt, retry_if_exception_type
 
 from ..model.model import Model
 from ..media.media import Media
@@ -35,8 +35,9 @@ class TogetherAiPlatform(Platform):
 	    Methods:
 	        _text2text: Sends a text prompt to a model and returns a string response.
 	        _text2data: Sends a text prompt and returns structured data validated
-	            against a Pydantic model with automatic retry logic on JSON failure.
+	            against a Pydantic model, invalid JSON is retried by the platform retry policy.
 	        _image2text: Analyzes an image alongside a text prompt (Vision).
+	        _atext2text, _atext2data, _aimage2text: async versions, using the same requests.
 	        _text2image: (Not supported) Placeholder for future implementation.
 	        _image2image: (Not supported) Placeholder for future implementation.
 
@@ -45,91 +46,159 @@ class TogetherAiPlatform(Platform):
 	        style URL in its implementation, which may require adjustment to align
 	        with Together AI's standard production endpoints.
 	"""
+	_unavailable_errors = (APIConnectionError,)
+
 	def __init__(self, api_key: str, **kwargs: Any) -> None:
 		super().__init__('togetherai', **kwargs)
 		self._api_key = api_key
 
 
-	def _text2text(self, model: Model, prompt: str, media: Optional[List[Media]] = None, response_model: Optional[BaseModel] = None, **kwargs: Any) -> str:
+	def _client(self) -> OpenAI:
+		return self._get_client("openai", lambda: OpenAI(
+			base_url=TOGETHEAI_BASE_URL,  # TogetherAi's default endpoint
+			api_key=self._api_key,
+			# retries are handled by the platform retry policy
+			max_retries=0,
+			http_client=DefaultHttpxClient(**self._http_client_options()),
+		))
+
+	def _async_client(self) -> AsyncOpenAI:
+		return self._get_async_client("openai", lambda: AsyncOpenAI(
+			base_url=TOGETHEAI_BASE_URL,  # TogetherAi's default endpoint
+			api_key=self._api_key,
+			# retries are handled by the platform retry policy
+			max_retries=0,
+			http_client=DefaultAsyncHttpxClient(**self._http_client_options(asynchronous=True)),
+		))
+
+	#
+	# requests are built once, and shared by the sync and async calls
+	#
+	def _text2text_request(self, model: Model, prompt: str, **kwargs: Any) -> Dict[str, Any]:
 		system_prompt: Optional[str] = kwargs.get("system_prompt", "")
-		client = OpenAI(
-				base_url=TOGETHEAI_BASE_URL,  # TogetherAi's default endpoint
-				api_key=self._api_key
-			)
-		response = client.chat.completions.create(
+		return dict(
+			self._chat_params(model, {"temperature": 0.8}, **kwargs),
 			model=model.internal_name(),
 			messages=[
 				{"role": "system", "content": system_prompt},
 				{"role": "user", "content": prompt}
 			],
-			temperature=0.8
-		)
-		return response.choices[0].message.content.strip()
-
-
-	#
-	# using structured data may sometime fail, because the result is not a valid JSON
-	# if the JSON is not valid, retry 3 times
-	#
-	@retry(retry=retry_if_exception_type(json.JSONDecodeError), stop=stop_after_attempt(3))
-	def _text2data(self, model: Model, prompt: str, response_model: BaseModel, media: Optional[List[Media]] = None, **kwargs: Any) -> str:
-		system_prompt: Optional[str] = kwargs.get("system_prompt", "")
-		client = OpenAI(
-				base_url=TOGETHEAI_BASE_URL,  # TogetherAi's default endpoint
-				api_key=self._api_key
 		)
 
+	def _text2data_request(self, model: Model, prompt: str, response_model: BaseModel, **kwargs: Any) -> Dict[str, Any]:
 		json_schema = response_model.model_json_schema()
 		json_schema_name = json_schema['title']
 
-		chat_completion = client.chat.completions.create(
+		request = self._text2text_request(model, prompt, **kwargs)
+		request["response_format"] = {
+			"type": "json_schema",
+			"json_schema": {
+				"name": json_schema_name,
+				"schema": json_schema,
+			},
+		}
+		return request
+
+	def _image2text_request(self, model: Model, prompt: str, urls: List[str], **kwargs: Any) -> Dict[str, Any]:
+		return dict(
+			self._chat_params(model, {}, **kwargs),
 			model=model.internal_name(),
 			messages=[
-				{"role": "system", "content": system_prompt},
-				{"role": "user", "content": prompt}
+				{
+					"role": "user",
+					"content": [
+						{"type": "text", "text": prompt},
+						*(
+							{
+								"type": "image_url",
+								"image_url": {"url": url},
+							}
+							for url in urls
+						),
+					],
+				}
 			],
-			response_format={
-				"type": "json_schema",
-				"json_schema": {
-					"name": json_schema_name,
-					"schema": json_schema,
-				},
-			},
-			temperature=0.8,
+			stream=False,
 		)
+
+
+	def _text2text(self, model: Model, prompt: str, media: Optional[List[Media]] = None, response_model: Optional[BaseModel] = None, **kwargs: Any) -> str:
+		response = self._client().chat.completions.create(**self._text2text_request(model, prompt, **kwargs))
+		return response.choices[0].message.content.strip()
+
+	async def _atext2text(self, model: Model, prompt: str, media: Optional[List[Media]] = None, response_model: Optional[BaseModel] = None, **kwargs: Any) -> str:
+		response = await self._async_client().chat.completions.create(**self._text2text_request(model, prompt, **kwargs))
+		return response.choices[0].message.content.strip()
+
+
+	def _text2text_stream(self, model: Model, prompt: str, media: Optional[List[Media]] = None, **kwargs: Any) -> Iterator[str]:
+		request = self._text2text_request(model, prompt, **kwargs)
+		with self._client().chat.completions.create(stream=True, **request) as stream:
+			for chunk in stream:
+				if chunk.choices and chunk.choices[0].delta.content:
+					yield chunk.choices[0].delta.content
+
+	async def _atext2text_stream(self, model: Model, prompt: str, media: Optional[List[Media]] = None, **kwargs: Any) -> AsyncIterator[str]:
+		request = self._text2text_request(model, prompt, **kwargs)
+		async with await self._async_client().chat.completions.create(stream=True, **request) as stream:
+			async for chunk in stream:
+				if chunk.choices and chunk.choices[0].delta.content:
+					yield chunk.choices[0].delta.content
+
+
+	#
+	# using structured data may sometime fail, because the result is not a valid JSON
+	# json.JSONDecodeError is retried by the retry policy of the platform
+	#
+	def _text2data(self, model: Model, prompt: str, response_model: BaseModel, media: Optional[List[Media]] = None, **kwargs: Any) -> str:
+		chat_completion = self._client().chat.completions.create(**self._text2data_request(model, prompt, response_model, **kwargs))
+		json_string = chat_completion.choices[0].message.content.strip()
+		# return a python Dict
+		return json.loads(json_string)
+
+	async def _atext2data(self, model: Model, prompt: str, response_model: BaseModel, media: Optional[List[Media]] = None, **kwargs: Any) -> str:
+		chat_completion = await self._async_client().chat.completions.create(**self._text2data_request(model, prompt, response_model, **kwargs))
 		json_string = chat_completion.choices[0].message.content.strip()
 		# return a python Dict
 		return json.loads(json_string)
 
 
 	def _image2text(self, model: Model, prompt: str, media: List[ImageMedia], **kwargs: Any) -> str:
-		client = OpenAI(
-			base_url=TOGETHEAI_BASE_URL,
-			api_key=self._api_key,
-		)
 		if len(media) == 0:
 			return ""
-		else:
-			image = media[0]
-			base64_image = image.to_base64()
+		return self._image2text_call(model, prompt, media, **kwargs)()
 
-		response = client.chat.completions.create(
-		    model="meta-llama/Llama-4-Scout-17B-16E-Instruct",
-			messages=[
-        		{
-            		"role": "user",
-            		"content": [
-                		{"type": "text", "text": prompt},
-                		{
-                    		"type": "image_url",
-                    		"image_url": {"url": f"data:image/jpeg;base64,{base64_image}"},
-                		},
-            		],
-        		}
-    		],
-    		stream=False,
-    	)
-		return response.choices[0].message.content.strip()
+	async def _aimage2text(self, model: Model, prompt: str, media: List[ImageMedia], **kwargs: Any) -> str:
+		if len(media) == 0:
+			return ""
+		return await self._aimage2text_call(model, prompt, media, **kwargs)()
+
+	#
+	# the images are encoded by the first attempt, the retries send the same request
+	#
+	def _image2text_call(self, model: Model, prompt: str, media: List[ImageMedia], **kwargs: Any) -> Callable[[], str]:
+		request: Dict[str, Any] = {}
+
+		def call() -> str:
+			if not request:
+				request.update(self._image2text_request(model, prompt, self._image_data_urls(model, media), **kwargs))
+			response = self._client().chat.completions.create(**request)
+			return response.choices[0].message.content.strip()
+
+		return call
+
+	def _aimage2text_call(self, model: Model, prompt: str, media: List[ImageMedia], **kwargs: Any) -> Callable[[], Awaitable[str]]:
+		request: Dict[str, Any] = {}
+
+		async def call() -> str:
+			if not request:
+				# image encoding is CPU bound, keep it out of the event loop
+				urls = await asyncio.to_thread(self._image_data_urls, model, media)
+				request.update(self._image2text_request(model, prompt, urls, **kwargs))
+			response = await self._async_client().chat.completions.create(**request)
+			return response.choices[0].message.content.strip()
+
+		return call
 
 
 	def _text2image(self, model: str, prompt: str, **kwargs: Any) -> Image.Image:
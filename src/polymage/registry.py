@@ -1,14 +1,147 @@
-import copy
-import yaml
+import os
+import json
+import hashlib
+import logging
+import threading
 from pathlib import Path
 from importlib import resources
-from typing import Dict, Any, Type, Optional
+from types import MappingProxyType
+from typing import Dict, Any, Type, Optional, NamedTuple, Tuple, List, Mapping, Union
 from .model.model import Model
 
+logger = logging.getLogger(__name__)
+logger.addHandler(logging.NullHandler())
+
+"""
+registry of the models
+
+The pre-defined models are loaded on the first lookup, not at import time. Parsing the YAML
+files is the slow part : the parsed models are saved in a snapshot (a JSON file in the user
+cache directory), reused as long as the YAML files are unchanged. The snapshot only holds data,
+the models are built again from it. It can be built at install time with :
+
+    ModelRegistry.build_snapshot()
+
+The registry is published as immutable snapshots, swapped atomically : the lookups never lock.
+User directories of YAML files can be added, and the registry reloaded while the workers run,
+only the changed files are parsed again :
+
+    ModelRegistry.add_directory("~/my-models")
+    ModelRegistry.watch(interval=2.0)
+"""
+
+# bump when the content of the snapshot changes
+SNAPSHOT_VERSION = 3
+# directory of the snapshot, defaults to $XDG_CACHE_HOME/polymage or ~/.cache/polymage
+CACHE_DIR_ENV = "POLYMAGE_CACHE_DIR"
+
+
+class _ParsedFile(NamedTuple):
+	"""The models of a YAML file, and the digest of its content"""
+	digest: str
+	# the model dicts by model and platform names, stored in the disk snapshot
+	dicts: Dict[str, Dict[str, Dict[str, Any]]]
+	models: Dict[Tuple[str, str], Model]
+
+	@classmethod
+	def parse(cls, digest: str, content: bytes) -> "_ParsedFile":
+		return cls.from_dicts(digest, _parse_model_file(content))
+
+	@classmethod
+	def from_dicts(cls, digest: str, dicts: Dict[str, Dict[str, Dict[str, Any]]]) -> "_ParsedFile":
+		models = {(name.lower(), platform): Model.from_dict({**model_dict, "name": name.lower()})
+				  for name, platforms in dicts.items() for platform, model_dict in platforms.items()}
+		return cls(digest, dicts, models)
+
+
+class ModelEntry(NamedTuple):
+	"""A model served by a platform, as found by the registry queries"""
+	name: str
+	platform: str
+	model: Model
+
+
+class RegistrySnapshot:
+	"""
+	Immutable view of the registry at a given version, with its indexes.
+
+	The indexes are built once, when the snapshot is published : the queries are dictionary lookups,
+	and their results (tuples) can be cached by the callers as long as the version is unchanged.
+
+	Example:
+		snapshot = ModelRegistry.snapshot()
+		for entry in snapshot.find(capability="image2text", platform="lmstudio"):
+			print(entry.name, entry.model.internal_name())
+	"""
+
+	def __init__(self, version: int, models: Dict[str, Dict[str, Model]]) -> None:
+		self.version = version
+		self.models: Mapping[str, Mapping[str, Model]] = MappingProxyType(
+			{name: MappingProxyType(dict(platforms)) for name, platforms in models.items()})
+		entries = tuple(ModelEntry(name, platform, model) for name, platforms in models.items() for platform, model in platforms.items())
+		index: Dict[Tuple[Optional[str], Optional[str]], List[ModelEntry]] = {(None, None): list(entries)}
+		by_name: Dict[str, List[ModelEntry]] = {}
+		by_internal_name: Dict[str, List[ModelEntry]] = {}
+		for entry in entries:
+			index.setdefault((None, entry.platform), []).append(entry)
+			for capability in entry.model.capabilities():
+				index.setdefault((capability, None), []).append(entry)
+				index.setdefault((capability, entry.platform), []).append(entry)
+			by_name.setdefault(entry.name, []).append(entry)
+			by_internal_name.setdefault(entry.model.internal_name(), []).append(entry)
+		self._index = {key: tuple(value) for key, value in index.items()}
+		self._by_name = {key: tuple(value) for key, value in by_name.items()}
+		self._by_internal_name = {key: tuple(value) for key, value in by_internal_name.items()}
+		self._platforms = {name: tuple(entry.platform for entry in value) for name, value in self._by_name.items()}
+
+	def find(self, capability: Optional[str] = None, platform: Optional[str] = None) -> Tuple[ModelEntry, ...]:
+		"""The models with a capability and/or served by a platform, all the models without criteria"""
+		return self._index.get((capability, platform), ())
+
+	def names(self, capability: Optional[str] = None, platform: Optional[str] = None) -> Tuple[str, ...]:
+		"""The logical names of the models matching the criteria, see find"""
+		return tuple(dict.fromkeys(entry.name for entry in self.find(capability, platform)))
+
+	def platforms(self, logical_name: str) -> Tuple[str, ...]:
+		"""The platforms serving a model"""
+		return self._platforms.get(logical_name.lower(), ())
+
+	def get(self, logical_name: str, platform: str) -> Optional[Model]:
+		for entry in self._by_name.get(logical_name.lower(), ()):
+			if entry.platform == platform:
+				return entry.model
+		return None
+
+	def by_internal_name(self, internal_name: str) -> Tuple[ModelEntry, ...]:
+		"""The models with an internal name (the name used by the platform), on any platform"""
+		return self._by_internal_name.get(internal_name, ())
+
+	def capabilities(self) -> Tuple[str, ...]:
+		return tuple(capability for capability, platform in self._index if capability is not None and platform is None)
+
+	def __len__(self) -> int:
+		return len(self._index[(None, None)])
+
 
 class ModelRegistry:
-	"""Centralized store for model configurations and platform mappings."""
-	_models: [Dict] = {}
+	"""
+	Centralized store for model configurations and platform mappings.
+
+	The registry is published as an immutable RegistrySnapshot : the writers (register, reload)
+	build the next snapshot under a lock and swap the reference, the readers never lock.
+	"""
+	# package of the pre-defined models, loaded on first lookup
+	_models_package = 'polymage.data.models'
+	# user directories of YAML model files, loaded after the package ones
+	_directories: Tuple[Path, ...] = ()
+	_loaded = False
+	_write_lock = threading.RLock()
+	# the published registry
+	_state: RegistrySnapshot = RegistrySnapshot(0, {})
+	# the models of the YAML files by source, and the models registered by code (they win)
+	_parsed: Dict[str, _ParsedFile] = {}
+	_registered: Dict[Tuple[str, str], Model] = {}
+	_watcher: Optional["_RegistryWatcher"] = None
 
 	@classmethod
 	def register(cls, logical_name: str, platform_name: str, model: Model):
@@ -16,54 +149,281 @@ class ModelRegistry:
 		register a model class and its platform-specific params.
 		Usage: ModelRegistry.register("llama3", "ollama", ollama_model())
 		"""
-		model.set_name(logical_name)
-		# if model not register yet
-		if logical_name.lower() not in cls._models:
-			# init the dictionary
-			cls._models[logical_name.lower()] = { platform_name : model }
-		else:
-			cls._models[logical_name.lower()][platform_name] = model
+		# the registered models are immutable, shared by all the lookups
+		if model.name() != logical_name.lower():
+			model = model.replace(name=logical_name.lower())
+		with cls._write_lock:
+			cls._registered = {**cls._registered, (logical_name.lower(), platform_name): model}
+			cls._publish()
 
 	@classmethod
-	def get_all_models(cls) -> Dict[Any, Any]:
-		return cls._models
+	def version(cls) -> int:
+		"""Version of the registry, incremented by every change"""
+		return cls.snapshot().version
+
+	@classmethod
+	def snapshot(cls) -> RegistrySnapshot:
+		"""
+		The current registry, indexed. Each change publishes a new snapshot.
+
+		Routers and schedulers can keep their decisions until snapshot().version changes.
+		"""
+		if not cls._loaded:
+			cls._ensure_loaded()
+		return cls._state
+
+	@classmethod
+	def get_all_models(cls) -> Mapping[str, Mapping[str, Model]]:
+		"""The models by logical name and platform name (read-only)"""
+		return cls.snapshot().models
 
 
 	@classmethod
 	def getModelByName(cls, logical_name: str, platform_name: str) -> Model:
 		"""Retrieves the provider-specific string for a logical model name."""
-		if logical_name.lower() not in cls._models:
+		models = cls.snapshot().models
+		if logical_name.lower() not in models:
 			raise ValueError(f"Model '{logical_name}' is not registered.")
 
-		platform_dict = cls._models[logical_name.lower()]
+		platform_dict = models[logical_name.lower()]
 		if platform_name not in platform_dict:
 			raise ValueError(f"Platform '{platform_name}' not supported for model '{logical_name}'.")
 
-		model = platform_dict[platform_name]
-		# return a copy of the model, because we may overide some params
-		return copy.deepcopy(model)
+		# the model is immutable, no copy needed : use model.params(**kwargs) to build the params of a call
+		return platform_dict[platform_name]
 
 
 	@classmethod
 	def load_all_models(cls):
-		pkg_path = resources.files('polymage.data.models')
-		for entry in pkg_path.iterdir():
-			if entry.is_file() and entry.suffix in ('.yaml', '.yml'):
-				with entry.open('r', encoding="utf-8") as f:
-					# Load the data for the yaml file
-					model_list = yaml.safe_load(f)
-					for model_name, model_properties in model_list.items():
-						# capabilities is a property of the model
-						model_capabilities = model_properties['capabilities']
-						for platform_name, model_dict in model_properties['platforms'].items():
-							model_dict['name'] = model_name
-							model_dict['capabilities'] = model_capabilities
-							model = Model.from_dict(model_dict)
-							# register the model
-							ModelRegistry.register(logical_name=model_name, platform_name=platform_name, model=model)
+		"""Load (or reload) the pre-defined models, they replace the registered models with the same names"""
+		with cls._write_lock:
+			cls._load()
+			defined = {key for parsed in cls._parsed.values() for key in parsed.models}
+			cls._registered = {key: model for key, model in cls._registered.items() if key not in defined}
+			cls._publish()
+			cls._loaded = True
+
+	@classmethod
+	def _ensure_loaded(cls) -> None:
+		"""Load the pre-defined models on first use, without replacing the models registered before"""
+		with cls._write_lock:
+			if not cls._loaded:
+				cls._load()
+				cls._publish()
+				# only now : the readers checking _loaded without the lock must find the models published
+				cls._loaded = True
+
+	#
+	# hot reload : only the changed files are parsed again, the running calls keep the snapshot they got
+	#
+	@classmethod
+	def add_directory(cls, directory: Union[str, Path]) -> None:
+		"""
+		Load the YAML model files of a directory, in addition to the pre-defined ones.
+		A model defined in several files is taken from the last directory added.
+		"""
+		path = Path(directory).expanduser().resolve()
+		with cls._write_lock:
+			if path not in cls._directories:
+				cls._directories = cls._directories + (path,)
+			if cls._loaded:
+				cls.reload()
+
+	@classmethod
+	def reload(cls) -> bool:
+		"""
+		Parse the YAML files changed since the last load, and publish the new registry.
+
+		A file that fails to parse keeps its previous models (the error is logged).
+
+		Returns:
+			bool: True if the registry has changed
+		"""
+		with cls._write_lock:
+			if not cls._loaded:
+				cls._ensure_loaded()
+				return True
+			previous = cls._parsed
+			cls._parsed = cls._parse_sources(cls._model_sources(), previous, strict=False)
+			if cls._parsed.keys() == previous.keys() and all(cls._parsed[key] is previous[key] for key in previous):
+				return False
+			cls._publish()
+			logger.info("Model registry reloaded, version %d", cls._state.version)
+			return True
+
+	@classmethod
+	def watch(cls, interval: float = 2.0) -> None:
+		"""Reload the registry every interval seconds in a daemon thread, until stop_watching()"""
+		with cls._write_lock:
+			if cls._watcher is None:
+				cls._watcher = _RegistryWatcher(cls, interval)
+				cls._watcher.start()
+
+	@classmethod
+	def stop_watching(cls) -> None:
+		with cls._write_lock:
+			watcher, cls._watcher = cls._watcher, None
+		if watcher is not None:
+			watcher.stop()
+
+	#
+	# loading and publication, call with _write_lock held
+	#
+	@classmethod
+	def _load(cls) -> None:
+		"""Parse all the YAML files, using the parses of the previous load and of the disk snapshot"""
+		sources = cls._model_sources()
+		path = snapshot_path()
+		previous = dict(cls._parsed)
+		if any(key not in previous for key in sources):
+			previous = {**_read_snapshot(path), **previous}
+		cls._parsed = cls._parse_sources(sources, previous, strict=True)
+		if any(cls._parsed[key] is not previous.get(key) for key in cls._parsed):
+			_write_snapshot(path, cls._parsed)
+
+	@classmethod
+	def _publish(cls) -> None:
+		"""Build the next snapshot and swap it in"""
+		models: Dict[str, Dict[str, Model]] = {}
+		for parsed in cls._parsed.values():
+			for (name, platform), model in parsed.models.items():
+				models.setdefault(name, {})[platform] = model
+		for (name, platform), model in cls._registered.items():
+			models.setdefault(name, {})[platform] = model
+		cls._state = RegistrySnapshot(cls._state.version + 1, models)
+
+	@classmethod
+	def _parse_sources(cls, sources: Dict[str, bytes], previous: Dict[str, _ParsedFile], strict: bool) -> Dict[str, _ParsedFile]:
+		parsed = {}
+		for key, content in sources.items():
+			digest = hashlib.blake2b(content, digest_size=16).hexdigest()
+			cached = previous.get(key)
+			if cached is not None and cached.digest == digest:
+				parsed[key] = cached
+				continue
+			try:
+				parsed[key] = _ParsedFile.parse(digest, content)
+			except Exception:
+				if strict or cached is None:
+					raise
+				logger.error("Failed to parse the model file %s, keeping its previous models", key, exc_info=True)
+				parsed[key] = cached
+		return parsed
+
+	@classmethod
+	def _model_sources(cls) -> Dict[str, bytes]:
+		"""Content of the YAML files : the package files by file name, then the user files by path"""
+		pkg_path = resources.files(cls._models_package)
+		sources = {entry.name: entry.read_bytes() for entry in sorted(pkg_path.iterdir(), key=lambda entry: entry.name)
+				   if entry.is_file() and Path(entry.name).suffix in ('.yaml', '.yml')}
+		for directory in cls._directories:
+			try:
+				paths = sorted(path for path in directory.iterdir() if path.is_file() and path.suffix in ('.yaml', '.yml'))
+				for path in paths:
+					sources[str(path)] = path.read_bytes()
+			except OSError:
+				logger.warning("Failed to read the model directory %s", directory, exc_info=True)
+		return sources
+
+	@classmethod
+	def build_snapshot(cls) -> Path:
+		"""
+		Parse the YAML files and write the snapshot, for example at install time.
+
+		Returns:
+			Path: The snapshot file
+		"""
+		path = snapshot_path()
+		_write_snapshot(path, cls._parse_sources(cls._model_sources(), {}, strict=True))
+		return path
+
+	@classmethod
+	def _reset(cls) -> None:
+		"""Forget all the models, the pre-defined ones are loaded again on the next lookup"""
+		with cls._write_lock:
+			cls._parsed = {}
+			cls._registered = {}
+			cls._directories = ()
+			cls._loaded = False
+			cls._state = RegistrySnapshot(cls._state.version + 1, {})
+
+
+class _RegistryWatcher(threading.Thread):
+	"""Daemon thread reloading the registry periodically"""
+
+	def __init__(self, registry: Type[ModelRegistry], interval: float) -> None:
+		super().__init__(name="polymage-registry-watcher", daemon=True)
+		self._registry = registry
+		self._interval = interval
+		self._stopped = threading.Event()
+
+	def run(self) -> None:
+		while not self._stopped.wait(self._interval):
+			try:
+				self._registry.reload()
+			except Exception:
+				logger.error("Failed to reload the model registry", exc_info=True)
+
+	def stop(self) -> None:
+		self._stopped.set()
+
+
+def snapshot_path() -> Path:
+	"""Path of the registry snapshot"""
+	directory = os.environ.get(CACHE_DIR_ENV)
+	if directory is None:
+		directory = Path(os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache") / "polymage"
+	return Path(directory).expanduser() / "registry.json"
+
 
+def _parse_model_file(content: bytes) -> Dict[str, Dict[str, Dict[str, Any]]]:
+	# the YAML parser is only imported when a file is missing from the snapshot, or changed
+	import yaml
 
+	models: Dict[str, Dict[str, Dict[str, Any]]] = {}
+	# Load the data for the yaml file
+	model_list = yaml.safe_load(content) or {}
+	for model_name, model_properties in model_list.items():
+		# capabilities is a property of the model
+		model_capabilities = model_properties['capabilities']
+		for platform_name, model_dict in model_properties['platforms'].items():
+			model_dict['name'] = model_name
+			model_dict['capabilities'] = model_capabilities
+			models.setdefault(model_name, {})[platform_name] = model_dict
+	return models
 
 
+def _read_snapshot(path: Path) -> Dict[str, _ParsedFile]:
+	"""The parsed files of the disk snapshot, by source : the model dicts are read as JSON, the models built again"""
+	try:
+		with open(path, "rb") as f:
+			snapshot = json.load(f)
+		if not isinstance(snapshot, dict) or snapshot.get("version") != SNAPSHOT_VERSION:
+			return {}
+		return {key: _ParsedFile.from_dicts(file["digest"], file["dicts"]) for key, file in snapshot["files"].items()}
+	except FileNotFoundError:
+		return {}
+	except Exception:
+		logger.debug("Ignoring the unreadable registry snapshot %s", path, exc_info=True)
+		return {}
 
 
+def _write_snapshot(path: Path, parsed: Dict[str, _ParsedFile]) -> None:
+	"""Write the snapshot atomically, a read-only cache directory only costs the next loads"""
+	snapshot = {
+		"version": SNAPSHOT_VERSION,
+		"files": {key: {"digest": file.digest, "dicts": file.dicts} for key, file in parsed.items()},
+	}
+	temporary = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+	try:
+		path.parent.mkdir(parents=True, exist_ok=True)
+		with open(temporary, "w", encoding="utf-8") as f:
+			json.dump(snapshot, f)
+		os.replace(temporary, path)
+	except (OSError, TypeError, ValueError):
+		# TypeError : a YAML value without JSON equivalent (a date...), the files are parsed on each load
+		logger.debug("Failed to write the registry snapshot %s", path, exc_info=True)
+		try:
+			temporary.unlink(missing_ok=True)
+		except OSError:
+			pass
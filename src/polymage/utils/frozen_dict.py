@@ -0,0 +1,54 @@
+from typing import Any, Dict, NoReturn
+
+
+class FrozenDict(dict):
+    """
+    A read-only dict.
+
+    It stays a dict for the JSON encoders, pydantic and the SDKs receiving it, but can't be
+    modified : copies are not needed to share it, copy.copy() and copy.deepcopy() return it as is.
+    copy() returns a plain, modifiable dict, like {**frozen, key: value}.
+    """
+
+    __slots__ = ("_hash",)
+
+    def _readonly(self, *args: Any, **kwargs: Any) -> NoReturn:
+        raise TypeError("FrozenDict is read-only")
+
+    __setitem__ = __delitem__ = __ior__ = _readonly
+    clear = pop = popitem = setdefault = update = _readonly
+
+    def copy(self) -> Dict[Any, Any]:
+        return dict(self)
+
+    def __copy__(self) -> "FrozenDict":
+        return self
+
+    def __deepcopy__(self, memo: Dict[int, Any]) -> "FrozenDict":
+        return self
+
+    def __reduce__(self):
+        return self.__class__, (dict(self),)
+
+    def __hash__(self) -> int:
+        try:
+            return self._hash
+        except AttributeError:
+            self._hash = hash(frozenset(self.items()))
+            return self._hash
+
+    def __repr__(self) -> str:
+        return f"FrozenDict({dict.__repr__(self)})"
+
+
+def freeze(value: Any) -> Any:
+    """Deep read-only copy of a value : the dicts become FrozenDicts, the lists and sets tuples and frozensets"""
+    if isinstance(value, FrozenDict):
+        return value
+    if isinstance(value, dict):
+        return FrozenDict((key, freeze(item)) for key, item in value.items())
+    if isinstance(value, (list, tuple)):
+        return tuple(freeze(item) for item in value)
+    if isinstance(value, (set, frozenset)):
+        return frozenset(freeze(item) for item in value)
+    return value
@@ -1,3 +1,4 @@
+import zlib
 import base64
 import logging
 from io import BytesIO
@@ -49,6 +50,12 @@ def bytes_to_image(image_bytes: bytes) -> Image.Image:
     return image
 
 
+def image_nbytes(image: Image.Image) -> int:
+    """Memory used by the decoded pixels of an image, in bytes"""
+    width, height = image.size
+    return width * height * len(image.getbands())
+
+
 def image_to_base64(image: Image.Image, format='PNG') -> str:
     """
     Convert a PIL Image object to a base64 encoded string.
@@ -81,6 +88,78 @@ def image_to_base64(image: Image.Image, format='PNG') -> str:
     encoded_str = base64.b64encode(buffered.getvalue()).decode('utf-8')
     return encoded_str
 
+#
+# perceptual hashes, similar pictures get hashes at a small hamming distance
+# the bits are computed with numpy when it is installed (polymage[numpy]), in pure Python otherwise
+#
+def average_hash(image: Image.Image, hash_size: int = 8) -> int:
+    """
+    Average hash of an image : the pixels of a hash_size x hash_size grayscale thumbnail
+    brighter than their mean.
+
+    Returns:
+        int: A hash of hash_size * hash_size bits
+    """
+    thumbnail = image.convert("L").resize((hash_size, hash_size), Image.BOX)
+    np = _numpy()
+    if np is not None:
+        pixels = np.asarray(thumbnail, dtype=np.int64).ravel()
+        # compare with the mean without floats : pixel * count > sum
+        return _array_bits_to_int(np, pixels * pixels.size > pixels.sum())
+    pixels = thumbnail.tobytes()
+    total = sum(pixels)
+    count = len(pixels)
+    return _bits_to_int(pixel * count > total for pixel in pixels)
+
+
+def difference_hash(image: Image.Image, hash_size: int = 8) -> int:
+    """
+    Difference hash of an image : the gradient between the adjacent pixels of
+    a (hash_size + 1) x hash_size grayscale thumbnail.
+
+    Returns:
+        int: A hash of hash_size * hash_size bits
+    """
+    thumbnail = image.convert("L").resize((hash_size + 1, hash_size), Image.BOX)
+    np = _numpy()
+    if np is not None:
+        pixels = np.asarray(thumbnail)
+        return _array_bits_to_int(np, pixels[:, :-1] > pixels[:, 1:])
+    pixels = thumbnail.tobytes()
+    width = hash_size + 1
+    return _bits_to_int(
+        pixels[row * width + column] > pixels[row * width + column + 1]
+        for row in range(hash_size) for column in range(hash_size)
+    )
+
+
+def hamming_distance(hash_a: int, hash_b: int) -> int:
+    """Number of different bits between two perceptual hashes"""
+    return bin(hash_a ^ hash_b).count("1")
+
+
+def _bits_to_int(bits) -> int:
+    value = 0
+    for bit in bits:
+        value = (value << 1) | bit
+    return value
+
+
+def _array_bits_to_int(np, bits) -> int:
+    """The boolean array as an integer, its first bit (row-major) is the most significant"""
+    packed = np.packbits(bits.ravel())
+    # packbits pads the last byte with zeros
+    return int.from_bytes(packed.tobytes(), "big") >> (packed.size * 8 - bits.size)
+
+
+def _numpy():
+    """numpy if installed, None otherwise"""
+    try:
+        import numpy
+    except ImportError:
+        return None
+    return numpy
+
 #
 # some image2image models enforce some image ratio size (multiple of 128)
 #
@@ -122,3 +201,77 @@ def fit_to_nearest_aspect_ratio(image: Image.Image) -> Image.Image:
     # Use ImageOps.fit to crop and resize to the best matching aspect ratio
     fitted_image = ImageOps.fit(image, best_size, method=Image.LANCZOS)
     return fitted_image
+
+#
+# encoded images helpers, to work on the original bytes without decoding the pixels
+#
+_SIGNATURES = (
+    (b"\x89PNG\r\n\x1a\n", "image/png"),
+    (b"\xff\xd8\xff", "image/jpeg"),
+    (b"GIF87a", "image/gif"),
+    (b"GIF89a", "image/gif"),
+    (b"BM", "image/bmp"),
+)
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+
+
+def sniff_mime_type(image_bytes: bytes) -> Optional[str]:
+    """
+    Detect the MIME type of an encoded image from its magic bytes.
+
+    Returns:
+        Optional[str]: The MIME type, None if the format is unknown
+    """
+    if image_bytes[:4] == b"RIFF" and image_bytes[8:12] == b"WEBP":
+        return "image/webp"
+    for signature, mime_type in _SIGNATURES:
+        if image_bytes.startswith(signature):
+            return mime_type
+    # let Pillow identify the less common formats
+    try:
+        with Image.open(BytesIO(image_bytes)) as image:
+            return Image.MIME.get(image.format)
+    except Exception:
+        return None
+
+
+def png_add_text(png_bytes: bytes, text: Dict[str, str]) -> bytes:
+    """
+    Add tEXt chunks to an encoded PNG, without decoding it.
+
+    The existing tEXt chunks with the same keywords are replaced, the new chunks
+    are inserted right after the IHDR chunk.
+
+    Args:
+        png_bytes (bytes): The encoded PNG
+        text (Dict[str, str]): Keywords and values, must be latin-1 encodable
+
+    Returns:
+        bytes: The encoded PNG with the text chunks
+    """
+    if not png_bytes.startswith(PNG_SIGNATURE):
+        raise ValueError("Not a PNG image")
+    keywords = {key.encode("latin-1") for key in text}
+    new_chunks = b"".join(
+        _png_chunk(b"tEXt", key.encode("latin-1") + b"\0" + value.encode("latin-1"))
+        for key, value in text.items()
+    )
+    output = [PNG_SIGNATURE]
+    position = len(PNG_SIGNATURE)
+    while position < len(png_bytes):
+        length = int.from_bytes(png_bytes[position:position + 4], "big")
+        chunk_type = png_bytes[position + 4:position + 8]
+        end = position + 12 + length
+        chunk = png_bytes[position:end]
+        replaced = chunk_type == b"tEXt" and png_bytes[position + 8:end - 4].split(b"\0", 1)[0] in keywords
+        if not replaced:
+            output.append(chunk)
+        if chunk_type == b"IHDR":
+            output.append(new_chunks)
+        position = end
+    return b"".join(output)
+
+
+def _png_chunk(chunk_type: bytes, data: bytes) -> bytes:
+    return len(data).to_bytes(4, "big") + chunk_type + data + zlib.crc32(chunk_type + data).to_bytes(4, "big")
@@ -0,0 +1,238 @@
+import json
+import binascii
+import logging
+from typing import Any, AsyncIterable, Iterable, List, Optional, Sequence, Tuple, Union
+
+logger = logging.getLogger(__name__)
+logger.addHandler(logging.NullHandler())
+
+"""
+incremental decoding of the JSON responses carrying base64 images
+
+The image generation APIs return the images as multi-MB base64 strings inside a JSON document.
+Instead of loading the whole body, then the parsed document, then the decoded bytes, the
+JsonBase64Decoder scans the body as it is received and base64-decodes the strings at the
+target paths chunk by chunk. The rest of the document (small) is parsed with json.loads.
+"""
+
+# a path in a JSON document : object keys and array indices, None matches any key or index
+JsonPath = Tuple[Optional[Union[str, int]], ...]
+
+_STRUCTURE, _STRING, _BASE64 = range(3)
+_QUOTE, _BACKSLASH = ord('"'), ord("\\")
+_OPEN_OBJECT, _CLOSE_OBJECT, _OPEN_ARRAY, _CLOSE_ARRAY = ord("{"), ord("}"), ord("["), ord("]")
+_COMMA, _COLON = ord(","), ord(":")
+# escapes found in base64 strings : "\/" and the line breaks of the MIME encoders
+_BASE64_ESCAPES = {ord("/"): b"/", ord("n"): b"", ord("r"): b""}
+
+
+class JsonBase64Decoder:
+    """
+    Incremental JSON decoder, base64-decoding the strings found at the target paths.
+
+    Args:
+        targets (Sequence[JsonPath]): Paths of the base64 strings, e.g. ("images", None) for all
+            the items of the images array, ("result", "image") for a nested key
+
+    Example:
+        decoder = JsonBase64Decoder([("images", None)])
+        for chunk in response.iter_bytes():
+            decoder.feed(chunk)
+        document, images = decoder.close()
+    """
+
+    def __init__(self, targets: Sequence[JsonPath]) -> None:
+        self._targets = [tuple(target) for target in targets]
+        # the document without the base64 strings, replaced by null
+        self._skeleton = bytearray()
+        # [key, expecting_key] for an object, [index] for an array
+        self._stack: List[list] = []
+        self._state = _STRUCTURE
+        self._escape = False
+        self._is_key = False
+        self._key = bytearray()
+        # decoded strings, and the chunks of the string being decoded
+        self._decoded: List[bytes] = []
+        self._chunks: List[bytes] = []
+        # base64 characters not decoded yet, less than a 4 characters quantum
+        self._pending = b""
+
+    def feed(self, chunk: bytes) -> None:
+        """Scan the next chunk of the document"""
+        position = 0
+        end = len(chunk)
+        while position < end:
+            if self._state == _BASE64:
+                position = self._feed_base64(chunk, position)
+            elif self._state == _STRING:
+                position = self._feed_string(chunk, position)
+            else:
+                position = self._feed_structure(chunk, position)
+
+    def close(self) -> Tuple[Any, List[bytes]]:
+        """
+        End of the document.
+
+        Returns:
+            Tuple[Any, List[bytes]]: The document, with null in place of the base64 strings,
+            and the decoded strings in the order of the document
+
+        Raises:
+            ValueError: If the document is truncated or invalid
+        """
+        if self._state != _STRUCTURE or self._stack:
+            raise ValueError("Truncated JSON document")
+        try:
+            document = json.loads(self._skeleton)
+        except json.JSONDecodeError as e:
+            raise ValueError(f"Invalid JSON document: {e}") from e
+        return document, self._decoded
+
+    def _feed_structure(self, chunk: bytes, position: int) -> int:
+        stack = self._stack
+        end = len(chunk)
+        while position < end:
+            byte = chunk[position]
+            position += 1
+            self._skeleton.append(byte)
+            if byte == _QUOTE:
+                self._start_string()
+                return position
+            if byte == _OPEN_OBJECT:
+                stack.append([None, True])
+            elif byte == _OPEN_ARRAY:
+                stack.append([0])
+            elif byte == _CLOSE_OBJECT or byte == _CLOSE_ARRAY:
+                stack.pop()
+            elif byte == _COMMA:
+                if len(stack[-1]) == 2:
+                    stack[-1][1] = True
+                else:
+                    stack[-1][0] += 1
+            elif byte == _COLON:
+                stack[-1][1] = False
+        return position
+
+    def _start_string(self) -> None:
+        self._escape = False
+        top = self._stack[-1] if self._stack else None
+        self._is_key = top is not None and len(top) == 2 and top[1]
+        if self._is_key:
+            self._key.clear()
+            self._state = _STRING
+        elif self._is_target(tuple(frame[0] for frame in self._stack)):
+            # replace the string by null in the skeleton
+            self._skeleton[-1:] = b"null"
+            self._chunks = []
+            self._pending = b""
+            self._state = _BASE64
+        else:
+            self._state = _STRING
+
+    def _is_target(self, path: Tuple) -> bool:
+        return any(
+            len(target) == len(path) and all(part is None or part == element for part, element in zip(target, path))
+            for target in self._targets
+        )
+
+    def _feed_string(self, chunk: bytes, position: int) -> int:
+        end = len(chunk)
+        while position < end:
+            if self._escape:
+                self._copy(chunk[position:position + 1])
+                self._escape = False
+                position += 1
+                continue
+            stop = _find_special(chunk, position)
+            if stop < 0:
+                self._copy(chunk[position:])
+                return end
+            self._copy(chunk[position:stop])
+            if chunk[stop] == _BACKSLASH:
+                self._copy(b"\\")
+                self._escape = True
+                position = stop + 1
+                continue
+            # closing quote
+            self._skeleton.append(_QUOTE)
+            if self._is_key:
+                self._stack[-1][0] = json.loads(b'"' + bytes(self._key) + b'"')
+            self._state = _STRUCTURE
+            return stop + 1
+        return position
+
+    def _copy(self, data: bytes) -> None:
+        self._skeleton += data
+        if self._is_key:
+            self._key += data
+
+    def _feed_base64(self, chunk: bytes, position: int) -> int:
+        end = len(chunk)
+        while position < end:
+            if self._escape:
+                replacement = _BASE64_ESCAPES.get(chunk[position])
+                if replacement is None:
+                    raise ValueError("Unexpected escape sequence in a base64 string")
+                self._decode(replacement)
+                self._escape = False
+                position += 1
+                continue
+            stop = _find_special(chunk, position)
+            if stop < 0:
+                self._decode(chunk[position:])
+                return end
+            self._decode(chunk[position:stop])
+            if chunk[stop] == _BACKSLASH:
+                self._escape = True
+                position = stop + 1
+                continue
+            # closing quote
+            self._finish_base64()
+            self._state = _STRUCTURE
+            return stop + 1
+        return position
+
+    def _decode(self, data: bytes) -> None:
+        if self._pending:
+            data = self._pending + data
+        usable = len(data) - len(data) % 4
+        if usable:
+            self._chunks.append(binascii.a2b_base64(data[:usable]))
+        self._pending = data[usable:]
+
+    def _finish_base64(self) -> None:
+        if self._pending:
+            # unpadded base64
+            self._chunks.append(binascii.a2b_base64(self._pending + b"=" * (-len(self._pending) % 4)))
+        self._decoded.append(b"".join(self._chunks))
+        self._chunks = []
+        self._pending = b""
+
+
+def decode_json_base64(chunks: Iterable[bytes], targets: Sequence[JsonPath]) -> Tuple[Any, List[bytes]]:
+    """
+    Decode a JSON document received by chunks, see JsonBase64Decoder.
+
+    Example:
+        with client.stream("POST", url, json=payload) as response:
+            document, images = decode_json_base64(response.iter_bytes(), [("images", None)])
+    """
+    decoder = JsonBase64Decoder(targets)
+    for chunk in chunks:
+        decoder.feed(chunk)
+    return decoder.close()
+
+
+async def adecode_json_base64(chunks: AsyncIterable[bytes], targets: Sequence[JsonPath]) -> Tuple[Any, List[bytes]]:
+    """Async version of decode_json_base64"""
+    decoder = JsonBase64Decoder(targets)
+    async for chunk in chunks:
+        decoder.feed(chunk)
+    return decoder.close()
+
+
+def _find_special(chunk: bytes, position: int) -> int:
+    """Position of the next quote or backslash, -1 if there is none"""
+    quote = chunk.find(b'"', position)
+    backslash = chunk.find(b"\\", position, quote if quote >= 0 else len(chunk))
+    return backslash if backslash >= 0 else quote
@@ -0,0 +1,113 @@
+import time
+import threading
+import pytest
+from unittest.mock import MagicMock
+
+from polymage.agent.instruct_agent import InstructAgent
+from polymage.agent.image_captioner_agent import ImageCaptionerAgent
+from polymage.agent.batch import BatchRun
+from polymage.platform.platform import Platform
+
+
+@pytest.fixture
+def mock_platform():
+    """Provides a mocked Platform echoing the prompt."""
+    platform = MagicMock(spec=Platform)
+    platform.text2text.side_effect = lambda model, prompt, **kwargs: prompt.upper()
+    return platform
+
+
+@pytest.fixture
+def agent(mock_platform):
+    return InstructAgent(platform=mock_platform, model="test-model")
+
+
+class TestRunMany:
+
+    def test_all_items_are_processed(self, agent):
+        """Every item produces one result."""
+        results = list(agent.run_many(["a", "b", "c"], max_concurrency=2))
+        assert sorted(r.value for r in results) == ["A", "B", "C"]
+        assert all(r.ok for r in results)
+
+    def test_errors_are_captured(self, agent, mock_platform):
+        """A failing item doesn't abort the batch."""
+        def text2text(model, prompt, **kwargs):
+            if prompt == "bad":
+                raise RuntimeError("boom")
+            return prompt
+
+        mock_platform.text2text.side_effect = text2text
+        batch = agent.run_many(["ok", "bad", "fine"], max_concurrency=3)
+        results = {r.item: r for r in batch}
+
+        assert isinstance(results["bad"].error, RuntimeError)
+        assert results["ok"].value == "ok"
+        assert batch.summary.failed == 1
+        assert batch.summary.succeeded == 2
+
+    def test_ordered_results(self, agent, mock_platform):
+        """With ordered=True the results follow the input order, whatever the completion order."""
+        def text2text(model, prompt, **kwargs):
+            time.sleep(0.01 * (5 - int(prompt)))
+            return prompt
+
+        mock_platform.text2text.side_effect = text2text
+        results = list(agent.run_many([str(i) for i in range(5)], max_concurrency=5, ordered=True))
+        assert [r.index for r in results] == [0, 1, 2, 3, 4]
+
+    def test_max_concurrency_is_respected(self, agent, mock_platform):
+        """No more than max_concurrency calls run at the same time."""
+        lock = threading.Lock()
+        state = {"running": 0, "peak": 0}
+
+        def text2text(model, prompt, **kwargs):
+            with lock:
+                state["running"] += 1
+                state["peak"] = max(state["peak"], state["running"])
+            time.sleep(0.01)
+            with lock:
+                state["running"] -= 1
+            return prompt
+
+        mock_platform.text2text.side_effect = text2text
+        list(agent.run_many([str(i) for i in range(20)], max_concurrency=3))
+        assert state["peak"] <= 3
+
+    def test_input_is_consumed_lazily(self, agent):
+        """The input iterable is only pulled when a slot is free (backpressure)."""
+        pulled = []
+
+        def items():
+            for i in range(1000):
+                pulled.append(i)
+                yield str(i)
+
+        batch = agent.run_many(items(), max_concurrency=2)
+        next(batch)
+        assert len(pulled) <= 3
+        batch.close()
+
+    def test_summary(self, agent):
+        """The summary is available once the iterator is exhausted."""
+        batch = agent.run_many(["a", "b"], max_concurrency=2)
+        assert batch.summary is None
+        list(batch)
+        assert batch.summary.total == 2
+        assert batch.summary.throughput > 0
+
+    def test_item_forms(self, mock_platform):
+        """Items can be a prompt, a (prompt, media) tuple or a dict of run() arguments."""
+        mock_platform.image2text.return_value = "a caption"
+        agent = ImageCaptionerAgent(platform=mock_platform, model="vision-model")
+        media = [MagicMock()]
+
+        results = list(agent.run_many([("describe", media), {"prompt": "caption", "media": media}], ordered=True))
+
+        assert [r.value for r in results] == ["a caption", "a caption"]
+        mock_platform.image2text.assert_any_call(model="vision-model", prompt="describe", media=media)
+        mock_platform.image2text.assert_any_call(model="vision-model", prompt="caption", media=media)
+
+    def test_invalid_concurrency(self):
+        with pytest.raises(ValueError):
+            BatchRun(lambda item: item, [], max_concurrency=0)
@@ -0,0 +1,146 @@
+import io
+import json
+import base64
+import asyncio
+import httpx
+import pytest
+from PIL import Image
+
+from polymage.model.model import Model
+from polymage.registry import ModelRegistry
+from polymage.platform.drawthings import DrawThingsPlatform, GenerationRequest, pack_generations
+from polymage.platform.cloudflare import CloudflarePlatform
+
+
+@pytest.fixture
+def png_bytes():
+    buffer = io.BytesIO()
+    Image.new("RGB", (32, 32), "green").save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+def _transport(body):
+    return httpx.MockTransport(lambda request: httpx.Response(200, content=body))
+
+
+class TestDrawThingsStreaming:
+
+    @pytest.fixture
+    def platform(self, png_bytes):
+        platform = DrawThingsPlatform()
+        body = json.dumps({"images": [base64.b64encode(png_bytes).decode("ascii")], "info": "{}"}).encode("utf-8")
+        platform._clients["http"] = httpx.Client(transport=_transport(body))
+        platform._body = body
+        return platform
+
+    def test_text2image(self, platform, png_bytes):
+        image = platform._text2image(Model(name="flux", internal_name="flux.ckpt", default_params={}), "a green square")
+        assert image.to_bytes(format=None) == png_bytes
+        assert not image.is_decoded()
+        assert image._metadata["Description"] == "a green square"
+
+    def test_atext2image(self, platform, png_bytes):
+        async def run():
+            platform._async_clients["http"] = (asyncio.get_running_loop(), httpx.AsyncClient(transport=_transport(platform._body)))
+            return await platform._atext2image(Model(name="flux", internal_name="flux.ckpt", default_params={}), "a green square")
+
+        assert asyncio.run(run()).to_bytes(format=None) == png_bytes
+
+    def test_no_image(self):
+        platform = DrawThingsPlatform()
+        platform._clients["http"] = httpx.Client(transport=_transport(b'{"images": []}'))
+        with pytest.raises(ValueError):
+            platform._text2image(Model(name="flux", internal_name="flux.ckpt", default_params={}), "prompt")
+
+
+class TestDrawThingsBatch:
+
+    @pytest.fixture
+    def payloads(self):
+        return []
+
+    @pytest.fixture
+    def platform(self, png_bytes, payloads):
+        def handler(request):
+            payload = json.loads(request.content)
+            payloads.append(payload)
+            images = [base64.b64encode(png_bytes).decode("ascii")] * payload.get("batch_size", 1)
+            return httpx.Response(200, json={"images": images})
+
+        ModelRegistry.register("batch-model", "drawthings", Model(
+            internal_name="batch.ckpt", capabilities=["text2image"],
+            default_params={"seed": -1, "batch_count": 1}, platform_params={"max_batch_size": 3},
+        ))
+        platform = DrawThingsPlatform()
+        platform._clients["http"] = httpx.Client(transport=httpx.MockTransport(handler))
+        platform._handler = handler
+        return platform
+
+    def test_text2images_batches_the_calls(self, platform, payloads, png_bytes):
+        images = platform.text2images(model="batch-model", prompt="a cat", count=5, seed=10)
+
+        assert len(images) == 5
+        assert images[4].to_bytes(format=None) == png_bytes
+        assert [(payload["batch_size"], payload["seed"]) for payload in payloads] == [(3, 10), (2, 13)]
+        assert all(payload["batch_count"] == 1 for payload in payloads)
+
+    def test_atext2images(self, platform, payloads):
+        async def run():
+            client = httpx.AsyncClient(transport=httpx.MockTransport(platform._handler))
+            platform._async_clients["http"] = (asyncio.get_running_loop(), client)
+            return await platform.atext2images(model="batch-model", prompt="a cat", count=2)
+
+        assert len(asyncio.run(run())) == 2
+        assert payloads[0]["batch_size"] == 2 and payloads[0]["seed"] == -1
+
+    def test_kwargs_override_the_default_params(self, platform, payloads):
+        platform.text2image(model="batch-model", prompt="a cat", steps=4)
+        assert payloads[0]["steps"] == 4
+        assert payloads[0]["model"] == "batch.ckpt"
+
+    def test_text2image_batch_keeps_the_order(self, platform, payloads):
+        requests = [GenerationRequest("a cat", 2), GenerationRequest("a dog"), GenerationRequest("a cat", 1)]
+        images = platform.text2image_batch(model="batch-model", requests=requests)
+
+        assert len(images) == 3 and all(image is not None for image in images)
+        assert sorted((payload["prompt"], payload["seed"], payload["batch_size"]) for payload in payloads) == \
+            [("a cat", 1, 2), ("a dog", -1, 1)]
+
+    def test_missing_images(self, platform):
+        platform._clients["http"] = httpx.Client(transport=_transport(b'{"images": []}'))
+        with pytest.raises(ValueError):
+            platform.text2images(model="batch-model", prompt="a cat", count=2)
+
+
+class TestPackGenerations:
+
+    def test_consecutive_seeds_share_a_batch(self):
+        batches = pack_generations([GenerationRequest("a cat", seed) for seed in (3, 1, 2, 10)], max_batch_size=4)
+        assert [(batch.seed, batch.indices) for batch in batches] == [(1, [1, 2, 0]), (10, [3])]
+
+    def test_random_seeds_are_packed_up_to_the_batch_size(self):
+        batches = pack_generations([GenerationRequest("a cat")] * 5, max_batch_size=2)
+        assert [batch.size for batch in batches] == [2, 2, 1]
+        assert all(batch.seed == -1 for batch in batches)
+
+    def test_prompts_are_not_mixed(self):
+        batches = pack_generations([GenerationRequest("a cat"), GenerationRequest("a dog"), GenerationRequest("a cat")])
+        assert [(batch.prompt, batch.indices) for batch in batches] == [("a cat", [0, 2]), ("a dog", [1])]
+
+    def test_duplicate_seeds_are_separate_calls(self):
+        batches = pack_generations([GenerationRequest("a cat", 7), GenerationRequest("a cat", 7)])
+        assert len(batches) == 2
+
+
+class TestCloudflareStreaming:
+
+    @pytest.mark.parametrize("output_type", ["base64", "bytes"])
+    def test_text2image(self, png_bytes, output_type):
+        platform = CloudflarePlatform(api_id="id", api_key="key")
+        if output_type == "base64":
+            body = json.dumps({"result": {"image": base64.b64encode(png_bytes).decode("ascii")}, "success": True}).encode("utf-8")
+        else:
+            body = png_bytes
+        platform._clients["http"] = httpx.Client(transport=_transport(body))
+        model = Model(name="flux", internal_name="@cf/flux", default_params={}, platform_params={"output_type": output_type})
+        assert platform._text2image(model, "a green square").to_bytes(format=None) == png_bytes
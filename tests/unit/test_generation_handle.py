@@ -0,0 +1,258 @@
+import io
+import time
+import json
+import base64
+import asyncio
+import threading
+import httpx
+import pytest
+from concurrent.futures import ThreadPoolExecutor, wait
+from unittest.mock import MagicMock
+from PIL import Image
+
+from polymage.registry import ModelRegistry
+from polymage.model.model import Model
+from polymage.platform.drawthings import DrawThingsPlatform
+from polymage.platform.generation_handle import (
+    GenerationHandle, AsyncGenerationHandle, GenerationProgress, GenerationCancelled, GenerationTimeout,
+)
+
+
+@pytest.fixture
+def png_bytes():
+    buffer = io.BytesIO()
+    Image.new("RGB", (32, 32), "green").save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+@pytest.fixture
+def executor():
+    executor = ThreadPoolExecutor(max_workers=1)
+    yield executor
+    executor.shutdown(wait=False)
+
+
+def _progress(step):
+    return GenerationProgress(progress=step / 4, step=step, steps=4)
+
+
+class TestGenerationHandle:
+
+    def test_progress_then_result(self, executor):
+        release = threading.Event()
+        future = executor.submit(lambda: release.wait(5) and ["image"])
+        steps = iter(range(1, 10))
+        poll = MagicMock(side_effect=lambda previews: _progress(next(steps)))
+
+        handle = GenerationHandle(future, poll, MagicMock(), poll_interval=0.01)
+        seen = []
+        for progress in handle.progress():
+            seen.append(progress.step)
+            if len(seen) == 3:
+                release.set()
+        assert seen[:3] == [1, 2, 3]
+        assert handle.result() == ["image"]
+
+    def test_unchanged_progress_is_not_repeated(self, executor):
+        release = threading.Event()
+        future = executor.submit(lambda: release.wait(5) and ["image"])
+        polls = []
+
+        def poll(previews):
+            polls.append(previews)
+            if len(polls) == 5:
+                release.set()
+            return _progress(1)
+
+        handle = GenerationHandle(future, poll, MagicMock(), poll_interval=0.01)
+        assert len(list(handle.progress(previews=True))) == 1
+        assert polls[0] is True
+
+    def test_polling_stops_when_not_supported(self, executor):
+        future = executor.submit(lambda: time.sleep(0.1) or ["image"])
+        poll = MagicMock(return_value=None)
+
+        handle = GenerationHandle(future, poll, MagicMock(), poll_interval=0.01)
+        assert list(handle.progress()) == []
+        poll.assert_called_once()
+        assert handle.result() == ["image"]
+
+    def test_cancel_interrupts_the_server(self, executor):
+        release = threading.Event()
+        future = executor.submit(lambda: release.wait(5))
+        while not future.running():
+            time.sleep(0.001)
+        interrupt = MagicMock(side_effect=release.set)
+
+        handle = GenerationHandle(future, MagicMock(), interrupt)
+        assert handle.cancel()
+        interrupt.assert_called_once()
+        with pytest.raises(GenerationCancelled):
+            handle.result()
+        assert not handle.cancel()
+
+    def test_queued_generation_is_dropped_without_interrupt(self, executor):
+        release = threading.Event()
+        executor.submit(lambda: release.wait(5))
+        interrupt = MagicMock()
+
+        handle = GenerationHandle(executor.submit(lambda: ["image"]), MagicMock(), interrupt)
+        assert handle.cancel()
+        interrupt.assert_not_called()
+        release.set()
+
+    def test_timeout_interrupts_the_generation(self, executor):
+        release = threading.Event()
+        future = executor.submit(lambda: release.wait(5))
+        interrupt = MagicMock(side_effect=release.set)
+
+        handle = GenerationHandle(future, MagicMock(return_value=None), interrupt, timeout=0.05)
+        with pytest.raises(GenerationTimeout):
+            handle.result()
+        interrupt.assert_called_once()
+
+    def test_result_wait_timeout(self, executor):
+        release = threading.Event()
+        handle = GenerationHandle(executor.submit(lambda: release.wait(5)), MagicMock(), MagicMock())
+        with pytest.raises(TimeoutError):
+            handle.result(timeout=0.01)
+        release.set()
+
+
+class TestAsyncGenerationHandle:
+
+    def test_progress_and_cancel(self):
+        async def run():
+            task = asyncio.create_task(asyncio.sleep(5))
+            interrupted = []
+
+            async def poll(previews):
+                return _progress(1)
+
+            async def interrupt():
+                interrupted.append(True)
+
+            handle = AsyncGenerationHandle(task, poll, interrupt, poll_interval=0.01)
+            with pytest.raises(GenerationCancelled):
+                async for progress in handle.progress():
+                    assert progress.step == 1
+                    await handle.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await task
+            return interrupted
+
+        assert asyncio.run(run()) == [True]
+
+    def test_cancel_before_start_does_not_interrupt(self):
+        async def run():
+            interrupt = MagicMock()
+            poll = MagicMock()
+
+            async def ainterrupt():
+                interrupt()
+
+            async def apoll(previews):
+                poll()
+                return _progress(1)
+
+            task = asyncio.create_task(asyncio.sleep(5))
+            handle = AsyncGenerationHandle(task, apoll, ainterrupt, poll_interval=0.01)
+            assert await handle.cancel()
+            with pytest.raises(GenerationCancelled):
+                async for _ in handle.progress():
+                    pass
+            return interrupt, poll
+
+        interrupt, poll = asyncio.run(run())
+        interrupt.assert_not_called()
+        poll.assert_not_called()
+
+    def test_timeout(self):
+        async def run():
+            async def interrupt():
+                pass
+
+            async def poll(previews):
+                return None
+
+            handle = AsyncGenerationHandle(asyncio.create_task(asyncio.sleep(5)), poll, interrupt, timeout=0.05)
+            await handle.result()
+
+        with pytest.raises(GenerationTimeout):
+            asyncio.run(run())
+
+
+class TestDrawThingsGeneration:
+
+    @pytest.fixture
+    def server(self):
+        """A fake sdapi server : the generation waits until it is interrupted, or released"""
+        state = {"release": threading.Event(), "paths": []}
+
+        def handler(request):
+            state["paths"].append(request.url.path)
+            if request.url.path == "/sdapi/v1/progress":
+                preview = request.url.params["skip_current_image"] == "false"
+                return httpx.Response(200, json={
+                    "progress": 0.5, "eta_relative": 1.5,
+                    "state": {"sampling_step": 2, "sampling_steps": 4},
+                    "current_image": base64.b64encode(state["png"]).decode("ascii") if preview else None,
+                })
+            if request.url.path == "/sdapi/v1/interrupt":
+                state["release"].set()
+                return httpx.Response(200, json={})
+            state["release"].wait(5)
+            payload = json.loads(request.content)
+            return httpx.Response(200, json={"images": [base64.b64encode(state["png"]).decode("ascii")] * payload.get("batch_size", 1)})
+
+        return state, handler
+
+    @pytest.fixture
+    def platform(self, server, png_bytes):
+        state, handler = server
+        state["png"] = png_bytes
+        ModelRegistry.register("handle-model", "drawthings", Model(
+            internal_name="handle.ckpt", capabilities=["text2image"], default_params={"seed": -1},
+        ))
+        platform = DrawThingsPlatform()
+        platform._clients["http"] = httpx.Client(transport=httpx.MockTransport(handler))
+        yield platform
+        platform.close()
+
+    def test_progress_with_previews(self, platform, server):
+        state, _ = server
+        handle = platform.start_text2image(model="handle-model", prompt="a cat", count=2, poll_interval=0.01)
+        for progress in handle.progress(previews=True):
+            assert (progress.step, progress.steps, progress.eta) == (2, 4, 1.5)
+            assert progress.preview.size() == (32, 32)
+            state["release"].set()
+        assert len(handle.result()) == 2
+
+    def test_cancel_calls_the_interrupt_endpoint(self, platform, server):
+        state, _ = server
+        handle = platform.start_text2image(model="handle-model", prompt="a cat")
+        while "/sdapi/v1/txt2img" not in state["paths"]:
+            time.sleep(0.001)
+        handle.cancel()
+        assert "/sdapi/v1/interrupt" in state["paths"]
+
+    def test_cancel_skips_the_remaining_batches(self, platform, server):
+        state, _ = server
+        handle = platform.start_text2image(model="handle-model", prompt="a cat", count=8)
+        while "/sdapi/v1/txt2img" not in state["paths"]:
+            time.sleep(0.001)
+        handle.cancel()
+        wait([handle._future], timeout=5)
+        assert state["paths"].count("/sdapi/v1/txt2img") == 1
+        with pytest.raises(GenerationCancelled):
+            handle.result()
+
+    def test_progress_not_supported(self, png_bytes):
+        def handler(request):
+            if request.url.path == "/sdapi/v1/progress":
+                return httpx.Response(404)
+            return httpx.Response(200, json={"images": [base64.b64encode(png_bytes).decode("ascii")]})
+
+        platform = DrawThingsPlatform()
+        platform._clients["http"] = httpx.Client(transport=httpx.MockTransport(handler))
+        assert platform._progress() is None
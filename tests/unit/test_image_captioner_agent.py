@@ -1,4 +1,5 @@
 import pytest
+import asyncio
 from unittest.mock import MagicMock, patch
 from pydantic import BaseModel
 from typing import List
@@ -69,3 +70,16 @@ class TestImageCaptionerAgent:
             prompt="Hello",
             media=None
         )
+
+    def test_arun_calls_platform_aimage2text(self, agent, mock_platform, mock_media):
+        """Tests if arun() awaits platform.aimage2text with right args."""
+        mock_platform.aimage2text.return_value = "A cat on a sofa."
+
+        result = asyncio.run(agent.arun(prompt="Describe this image.", media=mock_media))
+
+        mock_platform.aimage2text.assert_awaited_once_with(
+            model="test-vision-model",
+            prompt="Describe this image.",
+            media=mock_media
+        )
+        assert result == "A cat on a sofa."
@@ -1,5 +1,6 @@
 import pytest
-from unittest.mock import MagicMock
+import asyncio
+from unittest.mock import MagicMock, AsyncMock
 from pydantic import BaseModel
 from polymage.agent.image_generator_agent import ImageGeneratorAgent
 
@@ -75,6 +76,13 @@ class TestImageGeneratorAgent:
             style="vivid"
         )
 
+    def test_agent_default_params(self, mock_platform):
+        """Test that the agent defaults are passed to the platform, under the run kwargs."""
+        agent = ImageGeneratorAgent(platform=mock_platform, model="flux", default_params={"steps": 4, "seed": 1})
+        agent.run(prompt="A cat", seed=7)
+
+        mock_platform.text2image.assert_called_once_with(model="flux", prompt="A cat", steps=4, seed=7)
+
     def test_run_with_response_model(self, agent, mock_platform):
         """Test that passing a response_model doesn't break the call (it's ignored by current logic)."""
         prompt = "A cat"
@@ -82,3 +90,41 @@ class TestImageGeneratorAgent:
 
         # Verify it still routes to text2image correctly
         mock_platform.text2image.assert_called_once()
+
+    def test_arun_text_to_image(self, agent, mock_platform):
+        """Test that arun awaits atext2image when media is None."""
+        mock_platform.atext2image = AsyncMock(return_value="image_url_456")
+
+        result = asyncio.run(agent.arun(prompt="A cat", media=None))
+
+        mock_platform.atext2image.assert_awaited_once_with(model=agent.model, prompt="A cat")
+        assert result == "image_url_456"
+
+    def test_run_with_count(self, agent, mock_platform):
+        """Test that run calls text2images when count is given."""
+        mock_platform.text2images.return_value = ["image_1", "image_2"]
+
+        result = agent.run(prompt="A cat", count=2)
+
+        mock_platform.text2images.assert_called_once_with(model=agent.model, prompt="A cat", count=2)
+        mock_platform.text2image.assert_not_called()
+        assert result == ["image_1", "image_2"]
+
+    def test_arun_with_count(self, agent, mock_platform):
+        """Test that arun awaits atext2images when count is given."""
+        mock_platform.atext2images = AsyncMock(return_value=["image_1", "image_2"])
+
+        result = asyncio.run(agent.arun(prompt="A cat", count=2))
+
+        mock_platform.atext2images.assert_awaited_once_with(model=agent.model, prompt="A cat", count=2)
+        assert result == ["image_1", "image_2"]
+
+    def test_arun_image_to_image(self, agent, mock_platform):
+        """Test that arun awaits aimage2image when media is provided."""
+        mock_media = [MagicMock()]
+        mock_platform.aimage2image = AsyncMock(return_value="edited_image_url")
+
+        result = asyncio.run(agent.arun(prompt="Van Gogh style", media=mock_media))
+
+        mock_platform.aimage2image.assert_awaited_once_with(model=agent.model, prompt="Van Gogh style", media=mock_media)
+        assert result == "edited_image_url"
@@ -0,0 +1,81 @@
+import io
+import pytest
+from PIL import Image, ImageOps
+
+from polymage.media.image_media import ImageMedia
+from polymage.media.image_hash import PerceptualIndex, content_hashes, perceptual_hashes, deduplicate_images
+from polymage.utils import image_utils
+
+
+def _jpeg(image, **params):
+    buffer = io.BytesIO()
+    image.save(buffer, format="JPEG", **params)
+    return buffer.getvalue()
+
+
+@pytest.fixture
+def gradient():
+    return Image.linear_gradient("L").rotate(90).convert("RGB").resize((64, 48))
+
+
+class TestBatchHashes:
+
+    def test_hashes_keep_the_order(self, gradient):
+        images = [ImageMedia(gradient), ImageMedia(ImageOps.mirror(gradient)), ImageMedia(_jpeg(gradient))]
+        assert content_hashes(images, max_workers=2) == [image.content_hash() for image in images]
+        assert perceptual_hashes(images, max_workers=2) == [image.perceptual_hash() for image in images]
+
+
+class TestPerceptualHashes:
+
+    @pytest.mark.parametrize("hash_size", [8, 5])
+    @pytest.mark.parametrize("hash_function", [image_utils.average_hash, image_utils.difference_hash])
+    def test_numpy_matches_pure_python(self, monkeypatch, hash_function, hash_size):
+        pytest.importorskip("numpy")
+        image = Image.effect_noise((64, 48), 64)
+        vectorized = hash_function(image, hash_size)
+        monkeypatch.setattr(image_utils, "_numpy", lambda: None)
+        assert hash_function(image, hash_size) == vectorized
+        assert vectorized.bit_length() <= hash_size * hash_size
+
+
+class TestPerceptualIndex:
+
+    def test_near_duplicates(self):
+        index = PerceptualIndex(max_distance=2)
+        assert index.add(0b1011 << 40)
+        # 2 bits away, in another band
+        assert index.find((0b1011 << 40) ^ 0b11) == 0b1011 << 40
+        assert not index.add((0b1011 << 40) ^ 0b11)
+        # 3 bits away
+        assert index.add((0b1011 << 40) ^ 0b111)
+
+    def test_exact_matches_only(self):
+        index = PerceptualIndex(max_distance=0)
+        assert index.add(42)
+        assert not index.add(42)
+        assert index.add(43)
+
+    def test_invalid_distance(self):
+        with pytest.raises(ValueError):
+            PerceptualIndex(max_distance=64)
+
+
+class TestDeduplicateImages:
+
+    def test_duplicates_are_dropped(self, gradient):
+        original = ImageMedia(gradient)
+        encoded = _jpeg(gradient)
+        images = [
+            original,
+            ImageMedia(encoded),
+            ImageMedia(encoded),
+            ImageMedia(_jpeg(gradient.resize((200, 150)), quality=60)),
+            ImageMedia(ImageOps.mirror(gradient)),
+        ]
+        assert deduplicate_images(images) == [original, images[4]]
+
+    def test_identical_perceptual_hashes_only(self, gradient):
+        encoded = _jpeg(gradient)
+        images = [ImageMedia(encoded), ImageMedia(encoded), ImageMedia(_jpeg(gradient, quality=50))]
+        assert deduplicate_images(images, max_distance=0) == [images[0]]
@@ -4,7 +4,7 @@ import base64
 from PIL import Image
 
 from unittest.mock import MagicMock, patch
-from polymage.media.image_media import ImageMedia
+from polymage.media.image_media import ImageMedia, set_pixel_budget, pixel_budget
 from polymage.utils.image_utils  import image_to_base64
 
 
@@ -103,3 +103,243 @@ class TestImageMedia:
         args, kwargs = mock_save.call_args
         assert "pnginfo" in kwargs
         
+
+
+class TestImageMediaPassthrough:
+
+    def test_pixels_are_decoded_lazily(self, sample_base64_image):
+        media = ImageMedia(sample_base64_image)
+        assert not media.is_decoded()
+        assert media.format() == "PNG"
+        assert media.mime_type() == "image/png"
+        assert media._image.size == (10, 10)
+        assert media.is_decoded()
+
+    def test_to_base64_returns_the_original_string(self, sample_base64_image):
+        media = ImageMedia(sample_base64_image)
+        assert media.to_base64() is sample_base64_image
+        assert not media.is_decoded()
+
+    def test_to_bytes_returns_the_original_bytes(self, sample_bytes_image):
+        media = ImageMedia(sample_bytes_image)
+        assert media.to_bytes() is sample_bytes_image
+        assert media.to_bytes(format=None) is sample_bytes_image
+
+    def test_other_format_is_encoded(self, sample_bytes_image):
+        media = ImageMedia(sample_bytes_image)
+        jpeg = media.to_bytes(format="jpg")
+        assert Image.open(io.BytesIO(jpeg)).format == "JPEG"
+        # the original encoding is kept
+        assert media.to_bytes() is sample_bytes_image
+
+    def test_encoding_of_pixels_follows_the_edits(self, sample_pil_image):
+        media = ImageMedia(sample_pil_image)
+        first = media.to_base64()
+        media.image().putpixel((0, 0), (0, 0, 255))
+        assert media.to_base64() != first
+        assert ImageMedia(media.to_bytes()).image().getpixel((0, 0)) == (0, 0, 255)
+
+    def test_other_format_follows_the_edits_of_the_decoded_pixels(self, sample_bytes_image):
+        media = ImageMedia(sample_bytes_image)
+        media.to_bytes(format="BMP")
+        media.image().putpixel((0, 0), (0, 0, 255))
+        assert ImageMedia(media.to_bytes(format="BMP")).image().getpixel((0, 0)) == (0, 0, 255)
+
+    def test_original_encoding_follows_the_edits(self, sample_base64_image, tmp_path):
+        media = ImageMedia(sample_base64_image)
+        media.image().putpixel((0, 0), (0, 0, 255))
+        assert media.to_base64() != sample_base64_image
+        assert ImageMedia(media.to_base64(format=None)).image().getpixel((0, 0)) == (0, 0, 255)
+        media.save_to_file(str(tmp_path / "edited.png"))
+        assert ImageMedia.from_path(tmp_path / "edited.png").image().getpixel((0, 0)) == (0, 0, 255)
+
+    def test_private_image_attribute_hands_out_the_pixels(self, sample_bytes_image):
+        media = ImageMedia(sample_bytes_image)
+        media._image.putpixel((0, 0), (0, 0, 255))
+        assert ImageMedia(media.to_bytes()).image().getpixel((0, 0)) == (0, 0, 255)
+
+    def test_jpeg_original(self, sample_pil_image):
+        buffer = io.BytesIO()
+        sample_pil_image.save(buffer, format="JPEG")
+        media = ImageMedia(buffer.getvalue())
+        assert media.mime_type() == "image/jpeg"
+        assert media.to_base64(format=None) == base64.b64encode(buffer.getvalue()).decode("utf-8")
+
+    def test_set_image_invalidates_the_encoding(self, sample_bytes_image):
+        media = ImageMedia(sample_bytes_image)
+        media._image = Image.new("RGB", (4, 4), color="blue")
+        assert media.format() is None
+        encoded = media.to_bytes()
+        assert encoded != sample_bytes_image
+        assert Image.open(io.BytesIO(encoded)).size == (4, 4)
+
+    def test_save_passthrough_with_metadata(self, sample_bytes_image, tmp_path):
+        """The original PNG is written as is, with the metadata added as text chunks."""
+        media = ImageMedia(sample_bytes_image, metadata={"title": "Test"})
+        file_path = tmp_path / "image.png"
+        with patch("PIL.Image.Image.save") as mock_save:
+            media.save_to_file(str(file_path))
+            mock_save.assert_not_called()
+        saved_img = Image.open(file_path)
+        assert saved_img.info["title"] == "Test"
+        assert saved_img.size == (10, 10)
+        assert not media.is_decoded()
+
+    def test_save_other_format_is_encoded(self, sample_bytes_image, tmp_path):
+        media = ImageMedia(sample_bytes_image)
+        file_path = tmp_path / "image.jpg"
+        media.save_to_file(str(file_path))
+        assert Image.open(file_path).format == "JPEG"
+
+    def test_copy_shares_the_encoding(self, sample_bytes_image):
+        media = ImageMedia(sample_bytes_image, metadata={"title": "Test"})
+        copy = media.copy()
+        assert copy.to_bytes() is sample_bytes_image
+        assert copy._metadata == media._metadata
+        assert copy._metadata is not media._metadata
+
+
+@pytest.fixture
+def jpeg_file(sample_pil_image, tmp_path):
+    path = tmp_path / "image.jpg"
+    sample_pil_image.save(path, format="JPEG")
+    return path
+
+
+class TestImageMediaFile:
+
+    def test_from_path_is_lazy(self, jpeg_file):
+        media = ImageMedia.from_path(jpeg_file)
+        assert media.path() == jpeg_file
+        assert media.format() == "JPEG"
+        assert media.size() == (10, 10)
+        assert not media.is_decoded()
+        assert media.image().size == (10, 10)
+
+    def test_original_bytes_are_read_from_the_file(self, jpeg_file):
+        media = ImageMedia.from_path(str(jpeg_file))
+        original = jpeg_file.read_bytes()
+        assert media.to_bytes(format=None) == original
+        assert media.to_buffer()[:] == original
+        assert b"".join(media.iter_bytes(chunk_size=100)) == original
+        assert media.to_base64(format=None) == base64.b64encode(original).decode("utf-8")
+        assert not media.is_decoded()
+
+    def test_unknown_signature_is_identified_by_pillow(self, sample_pil_image, tmp_path):
+        path = tmp_path / "image.tiff"
+        sample_pil_image.save(path, format="TIFF")
+        media = ImageMedia.from_path(path)
+        assert media.format() == "TIFF"
+        assert media.image().size == (10, 10)
+
+    def test_empty_file(self, tmp_path):
+        path = tmp_path / "empty.png"
+        path.touch()
+        with pytest.raises(ValueError):
+            ImageMedia.from_path(path)
+
+    def test_overwrite_the_source_file(self, jpeg_file):
+        """The file is read in memory before being overwritten."""
+        original = jpeg_file.read_bytes()
+        media = ImageMedia.from_path(jpeg_file, metadata={"title": "Test"})
+        media.save_to_file(str(jpeg_file))
+        assert media.path() is None
+        assert media.to_bytes(format=None) == original
+        assert media.image().size == (10, 10)
+
+    def test_copy(self, jpeg_file):
+        copy = ImageMedia.from_path(jpeg_file).copy()
+        assert copy.path() == jpeg_file
+        assert copy.to_bytes(format=None) == jpeg_file.read_bytes()
+
+
+class TestPixelBudget:
+
+    @pytest.fixture(autouse=True)
+    def budget(self):
+        # 10x10 RGB images use 300 bytes
+        set_pixel_budget(700)
+        yield pixel_budget()
+        set_pixel_budget(None)
+
+    def test_least_recently_used_pixels_are_dropped(self, sample_bytes_image, budget):
+        images = [ImageMedia(sample_bytes_image) for _ in range(3)]
+        images[0]._decoded()
+        images[1]._decoded()
+        images[0]._decoded()
+        images[2]._decoded()
+        assert [media.is_decoded() for media in images] == [True, False, True]
+        assert budget.used() == 600
+        # decoded again on demand
+        assert images[1]._decoded().size == (10, 10)
+
+    def test_images_without_encoding_are_not_dropped(self, sample_pil_image, sample_bytes_image, budget):
+        pixels = [ImageMedia(sample_pil_image.copy()) for _ in range(3)]
+        for media in pixels:
+            media._decoded()
+        ImageMedia(sample_bytes_image)._decoded()
+        assert all(media.is_decoded() for media in pixels)
+        assert budget.used() == 300
+
+    def test_pixels_handed_out_are_not_dropped(self, sample_bytes_image, budget):
+        """They may have been edited in place."""
+        media = ImageMedia(sample_bytes_image)
+        media.image().putpixel((0, 0), (0, 0, 255))
+        set_pixel_budget(0)
+        assert media.is_decoded()
+        assert media.image().getpixel((0, 0)) == (0, 0, 255)
+
+    def test_set_image_forgets_the_pixels(self, sample_bytes_image, budget):
+        media = ImageMedia(sample_bytes_image)
+        media.image()
+        media.set_image(Image.new("RGB", (4, 4)))
+        assert budget.used() == 0
+
+    def test_lowering_the_budget(self, sample_bytes_image):
+        images = [ImageMedia(sample_bytes_image) for _ in range(2)]
+        for media in images:
+            media._decoded()
+        set_pixel_budget(0)
+        assert not any(media.is_decoded() for media in images)
+
+
+@pytest.fixture
+def gradient():
+    """A horizontal gradient, with some structure for the perceptual hashes."""
+    return Image.linear_gradient("L").rotate(90).convert("RGB").resize((64, 48))
+
+
+class TestImageMediaHash:
+
+    def test_content_hash_of_the_encoding(self, sample_bytes_image):
+        media = ImageMedia(sample_bytes_image)
+        assert media.content_hash() == ImageMedia(sample_bytes_image).content_hash()
+        # computed without decoding, and memoized
+        assert not media.is_decoded()
+        assert media._content_hash is not None
+
+    def test_content_hash_of_the_pixels(self, sample_pil_image):
+        media = ImageMedia(sample_pil_image)
+        assert media.content_hash() == ImageMedia(sample_pil_image.copy()).content_hash()
+        assert media.content_hash() != ImageMedia(Image.new("RGB", (10, 10), "blue")).content_hash()
+
+    def test_set_image_resets_the_hashes(self, sample_bytes_image):
+        media = ImageMedia(sample_bytes_image)
+        content_hash = media.content_hash()
+        perceptual_hash = media.perceptual_hash()
+        media.set_image(Image.new("RGB", (10, 10), "blue"))
+        assert media.content_hash() != content_hash
+        assert media._perceptual_hashes == {}
+
+    @pytest.mark.parametrize("method", ["dhash", "ahash"])
+    def test_perceptual_hash_survives_reencoding(self, gradient, method):
+        buffer = io.BytesIO()
+        gradient.resize((128, 96)).save(buffer, format="JPEG", quality=70)
+        original = ImageMedia(gradient).perceptual_hash(method)
+        reencoded = ImageMedia(buffer.getvalue())
+        assert reencoded.perceptual_hash(method) == original
+        assert not reencoded.is_decoded()
+
+    def test_invalid_perceptual_hash(self, sample_pil_image):
+        with pytest.raises(ValueError):
+            ImageMedia(sample_pil_image).perceptual_hash("phash")
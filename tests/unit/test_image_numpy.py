@@ -0,0 +1,96 @@
+import io
+import pytest
+from PIL import Image
+
+from polymage.media.image_media import ImageMedia, stack_images, unstack_images
+
+np = pytest.importorskip("numpy")
+
+
+@pytest.fixture
+def sample_pil_image():
+    return Image.new("RGB", (10, 10), color="red")
+
+
+@pytest.fixture
+def sample_bytes_image(sample_pil_image):
+    buffer = io.BytesIO()
+    sample_pil_image.save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+class TestImageMediaNumpy:
+
+    def test_rgba_shares_the_memory(self):
+        array = np.zeros((4, 6, 4), dtype=np.uint8)
+        media = ImageMedia.from_numpy(array)
+        array[1, 2] = (10, 20, 30, 40)
+        assert media.image().getpixel((2, 1)) == (10, 20, 30, 40)
+        assert np.shares_memory(media.to_numpy(), array)
+
+    def test_grayscale_shares_the_memory(self):
+        array = np.zeros((4, 6), dtype=np.uint8)
+        media = ImageMedia.from_numpy(array)
+        array[3, 5] = 200
+        assert media.image().mode == "L"
+        assert media.image().getpixel((5, 3)) == 200
+        assert media.to_numpy().shape == (4, 6)
+
+    def test_rgb_is_copied(self):
+        array = np.full((4, 6, 3), 7, dtype=np.uint8)
+        media = ImageMedia.from_numpy(array)
+        assert media.image().mode == "RGB"
+        result = media.to_numpy()
+        assert not np.shares_memory(result, array)
+        np.testing.assert_array_equal(result, array)
+
+    def test_modified_image_is_not_shared(self):
+        array = np.zeros((4, 6, 4), dtype=np.uint8)
+        media = ImageMedia.from_numpy(array)
+        media.image().putpixel((0, 0), (1, 2, 3, 4))
+        assert tuple(media.to_numpy()[0, 0]) == (1, 2, 3, 4)
+        assert tuple(array[0, 0]) == (0, 0, 0, 0)
+
+    def test_encodings_follow_the_array(self):
+        array = np.zeros((4, 6, 4), dtype=np.uint8)
+        media = ImageMedia.from_numpy(array)
+        media.to_base64()
+        media.to_bytes(format="PNG")
+        array[:] = 255
+        assert ImageMedia(media.to_base64()).image().getpixel((0, 0)) == (255, 255, 255, 255)
+        assert ImageMedia(media.to_bytes(format="PNG")).image().getpixel((0, 0)) == (255, 255, 255, 255)
+
+    def test_unsupported_array(self):
+        with pytest.raises(ValueError):
+            ImageMedia.from_numpy(np.zeros((4, 6, 2), dtype=np.uint8))
+
+    def test_to_numpy_of_an_encoded_image(self, sample_bytes_image):
+        array = ImageMedia(sample_bytes_image).to_numpy()
+        assert array.shape == (10, 10, 3)
+        assert tuple(array[0, 0]) == (255, 0, 0)
+
+
+class TestStackImages:
+
+    def test_stack_and_unstack(self, sample_pil_image):
+        images = [ImageMedia(sample_pil_image), ImageMedia(Image.new("RGB", (10, 10), "blue"))]
+        batch = stack_images(images)
+        assert batch.shape == (2, 10, 10, 3)
+        assert tuple(batch[1, 0, 0]) == (0, 0, 255)
+        result = unstack_images(batch, metadata={"Software": "test"})
+        assert [media.image().getpixel((0, 0)) for media in result] == [(255, 0, 0), (0, 0, 255)]
+        assert result[0]._metadata == {"Software": "test"}
+
+    def test_unstacked_rgba_images_share_the_batch(self):
+        batch = np.zeros((3, 4, 4, 4), dtype=np.uint8)
+        images = unstack_images(batch)
+        batch[2] = 255
+        assert images[2].image().getpixel((0, 0)) == (255, 255, 255, 255)
+
+    def test_mode_conversion(self, sample_pil_image):
+        batch = stack_images([ImageMedia(sample_pil_image), ImageMedia(Image.new("L", (10, 10)))], mode="L")
+        assert batch.shape == (2, 10, 10, 1)
+
+    def test_sizes_must_match(self, sample_pil_image):
+        with pytest.raises(ValueError):
+            stack_images([ImageMedia(sample_pil_image), ImageMedia(Image.new("RGB", (4, 4)))])
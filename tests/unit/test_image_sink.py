@@ -0,0 +1,126 @@
+import io
+import threading
+import pytest
+from PIL import Image
+
+from polymage.media.image_media import ImageMedia
+from polymage.media import image_sink
+from polymage.media.image_sink import ImageSink, SaveOptions, encode_image, write_image
+
+
+@pytest.fixture
+def media():
+    return ImageMedia(Image.new("RGB", (16, 16), "red"), {"Software": "dummy/model", "Description": "a red square", "seed": "42"})
+
+
+@pytest.fixture
+def png_bytes():
+    buffer = io.BytesIO()
+    Image.new("RGB", (16, 16), "blue").save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+class TestSaveOptions:
+
+    def test_format_of_the_extension(self):
+        assert SaveOptions().format_of("image.webp") == "WEBP"
+        assert SaveOptions().format_of("image.unknown") == "PNG"
+        assert SaveOptions(format="jpg").format_of("image.png") == "JPEG"
+
+    def test_invalid_options(self):
+        with pytest.raises(ValueError):
+            SaveOptions(format="GIF")
+        with pytest.raises(ValueError):
+            SaveOptions(png_compress_level=10)
+
+
+class TestEncodeImage:
+
+    def test_png_metadata(self, media):
+        encoded = encode_image(media.image(), None, media._metadata, "PNG", SaveOptions())
+        image = Image.open(io.BytesIO(encoded))
+        assert image.info["Description"] == "a red square"
+        assert image.info["seed"] == "42"
+
+    @pytest.mark.parametrize("format", ["JPEG", "WEBP"])
+    def test_exif_metadata(self, media, format):
+        encoded = encode_image(media.image(), None, media._metadata, format, SaveOptions())
+        exif = Image.open(io.BytesIO(encoded)).getexif()
+        assert exif[0x0131] == "dummy/model"
+        assert exif[0x010E] == "a red square"
+        assert b'"seed": "42"' in exif.get_ifd(0x8769)[0x9286]
+
+    def test_original_is_kept(self, png_bytes):
+        assert encode_image(png_bytes, "PNG", None, "PNG", SaveOptions()) is png_bytes
+        encoded = encode_image(png_bytes, "PNG", {"title": "Test"}, "PNG", SaveOptions())
+        assert Image.open(io.BytesIO(encoded)).info["title"] == "Test"
+
+    def test_rgba_to_jpeg(self):
+        encoded = encode_image(Image.new("RGBA", (4, 4)), None, None, "JPEG", SaveOptions())
+        assert Image.open(io.BytesIO(encoded)).mode == "RGB"
+
+
+class TestImageSink:
+
+    def test_writes_the_images(self, media, tmp_path):
+        with ImageSink() as sink:
+            futures = [sink.submit(media, tmp_path / f"{index}.webp") for index in range(4)]
+        assert all(future.done() for future in futures)
+        assert Image.open(tmp_path / "3.webp").format == "WEBP"
+        stats = sink.stats()
+        assert stats.written == 4
+        assert stats.pending == 0
+        assert stats.bytes_written == sum(future.result() for future in futures)
+        # no temporary file left
+        assert sorted(path.name for path in tmp_path.iterdir()) == ["0.webp", "1.webp", "2.webp", "3.webp"]
+
+    def test_queue_is_bounded(self, media, tmp_path, monkeypatch):
+        release = threading.Event()
+        started = threading.Semaphore(0)
+
+        def slow_write(*args):
+            started.release()
+            release.wait()
+            return 0
+
+        monkeypatch.setattr(image_sink, "_write", slow_write)
+        sink = ImageSink(max_workers=1, max_queue=1)
+        sink.submit(media, tmp_path / "0.png")
+        started.acquire()
+        blocked = threading.Thread(target=sink.submit, args=(media, tmp_path / "1.png"))
+        blocked.start()
+        blocked.join(0.1)
+        # the second image waits for a free slot
+        assert blocked.is_alive()
+        release.set()
+        blocked.join(1)
+        assert not blocked.is_alive()
+        sink.close()
+        assert sink.stats().written == 2
+
+    def test_flush_raises_the_errors(self, media, tmp_path):
+        sink = ImageSink()
+        sink.submit(media, tmp_path / "missing" / "image.png")
+        with pytest.raises(FileNotFoundError):
+            sink.flush()
+        assert sink.stats().failed == 1
+        # the errors are only raised once
+        sink.flush()
+        sink.close()
+
+    def test_closed_sink(self, media, tmp_path):
+        sink = ImageSink()
+        sink.close()
+        with pytest.raises(RuntimeError):
+            sink.submit(media, tmp_path / "image.png")
+
+    def test_process_pool(self, media, png_bytes, tmp_path):
+        with ImageSink(processes=True, max_workers=1) as sink:
+            sink.submit(media, tmp_path / "pixels.jpg")
+            sink.submit(ImageMedia(png_bytes), tmp_path / "encoded.png")
+        assert (tmp_path / "encoded.png").read_bytes() == png_bytes
+        assert Image.open(tmp_path / "pixels.jpg").format == "JPEG"
+
+    def test_write_image(self, media, tmp_path):
+        assert write_image(media, tmp_path / "image.png", SaveOptions(png_compress_level=9)) > 0
+        assert Image.open(tmp_path / "image.png").info["Software"] == "dummy/model"
@@ -1,4 +1,5 @@
 import pytest
+import asyncio
 from unittest.mock import MagicMock, patch
 from pydantic import BaseModel
 from typing import List
@@ -124,4 +125,33 @@ class TestInstructAgent:
             system_prompt="You are a helpful assistant",
             temperature=0.7,
             top_p=1.0
-        )
\ No newline at end of file
+        )
+
+    def test_arun_calls_platform_atext2text(self, default_agent, mock_platform):
+        """Tests that arun() awaits the platform's async text2text with the same arguments as run()."""
+        mock_platform.atext2text.return_value = "Async Response"
+
+        result = asyncio.run(default_agent.arun(prompt="Hello", temperature=0.2))
+
+        mock_platform.atext2text.assert_awaited_once_with(
+            model="test-model",
+            prompt="Hello",
+            media=None,
+            response_model=None,
+            system_prompt="You are a helpful assistant",
+            temperature=0.2
+        )
+        assert result == "Async Response"
+
+    def test_run_stream(self, default_agent, mock_platform):
+        """Tests that stream=True is forwarded to the platform."""
+        default_agent.run(prompt="Tell me a story", stream=True)
+
+        mock_platform.text2text.assert_called_once_with(
+            model="test-model",
+            prompt="Tell me a story",
+            media=None,
+            response_model=None,
+            system_prompt="You are a helpful assistant",
+            stream=True
+        )
@@ -0,0 +1,74 @@
+import json
+import base64
+import asyncio
+import pytest
+
+from polymage.utils.json_stream import JsonBase64Decoder, decode_json_base64, adecode_json_base64
+
+
+def _chunks(data, size):
+    return [data[start:start + size] for start in range(0, len(data), size)]
+
+
+@pytest.fixture
+def payload():
+    return bytes(range(256)) * 40
+
+
+@pytest.fixture
+def document(payload):
+    return {
+        "images": [base64.b64encode(payload).decode("ascii"), base64.b64encode(b"second").decode("ascii")],
+        "parameters": {"prompt": "a \"quoted\" \\ prompt, with [brackets] {braces}", "steps": 4, "images": ["not base64"]},
+        "info": None,
+    }
+
+
+class TestJsonBase64Decoder:
+
+    @pytest.mark.parametrize("size", [1, 2, 3, 7, 64, 100000])
+    def test_any_chunk_size(self, payload, document, size):
+        body = json.dumps(document).encode("utf-8")
+        parsed, images = decode_json_base64(_chunks(body, size), [("images", None)])
+        assert images == [payload, b"second"]
+        assert parsed["images"] == [None, None]
+        assert parsed["parameters"] == document["parameters"]
+
+    def test_nested_path(self, payload):
+        body = json.dumps({"result": {"image": base64.b64encode(payload).decode("ascii")}, "success": True}).encode("utf-8")
+        parsed, images = decode_json_base64(_chunks(body, 10), [("result", "image")])
+        assert images == [payload]
+        assert parsed == {"result": {"image": None}, "success": True}
+
+    def test_escaped_slashes_and_line_breaks(self, payload):
+        encoded = base64.encodebytes(payload).decode("ascii")
+        body = json.dumps({"image": encoded}).replace("/", "\\/").encode("utf-8")
+        _, images = decode_json_base64(_chunks(body, 5), [("image",)])
+        assert images == [payload]
+
+    def test_unpadded_base64(self):
+        body = b'{"image": "' + base64.b64encode(b"abcd").rstrip(b"=") + b'"}'
+        _, images = decode_json_base64([body], [("image",)])
+        assert images == [b"abcd"]
+
+    def test_unicode_keys(self):
+        body = json.dumps({"clé": "aGVsbG8="}).encode("utf-8")
+        _, images = decode_json_base64(_chunks(body, 1), [("clé",)])
+        assert images == [b"hello"]
+
+    def test_truncated_document(self, document):
+        body = json.dumps(document).encode("utf-8")
+        decoder = JsonBase64Decoder([("images", None)])
+        decoder.feed(body[:-20])
+        with pytest.raises(ValueError):
+            decoder.close()
+
+    def test_async(self, payload, document):
+        body = json.dumps(document).encode("utf-8")
+
+        async def chunks():
+            for chunk in _chunks(body, 1000):
+                yield chunk
+
+        _, images = asyncio.run(adecode_json_base64(chunks(), [("images", 0)]))
+        assert images == [payload]
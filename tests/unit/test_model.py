@@ -0,0 +1,98 @@
+import copy
+import json
+import pickle
+import pytest
+
+from polymage.registry import ModelRegistry
+from polymage.model.model import Model
+from polymage.utils.frozen_dict import FrozenDict
+
+
+@pytest.fixture
+def model():
+    return Model(name="flux", internal_name="flux.ckpt", capabilities=["text2image"],
+                 default_params={"steps": 8, "loras": [{"file": "lora.ckpt", "weight": 1}]},
+                 platform_params={"upload_encoding": {"max_long_edge": 1024}})
+
+
+class TestModel:
+
+    def test_attributes_are_immutable(self, model):
+        with pytest.raises(AttributeError):
+            model._name = "other"
+        with pytest.raises(AttributeError):
+            model.extra = 1
+
+    def test_params_are_read_only(self, model):
+        with pytest.raises(TypeError):
+            model.default_params()["steps"] = 4
+        with pytest.raises(TypeError):
+            model.default_params()["loras"][0]["weight"] = 2
+        with pytest.raises(AttributeError):
+            model.default_params()["loras"].append({})
+        assert isinstance(model.platform_params()["upload_encoding"], FrozenDict)
+
+    def test_copy_is_modifiable(self, model):
+        """copy() gives a plain dict, like dict.copy(), copy.copy() shares the read-only dict."""
+        params = model.default_params().copy()
+        params["steps"] = 4
+        assert type(params) is dict
+        assert copy.copy(model.default_params()) is model.default_params()
+
+    def test_params_overlay(self, model):
+        params = model.params(steps=4, prompt="a cat")
+        params["seed"] = 1
+        assert params == {"steps": 4, "loras": model.default_params()["loras"], "prompt": "a cat", "seed": 1}
+        assert model.default_params()["steps"] == 8
+        assert json.loads(json.dumps(params))["loras"] == [{"file": "lora.ckpt", "weight": 1}]
+
+    def test_copies_are_the_model(self, model):
+        assert copy.copy(model) is model
+        assert copy.deepcopy(model) is model
+
+    def test_pickle(self, model):
+        restored = pickle.loads(pickle.dumps(model))
+        assert restored.internal_name() == "flux.ckpt"
+        assert restored.default_params() == model.default_params()
+
+    def test_replace(self, model):
+        faster = model.replace(default_params={**model.default_params(), "steps": 4})
+        assert faster.default_params()["steps"] == 4
+        assert faster.internal_name() == "flux.ckpt"
+        assert model.default_params()["steps"] == 8
+        with pytest.raises(TypeError):
+            model.replace(size=1)
+
+
+class TestModelRegistryLookup:
+
+    def test_lookup_shares_the_registered_model(self, model):
+        ModelRegistry.register("Shared-Model", "drawthings", model)
+        found = ModelRegistry.getModelByName("shared-model", "drawthings")
+        assert found is ModelRegistry.getModelByName("shared-model", "drawthings")
+        assert found.name() == "shared-model"
+        assert model.name() == "flux"
+
+
+class TestModelParamsSchema:
+
+    @pytest.fixture
+    def model(self):
+        return Model(name="flux", internal_name="flux.ckpt", default_params={"steps": 8, "guidance_scale": 2.0, "hires_fix": False},
+                     platform_params={"params_schema": {"steps": {"ge": 1, "le": 50}, "width": {"type": "int", "multiple_of": 64},
+                                                        "sampler": {"choices": ["Euler A", "DPM++ 2M"]}}})
+
+    def test_overrides_are_coerced_to_the_default_types(self, model):
+        assert model.validate_params({"steps": "4", "guidance_scale": 3}) == {"steps": 4, "guidance_scale": 3.0}
+
+    def test_unknown_parameters_are_passed_as_is(self, model):
+        marker = object()
+        assert model.validate_params({"system_prompt": marker})["system_prompt"] is marker
+
+    @pytest.mark.parametrize("params", [{"steps": 0}, {"steps": "many"}, {"width": 100}, {"sampler": "DDIM"}, {"hires_fix": "maybe"}])
+    def test_invalid_parameters(self, model, params):
+        with pytest.raises(ValueError, match="flux"):
+            model.validate_params(params)
+
+    def test_schema_is_compiled_once(self, model):
+        assert model.params_schema() is model.params_schema()
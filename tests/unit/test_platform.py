@@ -0,0 +1,579 @@
+import pytest
+import asyncio
+import threading
+import httpx
+from PIL import Image
+from unittest.mock import MagicMock
+
+from polymage.registry import ModelRegistry
+from polymage.model.model import Model
+from polymage.platform.platform import Platform
+from polymage.platform.togetherai import TogetherAiPlatform
+from polymage.platform.text_stream import TextStream
+from polymage.cache.response_cache import ResponseCache
+from polymage.platform.rate_limiter import RateLimiter
+from polymage.platform.retry_policy import RetryPolicy, CircuitBreaker, CircuitOpenError
+from polymage.media.image_media import ImageMedia
+
+
+class DummyPlatform(Platform):
+    """Concrete platform, used to test the behaviour of the Platform base class."""
+
+    def __init__(self, **kwargs):
+        super().__init__('dummy', **kwargs)
+
+    def _text2text(self, model, prompt, media=None, response_model=None, **kwargs):
+        return f"text:{prompt}"
+
+    def _text2data(self, model, prompt, response_model, media=None, **kwargs):
+        return {"prompt": prompt}
+
+    def _text2image(self, model, prompt, **kwargs):
+        return None
+
+    def _image2text(self, model, prompt, media, **kwargs):
+        return f"caption:{prompt}"
+
+    def _image2image(self, model, prompt, media, **kwargs):
+        return None
+
+
+@pytest.fixture(autouse=True)
+def dummy_model():
+    """Registers a model served by the dummy platform."""
+    ModelRegistry.register("dummy-model", "dummy", Model(
+        internal_name="dummy/model",
+        capabilities=["text2text", "text2data", "image2text"],
+        default_params={},
+    ))
+
+
+@pytest.fixture
+def platform():
+    return DummyPlatform(pool_size=4, idle_timeout=5.0)
+
+
+class TestPlatformClients:
+
+    def test_get_client_is_created_once(self, platform):
+        """The factory is only called on first use, then the client is reused."""
+        factory = MagicMock(side_effect=lambda: object())
+        first = platform._get_client("sdk", factory)
+        second = platform._get_client("sdk", factory)
+        assert first is second
+        factory.assert_called_once()
+
+    def test_get_client_is_thread_safe(self, platform):
+        """Concurrent first calls must share the same client."""
+        factory = MagicMock(side_effect=lambda: object())
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(platform._get_client("sdk", factory))) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert factory.call_count == 1
+        assert all(client is results[0] for client in results)
+
+    def test_http_client_pool_options(self, platform):
+        """The shared HTTP client uses the configured pool settings."""
+        options = platform._http_client_options()
+        assert options["limits"].max_connections == 4
+        assert options["limits"].keepalive_expiry == 5.0
+        assert platform._http_client() is platform._http_client()
+
+    def test_close_closes_all_clients(self, platform):
+        """close() closes every client and the next call creates a new one."""
+        client = MagicMock()
+        platform._get_client("sdk", lambda: client)
+        platform.close()
+        client.close.assert_called_once()
+        assert platform._get_client("sdk", lambda: "new") == "new"
+
+    def test_context_manager(self):
+        """Leaving the with block closes the clients."""
+        client = MagicMock()
+        with DummyPlatform() as platform:
+            platform._get_client("sdk", lambda: client)
+        client.close.assert_called_once()
+
+
+class TestPlatformAsync:
+
+    def test_atext2text_defaults_to_sync_implementation(self, platform):
+        """Platforms without an async client run the sync implementation in a thread."""
+        result = asyncio.run(platform.atext2text(model="dummy-model", prompt="hello"))
+        assert result == "text:hello"
+
+    def test_atext2text_structured_output(self, platform):
+        """A response_model routes the async call to the text2data implementation."""
+        result = asyncio.run(platform.atext2text(model="dummy-model", prompt="hello", response_model=MagicMock()))
+        assert result == {"prompt": "hello"}
+
+    def test_aimage2text_empty_media(self, platform):
+        """The async path shares the validation of the sync path."""
+        with pytest.raises(ValueError):
+            asyncio.run(platform.aimage2text(model="dummy-model", prompt="describe", media=[]))
+
+    def test_async_client_is_bound_to_event_loop(self, platform):
+        """An async client is reused inside a loop, and recreated for a new loop."""
+        async def get_twice():
+            first = platform._get_async_client("sdk", object)
+            second = platform._get_async_client("sdk", object)
+            return first, second
+
+        first, second = asyncio.run(get_twice())
+        assert first is second
+        other, _ = asyncio.run(get_twice())
+        assert other is not first
+
+    def test_stale_async_client_is_closed_on_its_loop(self, platform):
+        """A client replaced for a new loop is closed on the loop it belongs to, while that loop runs."""
+        other_loop = asyncio.new_event_loop()
+        thread = threading.Thread(target=other_loop.run_forever, daemon=True)
+        thread.start()
+        closed_on = []
+
+        class Client:
+            async def aclose(self):
+                closed_on.append(asyncio.get_running_loop())
+
+        async def get():
+            return platform._get_async_client("sdk", Client)
+
+        try:
+            stale = asyncio.run_coroutine_threadsafe(get(), other_loop).result(timeout=1)
+            assert asyncio.run(get()) is not stale
+            asyncio.run_coroutine_threadsafe(asyncio.sleep(0), other_loop).result(timeout=1)
+            assert closed_on == [other_loop]
+        finally:
+            other_loop.call_soon_threadsafe(other_loop.stop)
+            thread.join()
+            other_loop.close()
+
+    def test_aclose(self, platform):
+        """aclose() closes the async clients as well as the sync ones."""
+        async_client = MagicMock()
+        async_client.aclose = MagicMock(return_value=asyncio.sleep(0))
+        sync_client = MagicMock()
+
+        async def run():
+            platform._get_async_client("sdk", lambda: async_client)
+            platform._get_client("sdk", lambda: sync_client)
+            await platform.aclose()
+
+        asyncio.run(run())
+        async_client.aclose.assert_called_once()
+        sync_client.close.assert_called_once()
+
+
+class TestPlatformStream:
+
+    def test_stream_defaults_to_single_delta(self, platform):
+        """Platforms without streaming support return the whole completion as one delta."""
+        stream = platform.text2text(model="dummy-model", prompt="hello", stream=True)
+        assert list(stream) == ["text:hello"]
+        assert stream.text() == "text:hello"
+        assert stream.stats.tokens == 1
+        assert stream.stats.ttft is not None
+
+    def test_stream_with_response_model(self, platform):
+        """Structured output can't be streamed."""
+        with pytest.raises(ValueError):
+            platform.text2text(model="dummy-model", prompt="hello", response_model=MagicMock(), stream=True)
+
+    def test_async_stream(self, platform):
+        """atext2text(stream=True) returns an async iterator of deltas."""
+        async def run():
+            stream = await platform.atext2text(model="dummy-model", prompt="hello", stream=True)
+            return [delta async for delta in stream], stream
+
+        deltas, stream = asyncio.run(run())
+        assert deltas == ["text:hello"]
+        assert stream.stats.tokens == 1
+
+    def test_stream_open_is_retried(self):
+        """A failure before the first delta is retried, a failure after it is raised."""
+        platform = DummyPlatform(retry_policy=RetryPolicy(initial_wait=0))
+        opened = []
+
+        def text2text_stream(model, prompt, media=None, **kwargs):
+            opened.append(prompt)
+            if len(opened) == 1:
+                raise httpx.ConnectError("refused")
+            yield "a"
+            raise httpx.ReadTimeout("timeout")
+
+        platform._text2text_stream = text2text_stream
+        stream = platform.text2text(model="dummy-model", prompt="hello", stream=True)
+        assert next(stream) == "a"
+        with pytest.raises(httpx.ReadTimeout):
+            next(stream)
+        assert len(opened) == 2
+
+    def test_async_stream_open_is_retried(self):
+        platform = DummyPlatform(retry_policy=RetryPolicy(initial_wait=0))
+        opened = []
+
+        async def atext2text_stream(model, prompt, media=None, **kwargs):
+            opened.append(prompt)
+            if len(opened) == 1:
+                raise httpx.ConnectError("refused")
+            yield "a"
+            yield "b"
+
+        async def run():
+            platform._atext2text_stream = atext2text_stream
+            stream = await platform.atext2text(model="dummy-model", prompt="hello", stream=True)
+            return [delta async for delta in stream]
+
+        assert asyncio.run(run()) == ["a", "b"]
+        assert len(opened) == 2
+
+
+class TestPlatformCache:
+
+    def test_repeated_call_is_served_from_cache(self):
+        cache = ResponseCache()
+        platform = DummyPlatform(cache=cache)
+        platform._text2text = MagicMock(return_value="answer")
+
+        assert platform.text2text(model="dummy-model", prompt="hello") == "answer"
+        assert platform.text2text(model="dummy-model", prompt="hello") == "answer"
+        platform._text2text.assert_called_once()
+        assert cache.stats().hits == 1
+
+    def test_parameters_are_part_of_the_key(self):
+        platform = DummyPlatform(cache=ResponseCache())
+        platform._text2text = MagicMock(side_effect=["cold", "hot"])
+
+        assert platform.text2text(model="dummy-model", prompt="hello", temperature=0.1) == "cold"
+        assert platform.text2text(model="dummy-model", prompt="hello", temperature=0.9) == "hot"
+
+    def test_random_seed_bypasses_the_cache(self):
+        cache = ResponseCache()
+        platform = DummyPlatform(cache=cache)
+        platform._text2text = MagicMock(return_value="answer")
+
+        platform.text2text(model="dummy-model", prompt="hello", seed=-1)
+        platform.text2text(model="dummy-model", prompt="hello", seed=-1)
+        assert platform._text2text.call_count == 2
+        assert cache.stats().bypassed == 2
+
+    def test_async_call_shares_the_cache(self):
+        platform = DummyPlatform(cache=ResponseCache())
+        platform.text2text(model="dummy-model", prompt="hello")
+        platform._atext2text = MagicMock(side_effect=AssertionError("should be cached"))
+        assert asyncio.run(platform.atext2text(model="dummy-model", prompt="hello")) == "text:hello"
+
+
+class TestPlatformCoalesce:
+
+    def test_identical_calls_share_one_request(self):
+        platform = DummyPlatform(coalesce=True)
+        calls = []
+
+        async def atext2text(model, prompt, **kwargs):
+            calls.append(prompt)
+            await asyncio.sleep(0.01)
+            return {"prompt": prompt}
+
+        platform._atext2text = atext2text
+
+        async def main():
+            return await asyncio.gather(*[platform.atext2text(model="dummy-model", prompt="hello") for _ in range(4)])
+
+        results = asyncio.run(main())
+        assert calls == ["hello"]
+        assert results == [{"prompt": "hello"}] * 4
+        # every caller gets its own copy of the shared result
+        assert len({id(r) for r in results}) == 4
+
+    def test_coalescing_is_off_by_default(self, platform):
+        assert platform._request_key("text2text", ModelRegistry.getModelByName("dummy-model", "dummy"), "hello") is None
+
+
+class TestPlatformRateLimit:
+
+    def test_calls_acquire_the_limiter(self):
+        limiter = MagicMock(spec=RateLimiter)
+        platform = DummyPlatform(rate_limiter=limiter)
+        platform.text2text(model="dummy-model", prompt="x" * 40, max_tokens=100)
+        limiter.acquire.assert_called_once_with(110)
+
+    def test_cache_hits_are_not_limited(self):
+        limiter = MagicMock(spec=RateLimiter)
+        platform = DummyPlatform(rate_limiter=limiter, cache=ResponseCache())
+        platform.text2text(model="dummy-model", prompt="hello")
+        platform.text2text(model="dummy-model", prompt="hello")
+        limiter.acquire.assert_called_once()
+
+    def test_http_clients_report_the_rate_limit_headers(self, platform):
+        transport = httpx.MockTransport(lambda request: httpx.Response(429, headers={"retry-after": "1"}))
+        client = httpx.Client(transport=transport, **platform._http_client_options())
+        client.get("http://localhost/")
+        assert platform._rate_limiter.stats().rate_limited == 1
+
+    def test_429_is_observed_once(self, platform):
+        """The response hook and the error of the call see the same response."""
+        transport = httpx.MockTransport(lambda request: httpx.Response(429, headers={"retry-after": "0"}))
+        client = httpx.Client(transport=transport, **platform._http_client_options())
+
+        def call():
+            client.get("http://localhost/").raise_for_status()
+
+        with pytest.raises(httpx.HTTPStatusError):
+            platform._attempt(call, 0)
+        assert platform._rate_limiter.stats().rate_limited == 1
+
+
+class TestPlatformRetry:
+
+    def test_transient_errors_are_retried(self):
+        platform = DummyPlatform(retry_policy=RetryPolicy(initial_wait=0))
+        platform._text2text = MagicMock(side_effect=[httpx.ConnectError("refused"), "answer"])
+        assert platform.text2text(model="dummy-model", prompt="hello") == "answer"
+        assert platform._text2text.call_count == 2
+
+    def test_async_transient_errors_are_retried(self):
+        platform = DummyPlatform(retry_policy=RetryPolicy(initial_wait=0))
+        outcomes = [httpx.ReadTimeout("timeout"), "answer"]
+
+        async def atext2text(model, prompt, **kwargs):
+            outcome = outcomes.pop(0)
+            if isinstance(outcome, Exception):
+                raise outcome
+            return outcome
+
+        platform._atext2text = atext2text
+        assert asyncio.run(platform.atext2text(model="dummy-model", prompt="hello")) == "answer"
+
+    def test_permanent_errors_are_not_retried(self):
+        platform = DummyPlatform(retry_policy=RetryPolicy(initial_wait=0))
+        platform._text2text = MagicMock(side_effect=ValueError("bad request"))
+        with pytest.raises(ValueError):
+            platform.text2text(model="dummy-model", prompt="hello")
+        platform._text2text.assert_called_once()
+
+    def test_circuit_breaker_fails_fast(self):
+        """Once the backend is considered down, the calls don't reach it anymore."""
+        platform = DummyPlatform(
+            retry_policy=RetryPolicy(max_attempts=5, initial_wait=0),
+            circuit_breaker=CircuitBreaker("dummy", failure_threshold=2, recovery_timeout=60),
+        )
+        platform._text2text = MagicMock(side_effect=httpx.ConnectError("refused"))
+        with pytest.raises(CircuitOpenError):
+            platform.text2text(model="dummy-model", prompt="hello")
+        with pytest.raises(CircuitOpenError):
+            platform.text2text(model="dummy-model", prompt="hello")
+        assert platform._text2text.call_count == 2
+
+
+class TestPlatformUpload:
+
+    def test_original_encoding_is_sent_without_policy(self, platform):
+        """The data URL carries the real MIME type of the image."""
+        image = ImageMedia(Image.new("RGB", (16, 16)))
+        jpeg = ImageMedia(image.to_bytes("JPEG"))
+        model = Model(internal_name="m", platform_params={})
+        url = platform._image_data_url(model, jpeg)
+        assert url == f"data:image/jpeg;base64,{jpeg.to_base64(format=None)}"
+        assert platform.upload_stats().images == 1
+
+    def test_unaccepted_original_is_sent_as_png(self, platform):
+        """The vision APIs reject TIFF, BMP..."""
+        image = ImageMedia(Image.new("RGB", (16, 16), "red"))
+        tiff = ImageMedia(image.to_bytes("TIFF"))
+        model = Model(internal_name="m", platform_params={})
+        url = platform._image_data_url(model, tiff)
+        assert url.startswith("data:image/png;base64,")
+        assert ImageMedia(url.split(",", 1)[1]).format() == "PNG"
+
+    def test_policy_downscales_the_upload(self, platform):
+        image = ImageMedia(Image.effect_noise((512, 256), 64).convert("RGB"))
+        model = Model(internal_name="m", platform_params={"upload_encoding": {"max_long_edge": 128}})
+        url = platform._image_data_url(model, image)
+        assert url.startswith("data:image/jpeg;base64,")
+        sent = ImageMedia(url.split(",", 1)[1])
+        assert sent.size() == (128, 64)
+        stats = platform.upload_stats()
+        assert stats.bytes_saved > 0
+        assert stats.bytes_sent == len(sent.to_bytes(format=None))
+
+    def test_retries_do_not_encode_again(self):
+        """The request is built by the first attempt, the retry sends the same data URLs."""
+        ModelRegistry.register("together-vision", "togetherai", Model(
+            internal_name="together/vision", capabilities=["image2text"], default_params={},
+        ))
+        platform = TogetherAiPlatform(api_key="key", retry_policy=RetryPolicy(initial_wait=0))
+        client = MagicMock()
+        answer = MagicMock()
+        answer.choices[0].message.content = "a red square"
+        client.chat.completions.create.side_effect = [httpx.ConnectError("refused"), answer]
+        platform._client = lambda: client
+        image = ImageMedia(Image.new("RGB", (16, 16), "red"))
+        assert platform.image2text(model="together-vision", prompt="describe", media=[image]) == "a red square"
+        first, second = client.chat.completions.create.call_args_list
+        assert first.kwargs == second.kwargs
+        assert platform.upload_stats().images == 1
+
+
+class TestChatParams:
+
+    @pytest.fixture
+    def together(self):
+        ModelRegistry.register("together-chat", "togetherai", Model(
+            internal_name="together/chat", capabilities=["text2text", "text2data"], default_params={"top_p": 0.9},
+        ))
+        platform = TogetherAiPlatform(api_key="key")
+        client = MagicMock()
+        client.chat.completions.create.return_value.choices[0].message.content = "answer"
+        platform._client = lambda: client
+        return platform, client
+
+    def test_params_are_sent(self, together):
+        """The model defaults and the call kwargs go in the body, the system prompt is a message."""
+        platform, client = together
+        platform.text2text(model="together-chat", prompt="hello", system_prompt="be brief", temperature=0.2, max_tokens=64)
+        request = client.chat.completions.create.call_args.kwargs
+        assert (request["temperature"], request["max_tokens"], request["top_p"]) == (0.2, 64, 0.9)
+        assert "system_prompt" not in request
+        assert request["messages"][0] == {"role": "system", "content": "be brief"}
+
+    def test_platform_defaults(self, together):
+        platform, client = together
+        platform.text2text(model="together-chat", prompt="hello", seed=-1)
+        request = client.chat.completions.create.call_args.kwargs
+        assert request["temperature"] == 0.8
+        assert "seed" not in request
+
+
+class TestPlatformMultiImage:
+
+    @pytest.fixture
+    def images(self):
+        return [ImageMedia(Image.new("RGB", (8, 8), color)) for color in ("red", "green", "blue", "white", "black")]
+
+    def register(self, platform_params=None):
+        ModelRegistry.register("vision-model", "dummy", Model(
+            internal_name="dummy/vision",
+            capabilities=["image2text"],
+            default_params={},
+            platform_params=platform_params or {},
+        ))
+
+    def test_all_images_in_one_request(self, platform, images):
+        self.register({"multi_image": True})
+        platform._image2text = MagicMock(return_value="caption")
+        assert platform.image2text(model="vision-model", prompt="compare", media=images) == "caption"
+        assert platform._image2text.call_args.kwargs["media"] == images
+
+    def test_chunked_when_the_limit_is_exceeded(self, platform, images):
+        self.register({"multi_image": True, "max_images": 2})
+        platform._image2text = MagicMock(side_effect=["a", "b", "c"])
+        assert platform.image2text(model="vision-model", prompt="compare", media=images) == "a\n\nb\n\nc"
+        assert [len(call.kwargs["media"]) for call in platform._image2text.call_args_list] == [2, 2, 1]
+
+    def test_single_image_models_get_one_request_per_image(self, platform, images):
+        self.register()
+        platform._image2text = MagicMock(return_value="caption")
+        platform.image2text(model="vision-model", prompt="describe", media=images[:3])
+        assert platform._image2text.call_count == 3
+
+    def test_async_chunks(self, platform, images):
+        self.register({"multi_image": True, "max_images": 3})
+
+        async def aimage2text(model, prompt, media, **kwargs):
+            return str(len(media))
+
+        platform._aimage2text = aimage2text
+        assert asyncio.run(platform.aimage2text(model="vision-model", prompt="compare", media=images)) == "3\n\n2"
+
+    def test_data_urls_keep_the_order(self, platform, images):
+        model = Model(internal_name="m", platform_params={})
+        urls = platform._image_data_urls(model, images)
+        assert urls == [platform._image_data_url(model, image) for image in images]
+        platform.close()
+        assert platform._encoding_executor is None
+
+
+class TestTextStream:
+
+    def test_stats(self):
+        """Empty deltas are skipped, and the tokens/sec are measured after the first token."""
+        stream = TextStream(iter(["a", "", "b", "c"]))
+        assert list(stream) == ["a", "b", "c"]
+        assert stream.stats.tokens == 3
+        assert stream.stats.duration >= stream.stats.ttft
+        assert stream.stats.tokens_per_second >= 0
+
+    def test_close(self):
+        """Closing the stream closes the underlying generator."""
+        closed = []
+
+        def deltas():
+            try:
+                yield "a"
+                yield "b"
+            finally:
+                closed.append(True)
+
+        stream = TextStream(deltas())
+        next(stream)
+        stream.close()
+        assert closed == [True]
+
+
+class TestPlatformText2Images:
+
+    def test_one_call_per_image_with_incremented_seeds(self, platform):
+        platform._text2image = MagicMock(side_effect=lambda model, prompt, **kwargs: kwargs["seed"])
+
+        assert platform.text2images(model="dummy-model", prompt="a cat", count=3, seed=10) == [10, 11, 12]
+
+    def test_random_seed_stays_random(self, platform):
+        platform._text2image = MagicMock(return_value="image")
+
+        assert platform.text2images(model="dummy-model", prompt="a cat", count=2) == ["image", "image"]
+        assert all("seed" not in call.kwargs for call in platform._text2image.call_args_list)
+
+    def test_async_version(self, platform):
+        platform._text2image = MagicMock(side_effect=lambda model, prompt, **kwargs: kwargs["seed"])
+
+        assert asyncio.run(platform.atext2images(model="dummy-model", prompt="a cat", count=2, seed=5)) == [5, 6]
+
+    def test_count_must_be_positive(self, platform):
+        with pytest.raises(ValueError):
+            platform.text2images(model="dummy-model", prompt="a cat", count=0)
+
+
+class TestPlatformParams:
+
+    @pytest.fixture
+    def image_model(self):
+        ModelRegistry.register("layered-model", "dummy", Model(
+            internal_name="layered", capabilities=["text2image"], default_params={"steps": 20, "seed": 1},
+        ))
+
+    def test_layers_override_the_model_defaults(self, image_model):
+        platform = DummyPlatform(default_params={"steps": 8, "sampler": "euler"})
+        platform._text2image = MagicMock(return_value="image")
+
+        platform.text2image(model="layered-model", prompt="a cat", steps="4")
+        model, prompt = platform._text2image.call_args.args
+        assert platform._text2image.call_args.kwargs == {"steps": 4, "sampler": "euler"}
+        assert model.params(**platform._text2image.call_args.kwargs) == {"steps": 4, "seed": 1, "sampler": "euler"}
+
+    def test_invalid_parameter_fails_before_the_call(self, image_model, platform):
+        platform._text2image = MagicMock()
+        with pytest.raises(ValueError):
+            platform.text2image(model="layered-model", prompt="a cat", steps="many")
+        platform._text2image.assert_not_called()
+
+    def test_overrides_are_part_of_the_cache_key(self, image_model):
+        platform = DummyPlatform(cache=ResponseCache())
+        platform._text2image = MagicMock(side_effect=["preview", "final"])
+
+        assert platform.text2image(model="layered-model", prompt="a cat", steps=4) == "preview"
+        assert platform.text2image(model="layered-model", prompt="a cat", steps=30) == "final"
+        assert platform.text2image(model="layered-model", prompt="a cat", steps="4") == "preview"
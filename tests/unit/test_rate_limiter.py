@@ -0,0 +1,115 @@
+import time
+import asyncio
+import pytest
+import httpx
+
+from polymage.platform.rate_limiter import RateLimiter, TokenBucket, parse_duration, parse_retry_after, parse_reset
+
+
+class TestParsing:
+
+    @pytest.mark.parametrize("value, expected", [
+        ("7", 7.0),
+        ("0.5", 0.5),
+        ("6ms", 0.006),
+        ("1m30.5s", 90.5),
+        ("2h", 7200.0),
+    ])
+    def test_parse_duration(self, value, expected):
+        assert parse_duration(value) == pytest.approx(expected)
+
+    def test_parse_invalid_duration(self):
+        assert parse_duration("soon") is None
+
+    def test_parse_retry_after_http_date(self):
+        assert parse_retry_after("Wed, 21 Oct 2015 07:28:00 GMT") == 0.0
+
+
+class TestTokenBucket:
+
+    def test_reserve(self):
+        bucket = TokenBucket(rate_per_minute=60, capacity=2)
+        assert bucket.reserve(1, now=bucket._updated) == 0.0
+        assert bucket.reserve(1, now=bucket._updated) == 0.0
+        # the bucket is empty, the next token comes in one second
+        assert bucket.reserve(1, now=bucket._updated) == pytest.approx(1.0)
+
+    def test_invalid_rate(self):
+        with pytest.raises(ValueError):
+            TokenBucket(rate_per_minute=0)
+
+
+class TestRateLimiter:
+
+    def test_unlimited_by_default(self):
+        limiter = RateLimiter()
+        assert all(limiter.acquire(tokens=10_000) == 0.0 for _ in range(100))
+
+    def test_requests_per_minute(self):
+        limiter = RateLimiter(requests_per_minute=600, burst=1)
+        limiter.acquire()
+        waited = limiter.acquire()
+        assert waited == pytest.approx(0.1, abs=0.02)
+        assert limiter.stats().throttled == 1
+
+    def test_tokens_per_minute(self):
+        limiter = RateLimiter(tokens_per_minute=6000)
+        assert limiter._reserve(6000) == 0.0
+        assert limiter._reserve(100) == pytest.approx(1.0, abs=0.05)
+
+    def test_retry_after(self):
+        limiter = RateLimiter()
+        limiter.observe({"Retry-After": "2"}, status_code=429)
+        assert limiter._reserve(0) == pytest.approx(2.0, abs=0.05)
+        assert limiter.stats().rate_limited == 1
+
+    def test_429_without_header(self):
+        limiter = RateLimiter()
+        limiter.observe({}, status_code=429)
+        assert limiter._reserve(0) > 0
+
+    def test_exhausted_quota_blocks_until_reset(self):
+        limiter = RateLimiter(requests_per_minute=30)
+        limiter.observe({"x-ratelimit-remaining-requests": "0", "x-ratelimit-reset-requests": "1.5s"}, status_code=200)
+        assert limiter._reserve(0) == pytest.approx(1.5, abs=0.05)
+
+    def test_epoch_reset(self):
+        """Some providers send the reset as an absolute time, in seconds or milliseconds."""
+        assert parse_reset("2s") == 2.0
+        assert parse_reset(str(time.time() + 5)) == pytest.approx(5.0, abs=0.5)
+        assert parse_reset(str((time.time() + 5) * 1000)) == pytest.approx(5.0, abs=0.5)
+        assert parse_reset(str(time.time() - 5)) == 0.0
+
+    def test_block_is_capped(self):
+        limiter = RateLimiter(max_block=10.0)
+        limiter.observe({"x-ratelimit-remaining-requests": "0", "x-ratelimit-reset-requests": "1h"})
+        assert limiter._reserve(0) == pytest.approx(10.0, abs=0.05)
+        limiter = RateLimiter()
+        limiter.observe({"retry-after": "86400"}, status_code=429)
+        assert limiter._reserve(0) == pytest.approx(60.0, abs=0.05)
+        with pytest.raises(ValueError):
+            RateLimiter(max_block=0)
+
+    def test_remaining_clamps_the_bucket(self):
+        """The remaining quota announced by the provider caps the bucket level."""
+        limiter = RateLimiter(tokens_per_minute=6000)
+        limiter.observe({"x-ratelimit-remaining-tokens": "60"})
+        assert limiter._reserve(60) == 0.0
+        assert limiter._reserve(100) == pytest.approx(1.0, abs=0.05)
+
+    def test_observe_error(self):
+        limiter = RateLimiter()
+        request = httpx.Request("POST", "http://localhost/")
+        response = httpx.Response(429, headers={"retry-after": "1"}, request=request)
+        limiter.observe_error(httpx.HTTPStatusError("too many requests", request=request, response=response))
+        assert limiter.stats().rate_limited == 1
+
+    def test_async_acquire(self):
+        limiter = RateLimiter(requests_per_minute=600, burst=1)
+
+        async def main():
+            start = time.perf_counter()
+            await asyncio.gather(*[limiter.aacquire() for _ in range(3)])
+            return time.perf_counter() - start
+
+        assert asyncio.run(main()) == pytest.approx(0.2, abs=0.05)
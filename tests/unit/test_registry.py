@@ -0,0 +1,236 @@
+import json
+import time
+import threading
+import pytest
+
+from polymage import registry
+from polymage.registry import ModelRegistry, ModelEntry
+from polymage.model.model import Model
+
+
+@pytest.fixture(autouse=True)
+def fresh_registry(tmp_path, monkeypatch):
+    """An empty registry, with its snapshot in a temporary directory"""
+    monkeypatch.setenv(registry.CACHE_DIR_ENV, str(tmp_path))
+    saved = {name: getattr(ModelRegistry, name) for name in ("_state", "_parsed", "_registered", "_directories", "_loaded")}
+    ModelRegistry._reset()
+    yield tmp_path
+    ModelRegistry.stop_watching()
+    for name, value in saved.items():
+        setattr(ModelRegistry, name, value)
+
+
+@pytest.fixture
+def parses(monkeypatch):
+    """Count the parsed YAML files"""
+    calls = []
+    parse = registry._parse_model_file
+
+    def counting(content):
+        calls.append(content)
+        return parse(content)
+
+    monkeypatch.setattr(registry, "_parse_model_file", counting)
+    return calls
+
+
+class TestModelRegistryLoading:
+
+    def test_models_are_loaded_on_first_lookup(self):
+        assert not ModelRegistry._loaded
+        model = ModelRegistry.getModelByName("flux-1-schnell", "drawthings")
+        assert model.internal_name() == "flux-1-schnell_q8p.ckpt"
+        assert ModelRegistry._loaded
+
+    def test_snapshot_is_reused(self, fresh_registry, parses):
+        ModelRegistry.get_all_models()
+        assert (fresh_registry / "registry.json").exists()
+        parsed = len(parses)
+        ModelRegistry._reset()
+        models = ModelRegistry.get_all_models()
+        assert len(parses) == parsed
+        assert "flux-1-schnell" in models
+
+    def test_stale_snapshot_is_rebuilt(self, parses, monkeypatch):
+        ModelRegistry.get_all_models()
+        sources = ModelRegistry._model_sources()
+        sources["extra.yaml"] = b"extra-model:\n  capabilities: [text2text]\n  platforms:\n    lmstudio:\n      internal_name: extra\n      default_params: {}\n"
+        monkeypatch.setattr(ModelRegistry, "_model_sources", classmethod(lambda cls: sources))
+        parsed = len(parses)
+        ModelRegistry._reset()
+        assert ModelRegistry.getModelByName("extra-model", "lmstudio").internal_name() == "extra"
+        assert parses[parsed:] == [sources["extra.yaml"]]
+
+    def test_corrupted_snapshot_is_ignored(self, fresh_registry):
+        (fresh_registry / "registry.json").write_bytes(b"not json")
+        assert "flux-1-schnell" in ModelRegistry.get_all_models()
+
+    def test_registered_models_are_kept(self):
+        ModelRegistry.register("flux-1-schnell", "drawthings", Model(internal_name="custom.ckpt", default_params={}))
+        assert ModelRegistry.getModelByName("flux-1-schnell", "drawthings").internal_name() == "custom.ckpt"
+        assert ModelRegistry.getModelByName("flux-1-schnell", "cloudflare") is not None
+
+    def test_snapshot_is_data_only(self, fresh_registry):
+        ModelRegistry.get_all_models()
+        snapshot = json.loads((fresh_registry / "registry.json").read_text())
+        assert snapshot["version"] == registry.SNAPSHOT_VERSION
+        assert "flux-1-schnell" in snapshot["files"]["flux.yaml"]["dicts"]
+
+    def test_unwritable_cache_directory(self, monkeypatch, tmp_path):
+        blocker = tmp_path / "file"
+        blocker.write_text("")
+        monkeypatch.setenv(registry.CACHE_DIR_ENV, str(blocker / "cache"))
+        assert "flux-1-schnell" in ModelRegistry.get_all_models()
+
+    def test_build_snapshot(self, fresh_registry):
+        assert ModelRegistry.build_snapshot() == fresh_registry / "registry.json"
+        assert not ModelRegistry._loaded
+
+
+class TestModelRegistrySnapshot:
+
+    @pytest.fixture
+    def models(self):
+        ModelRegistry.register("vision", "lmstudio", Model(internal_name="qwen-vl", capabilities=["text2text", "image2text"], default_params={}))
+        ModelRegistry.register("vision", "groq", Model(internal_name="qwen-vl", capabilities=["image2text"], default_params={}))
+        ModelRegistry.register("writer", "lmstudio", Model(internal_name="gemma", capabilities=["text2text"], default_params={}))
+
+    def test_capability_and_platform_queries(self, models):
+        snapshot = ModelRegistry.snapshot()
+        assert "vision" in snapshot.names(capability="image2text", platform="lmstudio")
+        assert "writer" not in snapshot.names(capability="image2text", platform="lmstudio")
+        assert {"vision", "writer"} <= set(snapshot.names(platform="lmstudio"))
+        assert all(isinstance(entry, ModelEntry) for entry in snapshot.find(capability="text2text"))
+        assert snapshot.find(capability="unknown") == ()
+
+    def test_internal_name_index(self, models):
+        entries = ModelRegistry.snapshot().by_internal_name("qwen-vl")
+        assert {(entry.name, entry.platform) for entry in entries} == {("vision", "lmstudio"), ("vision", "groq")}
+
+    def test_platforms_of_a_model(self, models):
+        snapshot = ModelRegistry.snapshot()
+        assert set(snapshot.platforms("Vision")) == {"lmstudio", "groq"}
+        assert snapshot.get("vision", "groq").internal_name() == "qwen-vl"
+        assert snapshot.get("vision", "cloudflare") is None
+
+    def test_snapshot_is_rebuilt_after_a_change(self, models):
+        snapshot = ModelRegistry.snapshot()
+        assert ModelRegistry.snapshot() is snapshot
+        ModelRegistry.register("painter", "drawthings", Model(internal_name="flux", capabilities=["text2image"], default_params={}))
+        updated = ModelRegistry.snapshot()
+        assert updated.version > snapshot.version == ModelRegistry.version() - 1
+        assert "painter" in updated.names(capability="text2image")
+        assert "painter" not in snapshot.names(capability="text2image")
+
+
+def _model_file(internal_name, steps=8):
+    return (f"custom-model:\n  capabilities: [text2image]\n  platforms:\n    drawthings:\n"
+            f"      internal_name: {internal_name}\n      default_params:\n        steps: {steps}\n")
+
+
+class TestModelRegistryReload:
+
+    @pytest.fixture
+    def directory(self, tmp_path):
+        directory = tmp_path / "models"
+        directory.mkdir()
+        (directory / "custom.yaml").write_text(_model_file("custom.ckpt"))
+        ModelRegistry.add_directory(directory)
+        return directory
+
+    def test_user_directory_is_loaded(self, directory):
+        assert ModelRegistry.getModelByName("custom-model", "drawthings").internal_name() == "custom.ckpt"
+        assert "flux-1-schnell" in ModelRegistry.get_all_models()
+
+    def test_only_the_changed_files_are_parsed(self, directory, parses):
+        ModelRegistry.snapshot()
+        parsed = len(parses)
+        assert not ModelRegistry.reload()
+
+        (directory / "custom.yaml").write_text(_model_file("custom.ckpt", steps=4))
+        version = ModelRegistry.version()
+        assert ModelRegistry.reload()
+        assert len(parses) == parsed + 1
+        assert ModelRegistry.version() > version
+        assert ModelRegistry.getModelByName("custom-model", "drawthings").default_params()["steps"] == 4
+
+    def test_readers_keep_their_snapshot(self, directory):
+        before = ModelRegistry.snapshot()
+        (directory / "custom.yaml").write_text(_model_file("other.ckpt"))
+        ModelRegistry.reload()
+        assert before.get("custom-model", "drawthings").internal_name() == "custom.ckpt"
+        assert ModelRegistry.snapshot().get("custom-model", "drawthings").internal_name() == "other.ckpt"
+
+    def test_invalid_file_keeps_the_previous_models(self, directory):
+        ModelRegistry.snapshot()
+        (directory / "custom.yaml").write_text("custom-model: [unclosed")
+        assert not ModelRegistry.reload()
+        assert ModelRegistry.getModelByName("custom-model", "drawthings").internal_name() == "custom.ckpt"
+
+    def test_removed_file(self, directory):
+        ModelRegistry.snapshot()
+        (directory / "custom.yaml").unlink()
+        assert ModelRegistry.reload()
+        with pytest.raises(ValueError):
+            ModelRegistry.getModelByName("custom-model", "drawthings")
+
+    def test_registered_models_survive_a_reload(self, directory):
+        ModelRegistry.register("custom-model", "drawthings", Model(internal_name="code.ckpt", default_params={}))
+        (directory / "custom.yaml").write_text(_model_file("other.ckpt"))
+        ModelRegistry.reload()
+        assert ModelRegistry.getModelByName("custom-model", "drawthings").internal_name() == "code.ckpt"
+
+    def test_watch(self, directory):
+        ModelRegistry.snapshot()
+        ModelRegistry.watch(interval=0.01)
+        (directory / "custom.yaml").write_text(_model_file("watched.ckpt"))
+        deadline = time.monotonic() + 5
+        while ModelRegistry.getModelByName("custom-model", "drawthings").internal_name() != "watched.ckpt":
+            assert time.monotonic() < deadline
+            time.sleep(0.01)
+
+    def test_concurrent_register_and_lookup(self):
+        ModelRegistry.snapshot()
+        errors = []
+
+        def writer(index):
+            for count in range(50):
+                ModelRegistry.register(f"model-{index}-{count}", "lmstudio", Model(internal_name="m", default_params={}))
+
+        def reader():
+            try:
+                for _ in range(500):
+                    ModelRegistry.getModelByName("flux-1-schnell", "drawthings")
+                    ModelRegistry.snapshot().find(capability="text2image")
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=writer, args=(index,)) for index in range(4)] + [threading.Thread(target=reader) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert not errors
+        assert len(ModelRegistry.snapshot().names(platform="lmstudio")) >= 200
+
+    def test_first_lookup_during_the_load(self, monkeypatch):
+        publishing = threading.Event()
+
+        class SlowSnapshot(registry.RegistrySnapshot):
+            def __init__(self, version, models):
+                publishing.set()
+                time.sleep(0.05)
+                super().__init__(version, models)
+
+        monkeypatch.setattr(registry, "RegistrySnapshot", SlowSnapshot)
+        results = []
+
+        def reader():
+            publishing.wait(5)
+            results.append(ModelRegistry.getModelByName("flux-1-schnell", "drawthings"))
+
+        thread = threading.Thread(target=reader)
+        thread.start()
+        ModelRegistry.snapshot()
+        thread.join()
+        assert results[0].internal_name() == "flux-1-schnell_q8p.ckpt"
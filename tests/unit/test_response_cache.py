@@ -0,0 +1,112 @@
+import time
+import pytest
+from PIL import Image
+
+from polymage.cache.response_cache import ResponseCache, make_cache_key, media_digest
+from polymage.media.image_media import ImageMedia
+
+
+class TestCacheKey:
+
+    def test_key_is_order_independent(self):
+        """The same parameters, in any order, give the same key."""
+        first = make_cache_key(model="m", params={"a": 1, "b": 2}, prompt="p")
+        second = make_cache_key(prompt="p", params={"b": 2, "a": 1}, model="m")
+        assert first == second
+
+    def test_key_depends_on_the_prompt(self):
+        assert make_cache_key(prompt="a") != make_cache_key(prompt="b")
+
+    def test_media_digest(self):
+        """Images with the same pixels have the same digest."""
+        red = ImageMedia(Image.new("RGB", (8, 8), "red"))
+        other_red = ImageMedia(Image.new("RGB", (8, 8), "red"))
+        blue = ImageMedia(Image.new("RGB", (8, 8), "blue"))
+        assert media_digest(red) == media_digest(other_red)
+        assert media_digest(red) != media_digest(blue)
+
+
+class TestMemoryTier:
+
+    def test_hit_and_miss(self):
+        cache = ResponseCache()
+        assert cache.get("key") == (False, None)
+        cache.set("key", "value")
+        assert cache.get("key") == (True, "value")
+
+        stats = cache.stats()
+        assert stats.hits == 1
+        assert stats.misses == 1
+        assert stats.hit_rate == 0.5
+
+    def test_lru_eviction(self):
+        """The least recently used entry is evicted first."""
+        cache = ResponseCache(max_entries=2)
+        cache.set("a", "1")
+        cache.set("b", "2")
+        cache.get("a")
+        cache.set("c", "3")
+        assert cache.get("b") == (False, None)
+        assert cache.get("a") == (True, "1")
+        assert cache.stats().evictions == 1
+
+    def test_ttl(self):
+        cache = ResponseCache(ttl=0.01)
+        cache.set("key", "value")
+        time.sleep(0.02)
+        assert cache.get("key") == (False, None)
+
+    def test_values_are_copied(self):
+        """Mutating a returned value doesn't alter the cache."""
+        cache = ResponseCache()
+        cache.set("key", {"items": [1, 2]})
+        hit, value = cache.get("key")
+        value["items"].append(3)
+        assert cache.get("key") == (True, {"items": [1, 2]})
+
+    def test_uncacheable_values_are_ignored(self):
+        cache = ResponseCache()
+        cache.set("key", None)
+        assert cache.get("key") == (False, None)
+
+
+class TestDiskTier:
+
+    def test_entries_survive_a_new_instance(self, tmp_path):
+        """The on-disk tier is shared by the caches using the same directory."""
+        cache = ResponseCache(directory=tmp_path)
+        cache.set("text", "value")
+        cache.set("data", {"a": 1})
+        cache.close()
+
+        other = ResponseCache(directory=tmp_path)
+        assert other.get("text") == (True, "value")
+        assert other.get("data") == (True, {"a": 1})
+        assert other.stats().disk_hits == 2
+        other.close()
+
+    def test_image_round_trip(self, tmp_path):
+        """Big payloads are stored in blob files."""
+        image = ImageMedia(Image.effect_noise((256, 256), 64).convert("RGB"), {"seed": 42})
+        cache = ResponseCache(directory=tmp_path)
+        cache.set("image", image)
+        cache.close()
+
+        hit, value = ResponseCache(directory=tmp_path).get("image")
+        assert hit
+        assert value._metadata == {"seed": 42}
+        assert value._image.tobytes() == image._image.tobytes()
+        assert any((tmp_path / "blobs").rglob("*"))
+
+    def test_size_eviction(self, tmp_path):
+        cache = ResponseCache(max_entries=1, directory=tmp_path, max_disk_bytes=10)
+        cache.set("a", "12345678")
+        cache.set("b", "12345678")
+        assert cache.get("a") == (False, None)
+        assert cache.get("b") == (True, "12345678")
+
+    def test_clear(self, tmp_path):
+        cache = ResponseCache(directory=tmp_path)
+        cache.set("key", "value")
+        cache.clear()
+        assert cache.get("key") == (False, None)
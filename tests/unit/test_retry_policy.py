@@ -0,0 +1,98 @@
+import json
+import asyncio
+import pytest
+import httpx
+
+from polymage.platform.retry_policy import RetryPolicy, CircuitBreaker, CircuitOpenError, status_code
+
+
+def http_error(code):
+    request = httpx.Request("POST", "http://localhost/")
+    return httpx.HTTPStatusError("error", request=request, response=httpx.Response(code, request=request))
+
+
+class TestRetryPolicy:
+
+    @pytest.mark.parametrize("error", [
+        httpx.ConnectError("refused"),
+        httpx.ReadTimeout("timeout"),
+        ConnectionResetError(),
+        json.JSONDecodeError("invalid", "", 0),
+        http_error(503),
+        http_error(429),
+    ])
+    def test_transient_errors(self, error):
+        assert RetryPolicy().is_transient(error)
+
+    @pytest.mark.parametrize("error", [
+        ValueError("bad"),
+        http_error(400),
+        CircuitOpenError("dummy", 1.0),
+    ])
+    def test_permanent_errors(self, error):
+        assert not RetryPolicy().is_transient(error)
+
+    def test_retries_until_success(self):
+        policy = RetryPolicy(initial_wait=0)
+        outcomes = [httpx.ConnectError("refused"), http_error(502), "ok"]
+
+        def call():
+            outcome = outcomes.pop(0)
+            if isinstance(outcome, Exception):
+                raise outcome
+            return outcome
+
+        for attempt in policy.retrying():
+            with attempt:
+                result = call()
+        assert result == "ok"
+
+    def test_gives_up_after_max_attempts(self):
+        policy = RetryPolicy(max_attempts=2, initial_wait=0)
+        calls = []
+        with pytest.raises(httpx.ConnectError):
+            for attempt in policy.retrying():
+                with attempt:
+                    calls.append(1)
+                    raise httpx.ConnectError("refused")
+        assert len(calls) == 2
+
+    def test_sdk_status_code(self):
+        class SDKError(Exception):
+            status_code = 500
+        assert status_code(SDKError()) == 500
+        assert RetryPolicy().is_transient(SDKError())
+
+
+class TestCircuitBreaker:
+
+    def test_opens_after_threshold(self):
+        breaker = CircuitBreaker("dummy", failure_threshold=2, recovery_timeout=60)
+        breaker.record_failure(httpx.ConnectError("refused"))
+        breaker.before_call()
+        breaker.record_failure(httpx.ConnectError("refused"))
+        assert breaker.state == CircuitBreaker.OPEN
+        with pytest.raises(CircuitOpenError):
+            breaker.before_call()
+
+    def test_client_errors_do_not_open(self):
+        """A 4xx response shows the backend is up."""
+        breaker = CircuitBreaker("dummy", failure_threshold=1)
+        breaker.record_failure(http_error(400))
+        assert breaker.state == CircuitBreaker.CLOSED
+
+    def test_half_open_trial(self):
+        breaker = CircuitBreaker("dummy", failure_threshold=1, recovery_timeout=0)
+        breaker.record_failure(http_error(503))
+        breaker.before_call()
+        assert breaker.state == CircuitBreaker.HALF_OPEN
+        breaker.record_success()
+        assert breaker.state == CircuitBreaker.CLOSED
+
+    def test_failed_trial_reopens(self):
+        breaker = CircuitBreaker("dummy", failure_threshold=3, recovery_timeout=0)
+        for _ in range(3):
+            breaker.record_failure(httpx.ConnectError("refused"))
+        breaker.before_call()
+        breaker.record_failure(httpx.ConnectError("refused"))
+        assert breaker.state == CircuitBreaker.OPEN
@@ -0,0 +1,237 @@
+import time
+import threading
+import asyncio
+import pytest
+import httpx
+from unittest.mock import MagicMock
+
+from polymage.registry import ModelRegistry
+from polymage.model.model import Model
+from polymage.platform.platform import Platform
+from polymage.platform.router import RouterPlatform, HedgePolicy
+from polymage.platform.retry_policy import RetryPolicy, CircuitOpenError
+
+
+def make_platform(name):
+    platform = MagicMock(spec=Platform)
+    platform.platform_name.return_value = name
+    platform.is_transient.side_effect = RetryPolicy().is_transient
+    return platform
+
+
+@pytest.fixture(autouse=True)
+def routed_model():
+    """Registers a model served by two platforms."""
+    for platform_name in ("alpha", "beta"):
+        ModelRegistry.register("routed-model", platform_name, Model(internal_name=f"{platform_name}/model", default_params={}))
+
+
+@pytest.fixture
+def alpha():
+    return make_platform("alpha")
+
+
+@pytest.fixture
+def beta():
+    return make_platform("beta")
+
+
+class TestRouterPlatform:
+
+    def test_routes_to_a_platform_serving_the_model(self, alpha, beta):
+        gamma = make_platform("gamma")
+        router = RouterPlatform([gamma, alpha])
+        alpha.text2text.return_value = "from alpha"
+        assert router.text2text(model="routed-model", prompt="hello") == "from alpha"
+        gamma.text2text.assert_not_called()
+
+    def test_unknown_model(self, alpha):
+        router = RouterPlatform([alpha])
+        with pytest.raises(ValueError):
+            router.text2text(model="not-registered", prompt="hello")
+
+    def test_failover(self, alpha, beta):
+        """A failing platform is skipped, the call succeeds on the next one."""
+        alpha.text2image.side_effect = httpx.ConnectError("refused")
+        beta.text2image.return_value = "image"
+        router = RouterPlatform([alpha, beta])
+
+        for _ in range(3):
+            assert router.text2image(model="routed-model", prompt="a cat") == "image"
+
+        stats = {s.platform: s for s in router.stats()}
+        assert stats["beta"].calls == 3
+        # once alpha has failed, beta has the lowest cost and is tried first
+        assert alpha.text2image.call_count <= 1
+        assert stats["alpha"].error_rate > stats["beta"].error_rate
+
+    def test_all_platforms_fail(self, alpha, beta):
+        alpha.text2text.side_effect = httpx.ConnectError("alpha")
+        beta.text2text.side_effect = CircuitOpenError("beta", 10)
+        router = RouterPlatform([alpha, beta])
+        with pytest.raises((httpx.ConnectError, CircuitOpenError)):
+            router.text2text(model="routed-model", prompt="hello")
+        assert alpha.text2text.call_count == beta.text2text.call_count == 1
+
+    @pytest.mark.parametrize("error", [ValueError("invalid steps"), RuntimeError("bug")])
+    def test_client_errors_are_not_failed_over(self, alpha, beta, error):
+        """A bad request would fail on every platform, it is raised at once."""
+        alpha.text2text.side_effect = error
+        beta.text2text.side_effect = error
+        router = RouterPlatform([alpha, beta])
+        with pytest.raises(type(error)):
+            router.text2text(model="routed-model", prompt="hello")
+        assert alpha.text2text.call_count + beta.text2text.call_count == 1
+
+    def test_4xx_is_not_failed_over(self, alpha, beta):
+        request = httpx.Request("POST", "http://localhost/")
+        error = httpx.HTTPStatusError("bad request", request=request, response=httpx.Response(400, request=request))
+        alpha.text2image.side_effect = error
+        beta.text2image.side_effect = error
+        router = RouterPlatform([alpha, beta])
+        with pytest.raises(httpx.HTTPStatusError):
+            router.text2image(model="routed-model", prompt="a cat")
+        assert alpha.text2image.call_count + beta.text2image.call_count == 1
+
+    def test_prefers_the_fastest_platform(self, alpha, beta):
+        router = RouterPlatform([alpha, beta])
+        with router._stats_lock:
+            router._route_stats(alpha, "routed-model").latency = 2.0
+            router._route_stats(beta, "routed-model").latency = 0.5
+        beta.text2text.return_value = "from beta"
+        assert router.text2text(model="routed-model", prompt="hello") == "from beta"
+        alpha.text2text.assert_not_called()
+
+    def test_queue_depth_spreads_the_load(self, alpha, beta):
+        router = RouterPlatform([alpha, beta])
+        with router._stats_lock:
+            router._route_stats(alpha, "routed-model").latency = 1.0
+            router._route_stats(alpha, "routed-model").in_flight = 3
+            router._route_stats(beta, "routed-model").latency = 2.0
+        assert router._candidates("routed-model")[0] is beta
+
+    def test_async_failover(self, alpha, beta):
+        async def failing(*args, **kwargs):
+            raise httpx.ConnectError("refused")
+
+        async def caption(*args, **kwargs):
+            return "a caption"
+
+        alpha.aimage2text.side_effect = failing
+        beta.aimage2text.side_effect = caption
+        router = RouterPlatform([alpha, beta])
+
+        async def main():
+            return await asyncio.gather(*[router.aimage2text(model="routed-model", prompt="describe", media=[MagicMock()]) for _ in range(3)])
+
+        assert asyncio.run(main()) == ["a caption"] * 3
+
+    def test_requires_platforms(self):
+        with pytest.raises(ValueError):
+            RouterPlatform([])
+
+    def test_platform_options_are_rejected(self, alpha):
+        """The cache, rate limiter and retries are configured on the platforms."""
+        with pytest.raises(TypeError):
+            RouterPlatform([alpha], cache=MagicMock())
+
+    def test_close_leaves_the_platforms_open(self, alpha, beta):
+        router = RouterPlatform([alpha, beta])
+        router.close()
+        asyncio.run(router.aclose())
+        alpha.close.assert_not_called()
+        alpha.aclose.assert_not_called()
+
+
+
+def warm_up(router, platform, latency, samples=20):
+    """Feeds observed latencies to the router."""
+    for _ in range(samples):
+        start = router._started(platform, "routed-model") - latency
+        router._finished(platform, "routed-model", start, None)
+
+
+class TestHedging:
+
+    def test_slow_call_is_hedged(self, alpha, beta):
+        """A call slower than the percentile is duplicated, the hedge answers when the slow call times out."""
+        def slow(*args, **kwargs):
+            time.sleep(0.3)
+            raise httpx.ReadTimeout("timed out")
+
+        beta_started = []
+        alpha.text2text.side_effect = slow
+        beta.text2text.side_effect = lambda *args, **kwargs: beta_started.append(time.perf_counter()) or "fast"
+        router = RouterPlatform([alpha, beta], hedge=HedgePolicy(max_extra_load=1.0))
+        warm_up(router, alpha, 0.01)
+        warm_up(router, beta, 0.02)
+
+        start = time.perf_counter()
+        assert router.text2text(model="routed-model", prompt="hello") == "fast"
+        # the hedge was sent long before the slow call failed
+        assert beta_started[0] - start < 0.2
+        stats = {s.platform: s for s in router.stats()}
+        assert stats["beta"].hedges == 1
+        assert stats["beta"].hedge_wins == 1
+        assert beta.text2text.call_count == 1
+        router.close()
+
+    def test_primary_runs_on_the_caller_thread(self, alpha, beta):
+        threads = []
+        alpha.text2text.side_effect = lambda *args, **kwargs: threads.append(threading.current_thread()) or time.sleep(0.1) or "slow"
+        beta.text2text.return_value = "fast"
+        router = RouterPlatform([alpha, beta], hedge=HedgePolicy(max_extra_load=1.0))
+        warm_up(router, alpha, 0.01)
+        warm_up(router, beta, 0.02)
+        assert router.text2text(model="routed-model", prompt="hello") == "slow"
+        assert threads == [threading.current_thread()]
+        stats = {s.platform: s for s in router.stats()}
+        assert stats["beta"].hedge_wins == 0
+        router.close()
+
+    def test_fast_call_is_not_hedged(self, alpha, beta):
+        alpha.text2text.return_value = "fast"
+        router = RouterPlatform([alpha, beta], hedge=HedgePolicy(max_extra_load=1.0))
+        warm_up(router, alpha, 1.0)
+        warm_up(router, beta, 2.0)
+        assert router.text2text(model="routed-model", prompt="hello") == "fast"
+        beta.text2text.assert_not_called()
+        router.close()
+
+    def test_extra_load_is_capped(self, alpha, beta):
+        alpha.text2text.side_effect = lambda *args, **kwargs: time.sleep(0.05) or "slow"
+        beta.text2text.side_effect = lambda *args, **kwargs: time.sleep(0.05) or "slow"
+        router = RouterPlatform([alpha, beta], hedge=HedgePolicy(max_extra_load=0.0))
+        warm_up(router, alpha, 0.001)
+        warm_up(router, beta, 0.001)
+        router.text2text(model="routed-model", prompt="hello")
+        assert sum(s.hedges for s in router.stats()) == 0
+        router.close()
+
+    def test_no_hedging_without_enough_samples(self, alpha, beta):
+        router = RouterPlatform([alpha, beta], hedge=HedgePolicy())
+        assert router._hedge_delay([alpha, beta], "routed-model") is None
+
+    def test_async_loser_is_cancelled(self, alpha, beta):
+        cancelled = []
+
+        async def slow(*args, **kwargs):
+            try:
+                await asyncio.sleep(1)
+            except asyncio.CancelledError:
+                cancelled.append(True)
+                raise
+            return "slow"
+
+        async def fast(*args, **kwargs):
+            return "fast"
+
+        alpha.atext2text.side_effect = slow
+        beta.atext2text.side_effect = fast
+        router = RouterPlatform([alpha, beta], hedge=HedgePolicy(max_extra_load=1.0))
+        warm_up(router, alpha, 0.01)
+        warm_up(router, beta, 0.02)
+
+        assert asyncio.run(router.atext2text(model="routed-model", prompt="hello")) == "fast"
+        assert cancelled == [True]
+        assert all(s.in_flight == 0 for s in router.stats())
@@ -0,0 +1,112 @@
+import time
+import asyncio
+import threading
+import pytest
+
+from polymage.platform.single_flight import SingleFlight
+
+
+class TestSingleFlight:
+
+    def test_concurrent_calls_are_coalesced(self):
+        """Identical calls made while one is in flight share its result."""
+        flight = SingleFlight()
+        calls = []
+        started = threading.Event()
+
+        def fn():
+            calls.append(1)
+            started.set()
+            time.sleep(0.05)
+            return "value"
+
+        results = []
+        leader = threading.Thread(target=lambda: results.append(flight.do("key", fn)))
+        leader.start()
+        started.wait()
+        followers = [threading.Thread(target=lambda: results.append(flight.do("key", fn))) for _ in range(3)]
+        for thread in followers:
+            thread.start()
+        for thread in [leader, *followers]:
+            thread.join()
+
+        assert len(calls) == 1
+        assert results == [("value", True)] * 4
+        assert flight.coalesced == 3
+        assert flight.in_flight() == 0
+
+    def test_sequential_calls_are_not_coalesced(self):
+        flight = SingleFlight()
+        assert flight.do("key", lambda: 1) == (1, False)
+        assert flight.do("key", lambda: 2) == (2, False)
+
+    def test_errors_propagate_to_all_waiters(self):
+        flight = SingleFlight()
+        started = threading.Event()
+        errors = []
+
+        def fn():
+            started.set()
+            time.sleep(0.05)
+            raise RuntimeError("boom")
+
+        def run():
+            try:
+                flight.do("key", fn)
+            except RuntimeError as e:
+                errors.append(e)
+
+        leader = threading.Thread(target=run)
+        leader.start()
+        started.wait()
+        follower = threading.Thread(target=run)
+        follower.start()
+        leader.join()
+        follower.join()
+
+        assert len(errors) == 2
+        assert flight.in_flight() == 0
+
+    def test_async_calls_are_coalesced(self):
+        flight = SingleFlight()
+        calls = []
+
+        async def fn():
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            return "value"
+
+        async def main():
+            return await asyncio.gather(*[flight.ado("key", fn) for _ in range(5)])
+
+        assert asyncio.run(main()) == [("value", True)] * 5
+        assert len(calls) == 1
+
+    def test_async_errors_propagate(self):
+        flight = SingleFlight()
+
+        async def fn():
+            await asyncio.sleep(0.01)
+            raise RuntimeError("boom")
+
+        async def main():
+            return await asyncio.gather(*[flight.ado("key", fn) for _ in range(3)], return_exceptions=True)
+
+        results = asyncio.run(main())
+        assert all(isinstance(r, RuntimeError) for r in results)
+
+    def test_cancelled_waiter_does_not_cancel_the_call(self):
+        flight = SingleFlight()
+
+        async def fn():
+            await asyncio.sleep(0.02)
+            return "value"
+
+        async def main():
+            leader = asyncio.create_task(flight.ado("key", fn))
+            waiter = asyncio.create_task(flight.ado("key", fn))
+            await asyncio.sleep(0)
+            waiter.cancel()
+            return await leader
+
+        assert asyncio.run(main()) == ("value", True)
@@ -0,0 +1,74 @@
+import io
+import pytest
+from PIL import Image
+
+from polymage.media.image_media import ImageMedia
+from polymage.media.upload_encoding import UploadEncoding, default_upload
+
+
+def _encoded(image, format, **params):
+    buffer = io.BytesIO()
+    image.save(buffer, format=format, **params)
+    return buffer.getvalue()
+
+
+@pytest.fixture
+def noise():
+    """A noisy image, that doesn't compress well."""
+    return Image.effect_noise((400, 200), 64).convert("RGB")
+
+
+class TestUploadEncoding:
+
+    def test_from_dict(self):
+        policy = UploadEncoding.from_dict({"max_long_edge": 512, "format": "webp"})
+        assert policy == UploadEncoding(max_long_edge=512, format="WEBP", quality=85)
+
+    def test_invalid_format(self):
+        with pytest.raises(ValueError):
+            UploadEncoding(format="GIF")
+
+    def test_matching_original_is_passed_through(self, noise):
+        original = _encoded(noise, "JPEG", quality=90)
+        image = ImageMedia(original)
+        encoded = UploadEncoding(max_long_edge=1024).encode(image)
+        assert encoded.data is original
+        assert encoded.passthrough
+        assert encoded.bytes_saved == 0
+        assert not image.is_decoded()
+
+    def test_png_is_converted_to_jpeg(self, noise):
+        image = ImageMedia(_encoded(noise, "PNG"))
+        encoded = UploadEncoding().encode(image)
+        assert encoded.mime_type == "image/jpeg"
+        assert encoded.bytes_saved > 0
+        assert encoded.to_data_url().startswith("data:image/jpeg;base64,")
+
+    @pytest.mark.parametrize("format", ["JPEG", "PNG"])
+    def test_downscale(self, noise, format):
+        image = ImageMedia(_encoded(noise, format))
+        encoded = UploadEncoding(max_long_edge=100).encode(image)
+        assert Image.open(io.BytesIO(encoded.data)).size == (100, 50)
+
+    def test_alpha_is_dropped_for_jpeg(self):
+        image = ImageMedia(Image.new("RGBA", (20, 20), (255, 0, 0, 128)))
+        encoded = UploadEncoding().encode(image)
+        assert Image.open(io.BytesIO(encoded.data)).mode == "RGB"
+        # measured against the PNG sent without policy
+        assert encoded.original_size == len(image.to_bytes(format="PNG"))
+
+    def test_unaccepted_original_is_measured_against_png(self, noise):
+        image = ImageMedia(_encoded(noise, "TIFF"))
+        data, mime_type = default_upload(image)
+        assert mime_type == "image/png"
+        encoded = UploadEncoding(format="PNG").encode(image)
+        assert encoded.mime_type == "image/png"
+        assert not encoded.passthrough
+        assert encoded.original_size == len(data)
+
+    def test_smaller_original_is_kept(self):
+        """A flat PNG is smaller than its JPEG version."""
+        original = _encoded(Image.new("RGB", (64, 64), "white"), "PNG")
+        encoded = UploadEncoding(quality=100).encode(ImageMedia(original))
+        assert encoded.data is original
+        assert encoded.mime_type == "image/png"